@@ -26,8 +26,10 @@ build_flavor() {
         # For GTK, we create a simple wrapper that uses system Python
         mkdir -p "$APPDIR/usr/bin"
         
-        # Copy the Python script directly
+        # Copy the Python script directly, plus the shared core package
         cp "$PYFILE" "$APPDIR/usr/bin/$APP_NAME.py"
+        cp -r scxctl_core "$APPDIR/usr/bin/"
+        rm -rf "$APPDIR/usr/bin/scxctl_core/__pycache__"
         
         # Create a launcher script
         cat > "$APPDIR/usr/bin/$APP_NAME" <<'EOFGTK'
@@ -41,7 +43,8 @@ EOFGTK
     else
         # Qt version uses PyInstaller as before
         echo "🔹 Compiling Qt version with PyInstaller..."
-        pyinstaller --noconsole --onedir --name "$APP_NAME" "$PYFILE"
+        # scxctl_core loads its modules on demand, which PyInstaller can't trace
+        pyinstaller --noconsole --onedir --name "$APP_NAME" --collect-submodules scxctl_core "$PYFILE"
         
         echo "🔹 Creating $APPDIR..."
         mkdir -p "$APPDIR/usr/bin"
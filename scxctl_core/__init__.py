@@ -0,0 +1,77 @@
+"""Toolkit-free pieces shared by the Qt and GTK frontends.
+
+Names are imported on first use, so a helper process or a relaunch that
+only needs one module doesn't pay for loading all of them.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "MODES": "state",
+    "SchedulerState": "state",
+    "parse_get_output": "state",
+    "parse_list_output": "state",
+    "pick_action": "state",
+    "requested_state": "state",
+    "retry_action": "state",
+    "scheduler_emoji": "state",
+    "BackendError": "backend",
+    "ScxctlBackend": "backend",
+    "open_backend": "backend",
+    "LoaderClient": "loader",
+    "LoaderError": "loader",
+    "open_loader": "loader",
+    "METRICS": "telemetry",
+    "Series": "telemetry",
+    "Telemetry": "telemetry",
+    "TelemetrySampler": "telemetry",
+    "HEATMAP_METRICS": "heatmap",
+    "CpuSamples": "heatmap",
+    "HeatmapSampler": "heatmap",
+    "Topology": "heatmap",
+    "StatsClient": "stats",
+    "StatsColumns": "stats",
+    "StatsError": "stats",
+    "StatsStream": "stats",
+    "SchedulerCore": "core",
+    "MainLoop": "mainloop",
+    "FakeBackend": "fake_backend",
+    "LatencyHistogram": "probe",
+    "LatencyHistory": "probe",
+    "LatencyProbe": "probe",
+    "GuardedApply": "guard",
+    "GuardThresholds": "guard",
+    "find_regressions": "guard",
+    "BenchCase": "bench",
+    "BenchError": "bench",
+    "BenchResult": "bench",
+    "BenchmarkRunner": "bench",
+    "ProcessWatcher": "procwatch",
+    "AppHistory": "apptrack",
+    "AppTracker": "apptrack",
+    "HistoryRecorder": "history",
+    "HistoryStore": "history",
+    "MetricsExporter": "exporter",
+    "SwitchTrace": "transition",
+    "TransitionLog": "transition",
+    "Rule": "rules",
+    "RulesConfig": "rules",
+    "RulesEngine": "rules",
+    "load_rules": "rules",
+    "parse_rules": "rules",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_EXPORTS])
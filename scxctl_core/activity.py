@@ -0,0 +1,68 @@
+"""Activity log: a fixed-size ring buffer in memory, full history on disk.
+
+The GUIs only ever show the ring buffer's worth of entries; everything
+also goes to a size-rotated file so nothing is lost.
+"""
+
+import collections
+import logging
+import logging.handlers
+import os
+import time
+from typing import NamedTuple
+
+DEFAULT_CAPACITY = 500
+SPILL_BYTES = 1 << 20
+SPILL_BACKUPS = 3
+
+
+class LogEntry(NamedTuple):
+    time: float
+    cmd: str
+    text: str
+
+    def format(self) -> str:
+        stamp = time.strftime("%H:%M:%S", time.localtime(self.time))
+        return f"{stamp} [{self.cmd}] {self.text}"
+
+
+def default_spill_path() -> str:
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "scxctl_gui", "activity.log")
+
+
+class ActivityLog:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, spill_path: str | None = None,
+                 spill_bytes: int = SPILL_BYTES, spill_backups: int = SPILL_BACKUPS):
+        self.entries = collections.deque(maxlen=capacity)
+        self._spill = None
+        if spill_path:
+            try:
+                os.makedirs(os.path.dirname(spill_path), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    spill_path, maxBytes=spill_bytes, backupCount=spill_backups, encoding="utf-8")
+            except OSError:
+                handler = None
+            if handler is not None:
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                # A private logger, so nothing else's config touches our file
+                self._spill = logging.Logger("scxctl_gui.activity")
+                self._spill.addHandler(handler)
+
+    def append(self, cmd: str, text: str) -> LogEntry:
+        entry = LogEntry(time.time(), cmd, text)
+        self.entries.append(entry)
+        if self._spill is not None:
+            self._spill.info("[%s] %s", cmd, text)
+        return entry
+
+    def __iter__(self):
+        return iter(list(self.entries))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        if self._spill is not None:
+            for handler in self._spill.handlers:
+                handler.close()
@@ -0,0 +1,417 @@
+"""Run delay and timeslices of pinned applications, per scheduler.
+
+Pinned entries are process name patterns (matched like the rules'
+``process``, see procwatch.process_names) or PIDs. Matching processes are
+found with ProcessWatcher, held with a pidfd, and sampled from their
+/proc/<pid>/task/*/schedstat: each thread's file is opened once and
+re-read with pread, and the task directory (opened once too) is only
+listed to pick up new threads. A thread's counters are summed into its
+process and processes into their pinned entry.
+
+Samples go to AppHistory, which keeps totals per scheduler epoch like
+LatencyHistory, so the same app can be compared before and after a
+switch, and per scheduler label across the whole session.
+"""
+
+import fnmatch
+import json
+import os
+import select
+import threading
+import time
+from collections import deque, namedtuple
+
+from .procwatch import ProcessWatcher, list_pids, process_names
+from .telemetry import DEFAULT_INTERVAL, MIN_INTERVAL
+
+MAX_EPOCHS = 8
+
+# Deltas over one interval, summed over a pinned entry's processes
+AppSample = namedtuple("AppSample", "run_ns wait_ns timeslices pids threads")
+
+
+def pinned_path() -> str:
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "scxctl_gui", "apps.json")
+
+
+def load_pinned(path: str | None = None) -> list[str]:
+    try:
+        with open(path or pinned_path()) as f:
+            pinned = json.load(f).get("pinned", [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return [str(entry) for entry in pinned if str(entry).strip()]
+
+
+def save_pinned(pinned: list[str], path: str | None = None):
+    path = path or pinned_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"pinned": list(pinned)}, f, indent=2)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def match_pinned(pinned, pid: int, names) -> str | None:
+    """The first pinned entry ``pid``/``names`` matches, or None."""
+    lowered = [n.lower() for n in names]
+    for entry in pinned:
+        if entry.isdigit():
+            if int(entry) == pid:
+                return entry
+        elif any(fnmatch.fnmatchcase(n, entry.lower()) for n in lowered):
+            return entry
+    return None
+
+
+def parse_schedstat(data: bytes) -> tuple[int, int, int] | None:
+    """(run_ns, wait_ns, timeslices) from a task's schedstat."""
+    fields = data.split()
+    if len(fields) < 3:
+        return None
+    return int(fields[0]), int(fields[1]), int(fields[2])
+
+
+class TrackedProcess:
+    """One process's threads, each with its schedstat file kept open.
+
+    The pidfd and the task directory fd pin this process: once it exits,
+    a recycled PID can't be mistaken for it.
+    """
+
+    def __init__(self, pid: int, entry: str):
+        self.pid = pid
+        self.entry = entry
+        self.pidfd = os.pidfd_open(pid)
+        try:
+            self.task_fd = os.open(f"/proc/{pid}/task", os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+        except OSError:
+            os.close(self.pidfd)
+            raise
+        # tid -> [fd, run_ns, wait_ns, timeslices]
+        self.threads = {}
+        self.primed = False
+
+    def close(self):
+        for fd, *_ in self.threads.values():
+            os.close(fd)
+        self.threads.clear()
+        os.close(self.task_fd)
+        os.close(self.pidfd)
+
+    def sample(self) -> tuple[int, int, int] | None:
+        """Deltas since the last call; None once the process is gone."""
+        try:
+            # procfs counts a task directory's threads in its link count, so
+            # it only needs listing when threads came or went
+            if os.fstat(self.task_fd).st_nlink - 2 != len(self.threads) or not self.primed:
+                self._add_threads(os.listdir(self.task_fd))
+        except OSError:
+            return None
+
+        run = wait = slices = 0
+        gone = []
+        pread = os.pread
+        for tid, entry in self.threads.items():
+            try:
+                fields = pread(entry[0], 128, 0).split()
+                counters = int(fields[0]), int(fields[1]), int(fields[2])
+            except (OSError, IndexError, ValueError):
+                gone.append(tid)
+                continue
+            if entry[1] is not None:
+                run += counters[0] - entry[1]
+                wait += counters[1] - entry[2]
+                slices += counters[2] - entry[3]
+            entry[1], entry[2], entry[3] = counters
+        for tid in gone:
+            # Exited: what it did since the last sample is lost, which is at
+            # most one interval of one thread
+            os.close(self.threads.pop(tid)[0])
+        self.primed = True
+        return run, wait, slices
+
+    def _add_threads(self, tids):
+        for name in tids:
+            tid = int(name)
+            if tid in self.threads:
+                continue
+            try:
+                fd = os.open(f"{name}/schedstat", os.O_RDONLY | os.O_CLOEXEC, dir_fd=self.task_fd)
+            except OSError:
+                continue
+            # Threads there when tracking began start from their current
+            # counts; later ones are new, so all they did counts
+            self.threads[tid] = [fd, None, None, None] if not self.primed else [fd, 0, 0, 0]
+
+
+class AppTracker:
+    """Finds and samples the pinned processes on its own thread.
+
+    ``on_sample(batch)`` gets ``{"dt": s, "cost": s, "source": how processes
+    are found, "apps": {entry: AppSample}}`` each interval, from the
+    sampler thread.
+    """
+
+    def __init__(self, on_sample, pinned, interval: float = DEFAULT_INTERVAL):
+        self.on_sample = on_sample
+        self.interval = max(interval, MIN_INTERVAL)
+        self.source = None
+        self._pinned = tuple(pinned)
+        self._lock = threading.Lock()
+        self._wanted = {}  # pid -> entry, from the watcher and _scan()
+        self._rescan = False
+        self._procs = {}   # pid -> TrackedProcess, sampler thread only
+        self._stop = threading.Event()
+        self._thread = None
+        self._watcher = ProcessWatcher(self._watch_start, self._watch_exit)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-apptrack")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._watcher.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def pin(self, pinned):
+        """Track ``pinned`` from now on; the sampler rescans /proc for it."""
+        with self._lock:
+            self._pinned = tuple(pinned)
+            self._rescan = True
+
+    def _scan(self):
+        with self._lock:
+            pinned, self._rescan = self._pinned, False
+        matches = {}
+        for pid in list_pids():
+            entry = match_pinned(pinned, pid, process_names(pid))
+            if entry is not None:
+                matches[pid] = entry
+        with self._lock:
+            # Pinned again meanwhile: the next round scans for that
+            if not self._rescan:
+                self._wanted = matches
+
+    # The _watch_* callbacks run on the watcher thread
+
+    def _watch_start(self, pid, names):
+        entry = match_pinned(self._pinned, pid, names)
+        if entry is not None:
+            with self._lock:
+                self._wanted[pid] = entry
+
+    def _watch_exit(self, pid):
+        with self._lock:
+            self._wanted.pop(pid, None)
+
+    def _reconcile(self):
+        with self._lock:
+            wanted = dict(self._wanted)
+        for pid in [pid for pid, proc in self._procs.items() if wanted.get(pid) != proc.entry]:
+            self._procs.pop(pid).close()
+        for pid, entry in wanted.items():
+            if pid not in self._procs:
+                try:
+                    self._procs[pid] = TrackedProcess(pid, entry)
+                except OSError:
+                    # Gone already, or not ours to read
+                    with self._lock:
+                        if self._wanted.get(pid) == entry:
+                            del self._wanted[pid]
+
+    def _reap(self):
+        """Drop processes whose pidfd says they exited: one poll for all of them."""
+        if not self._procs:
+            return
+        poller = select.poll()
+        by_fd = {}
+        for pid, proc in self._procs.items():
+            poller.register(proc.pidfd, select.POLLIN)
+            by_fd[proc.pidfd] = pid
+        for fd, _ in poller.poll(0):
+            pid = by_fd[fd]
+            self._procs.pop(pid).close()
+            with self._lock:
+                self._wanted.pop(pid, None)
+
+    def sample(self, dt: float | None) -> dict:
+        began = time.perf_counter()
+        if self._rescan:
+            self._scan()
+        self._reconcile()
+        self._reap()
+        totals = {}
+        for pid, proc in list(self._procs.items()):
+            fresh = not proc.primed
+            delta = proc.sample()
+            if delta is None:
+                self._procs.pop(pid).close()
+                continue
+            if fresh:
+                # Only a baseline, so no time observed yet either
+                continue
+            run, wait, slices, pids, threads = totals.get(proc.entry, (0, 0, 0, (), 0))
+            totals[proc.entry] = (run + delta[0], wait + delta[1], slices + delta[2],
+                                  pids + (pid,), threads + len(proc.threads))
+        return {"dt": dt, "cost": time.perf_counter() - began, "source": self.source,
+                "apps": {entry: AppSample(*values) for entry, values in totals.items()}}
+
+    def _run(self):
+        # Here, as subscribing can wait for the kernel's answer. It reports
+        # what's already running too, so nothing needs a scan.
+        self._watcher.start()
+        self.source = self._watcher.source
+        last = None
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                batch = self.sample(now - last if last is not None else None)
+                last = now
+                self.on_sample(batch)
+                self._stop.wait(self.interval)
+        finally:
+            for proc in self._procs.values():
+                proc.close()
+            self._procs.clear()
+
+
+class AppTotals:
+    """What one pinned entry did over some stretch of time."""
+
+    def __init__(self):
+        self.run_ns = 0
+        self.wait_ns = 0
+        self.timeslices = 0
+        self.seconds = 0.0
+        self.pids = ()
+        self.threads = 0
+
+    def add(self, sample: AppSample, dt: float):
+        self.run_ns += sample.run_ns
+        self.wait_ns += sample.wait_ns
+        self.timeslices += sample.timeslices
+        self.seconds += dt
+        self.pids = sample.pids
+        self.threads = sample.threads
+
+    def merge(self, other: "AppTotals"):
+        self.run_ns += other.run_ns
+        self.wait_ns += other.wait_ns
+        self.timeslices += other.timeslices
+        self.seconds += other.seconds
+
+    @property
+    def cpu_percent(self) -> float | None:
+        """Of one CPU."""
+        return self.run_ns / 1e7 / self.seconds if self.seconds else None
+
+    @property
+    def delay_ms_per_s(self) -> float | None:
+        """Run-queue delay summed over threads, per second."""
+        return self.wait_ns / 1e6 / self.seconds if self.seconds else None
+
+    @property
+    def delay_per_slice_us(self) -> float | None:
+        """Average wait before each timeslice: the scheduling latency the app sees."""
+        return self.wait_ns / 1e3 / self.timeslices if self.timeslices else None
+
+    @property
+    def slices_per_s(self) -> float | None:
+        return self.timeslices / self.seconds if self.seconds else None
+
+
+class AppEpoch:
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.time()
+        self.apps = {}  # entry -> AppTotals
+
+
+class AppHistory:
+    """Per-app totals for the current scheduler epoch and the last few.
+
+    ``live`` is the latest interval's samples, ``cost`` how long taking
+    them took, ``source`` how the tracker finds processes.
+    """
+
+    def __init__(self, max_epochs: int = MAX_EPOCHS):
+        self.epochs = deque(maxlen=max_epochs)
+        self.live = {}
+        self.dt = None
+        self.cost = None
+        self.source = None
+
+    @property
+    def current(self) -> AppEpoch | None:
+        return self.epochs[-1] if self.epochs else None
+
+    def new_epoch(self, label: str):
+        if self.current is not None and not self.current.apps:
+            self.epochs.pop()
+        self.epochs.append(AppEpoch(label))
+
+    def add_batch(self, batch: dict):
+        self.live = batch["apps"]
+        self.dt = batch["dt"]
+        self.cost = batch["cost"]
+        self.source = batch["source"]
+        if self.current is None or not batch["dt"]:
+            return
+        for entry, sample in batch["apps"].items():
+            totals = self.current.apps.get(entry)
+            if totals is None:
+                totals = self.current.apps[entry] = AppTotals()
+            totals.add(sample, batch["dt"])
+
+    def live_totals(self, entry: str) -> AppTotals | None:
+        """``entry`` over the latest interval, or None if it isn't running."""
+        sample = self.live.get(entry)
+        if sample is None:
+            return None
+        totals = AppTotals()
+        totals.add(sample, self.dt or 0.0)
+        return totals
+
+    def before_after(self, entry: str) -> tuple[AppEpoch | None, AppEpoch | None]:
+        """The latest earlier epoch that saw ``entry``, and the current one if it has."""
+        current = self.current
+        after = current if current is not None and entry in current.apps else None
+        for epoch in list(self.epochs)[-2::-1]:
+            if entry in epoch.apps:
+                return epoch, after
+        return None, after
+
+    def by_label(self, entry: str) -> dict[str, AppTotals]:
+        """``entry``'s totals per scheduler label, over the epochs still kept."""
+        merged = {}
+        for epoch in self.epochs:
+            totals = epoch.apps.get(entry)
+            if totals is not None:
+                merged.setdefault(epoch.label, AppTotals()).merge(totals)
+        return merged
+
+
+def format_per_slice(totals: AppTotals | None) -> str:
+    value = totals.delay_per_slice_us if totals is not None else None
+    return f"{value:,.1f} µs/slice" if value is not None else "-"
+
+
+def format_change(before: AppTotals | None, after: AppTotals | None) -> str:
+    """How run delay per timeslice moved, e.g. "-12% run delay"."""
+    old = before.delay_per_slice_us if before is not None else None
+    new = after.delay_per_slice_us if after is not None else None
+    if not old or new is None:
+        return "-"
+    return f"{(new - old) / old * 100:+.0f}% run delay"
+
+
+def format_totals(totals: AppTotals | None) -> str:
+    if totals is None or not totals.seconds:
+        return "no samples yet"
+    return (f"run delay {format_per_slice(totals)} · {totals.delay_ms_per_s:,.2f} ms/s · "
+            f"{totals.slices_per_s:,.0f} slices/s · CPU {totals.cpu_percent:,.1f}%")
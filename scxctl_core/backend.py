@@ -0,0 +1,110 @@
+"""The two ways of reaching scx_loader, behind one blocking interface.
+
+Both backends offer get_state, supported_schedulers, start, switch, stop,
+cancel and close, and raise BackendError. Calls block, so SchedulerCore
+runs them on its worker threads.
+"""
+
+import subprocess
+import threading
+
+from .state import parse_get_output, parse_list_output
+
+# Seconds. start/switch wait for the loader to bring the BPF scheduler up,
+# which can take a while on a loaded host.
+COMMAND_TIMEOUTS = {
+    "get": 5,
+    "list": 5,
+    "start": 30,
+    "switch": 30,
+    "stop": 15,
+}
+DEFAULT_TIMEOUT = 15
+
+
+class BackendError(Exception):
+    pass
+
+
+class ScxctlBackend:
+    """Fallback that spawns scxctl and parses its output."""
+
+    name = "scxctl"
+
+    def __init__(self):
+        self._procs = set()
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+    def _run(self, args: list[str]) -> str:
+        timeout = COMMAND_TIMEOUTS.get(args[0], DEFAULT_TIMEOUT)
+        try:
+            proc = subprocess.Popen(["scxctl"] + args, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, text=True)
+        except FileNotFoundError:
+            raise BackendError("scxctl not found in PATH") from None
+
+        with self._lock:
+            self._procs.add(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise BackendError(f"scxctl {args[0]} timed out after {timeout}s") from None
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+                cancelled = proc in self._cancelled
+                self._cancelled.discard(proc)
+
+        if cancelled:
+            raise BackendError(f"scxctl {args[0]} cancelled")
+        if proc.returncode != 0:
+            raise BackendError(stderr.strip() or stdout.strip())
+        return stdout.strip()
+
+    def cancel(self):
+        with self._lock:
+            for proc in self._procs:
+                self._cancelled.add(proc)
+                proc.kill()
+
+    def close(self):
+        self.cancel()
+
+    def get_state(self):
+        try:
+            return parse_get_output(self._run(["get"]))
+        except ValueError as e:
+            raise BackendError(str(e)) from e
+
+    def supported_schedulers(self) -> list[str]:
+        try:
+            return parse_list_output(self._run(["list"]))
+        except ValueError as e:
+            raise BackendError(str(e)) from e
+
+    def start(self, scheduler: str, mode: str | None = None, args: str = "") -> str:
+        return self._run(self._action_args("start", scheduler, mode, args))
+
+    def switch(self, scheduler: str, mode: str | None = None, args: str = "") -> str:
+        return self._run(self._action_args("switch", scheduler, mode, args))
+
+    def stop(self) -> str:
+        return self._run(["stop"])
+
+    @staticmethod
+    def _action_args(action, scheduler, mode, args):
+        cmd = [action, "-s", scheduler]
+        if mode:
+            cmd += ["-m", mode]
+        if args:
+            cmd += ["-a", args]
+        return cmd
+
+
+def open_backend():
+    """scx_loader over D-Bus when reachable, otherwise scxctl."""
+    from .loader import open_loader
+    return open_loader() or ScxctlBackend()
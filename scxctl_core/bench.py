@@ -0,0 +1,425 @@
+"""Scheduler A/B benchmark: apply each case, run a fixed suite, compare.
+
+The workloads run in separate processes so they exercise the scheduler
+rather than the GIL:
+
+* pipe: hackbench-style ping-pong over pipes, one process per CPU in pairs
+* wakeup: a 1ms sleeper measuring wakeup overshoot while every CPU spins
+* cpu: one integer-crunching process per CPU
+
+Headless, against the in-process fake backend:
+
+    python3 -m scxctl_core.bench --fake --duration 1 lavd:gaming bpfland
+"""
+
+import argparse
+import csv
+import json
+import os
+import select
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+from .worker import worker_command, worker_env
+
+DEFAULT_DURATION = 5.0
+# Seconds to let a freshly applied scheduler settle before measuring
+DEFAULT_SETTLE = 2.0
+SPAWN_TIMEOUT = 30.0
+PIPE_MESSAGE = b"x" * 100
+WAKEUP_PERIOD = 0.001
+
+# metric key -> column title, in table order
+COLUMNS = {
+    "pipe_msgs_per_s": "Pipe msgs/s",
+    "wakeup_p50_us": "Wakeup p50 µs",
+    "wakeup_p99_us": "Wakeup p99 µs",
+    "wakeup_p999_us": "Wakeup p99.9 µs",
+    "wakeup_max_us": "Wakeup max µs",
+    "cpu_mops_per_s": "CPU Mops/s",
+}
+
+
+class BenchError(Exception):
+    pass
+
+
+class BenchCancelled(BenchError):
+    pass
+
+
+class BenchCase(NamedTuple):
+    scheduler: str
+    mode: str | None = None
+    args: str = ""
+
+    @property
+    def label(self) -> str:
+        if self.scheduler == "default":
+            return "default"
+        if self.args:
+            return f"{self.scheduler} {self.args}"
+        return f"{self.scheduler} ({self.mode or 'auto'})"
+
+    @classmethod
+    def parse(cls, text: str) -> "BenchCase":
+        """``scheduler[:mode[:args]]``"""
+        scheduler, _, rest = text.partition(":")
+        mode, _, args = rest.partition(":")
+        return cls(scheduler.strip().lower(), mode.strip().lower() or None, args.strip())
+
+
+class BenchResult(NamedTuple):
+    case: BenchCase
+    metrics: dict
+    error: str | None = None
+
+
+def percentile(ordered: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return float("nan")
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+# Worker processes (see worker.py). Each says "ready", waits for "go",
+# runs for ``duration`` and prints one JSON result.
+
+def _ping(duration, rfd, wfd):
+    deadline = time.monotonic() + duration
+    count = 0
+    while True:
+        for _ in range(64):
+            os.write(wfd, PIPE_MESSAGE)
+            os.read(rfd, len(PIPE_MESSAGE))
+        count += 64
+        if time.monotonic() >= deadline:
+            return count
+
+
+def _pong(duration, rfd, wfd):
+    # Ends when _ping exits and closes its end
+    while msg := os.read(rfd, len(PIPE_MESSAGE)):
+        os.write(wfd, msg)
+    return None
+
+
+def _spin(duration):
+    deadline = time.monotonic() + duration
+    x = 1
+    chunks = 0
+    while time.monotonic() < deadline:
+        for _ in range(10000):
+            x = (x * 1103515245 + 12345) & 0xFFFFFFFF
+        chunks += 1
+    return chunks * 10000
+
+
+def _sleeper(duration):
+    clock = time.perf_counter_ns
+    period_ns = int(WAKEUP_PERIOD * 1e9)
+    deadline = clock() + int(duration * 1e9)
+    overshoot = []
+    while True:
+        before = clock()
+        if before >= deadline:
+            return overshoot
+        time.sleep(WAKEUP_PERIOD)
+        overshoot.append((clock() - before - period_ns) / 1000)
+
+
+WORKERS = {"ping": _ping, "pong": _pong, "spin": _spin, "sleeper": _sleeper}
+
+
+def worker_main(argv) -> int:
+    kind, duration, *fds = argv
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+    if sys.stdin.readline().strip() != "go":
+        return 1
+    result = WORKERS[kind](float(duration), *map(int, fds))
+    json.dump(result, sys.stdout)
+    return 0
+
+
+def _read_ready(procs, deadline):
+    waiting = {p.stdout.fileno(): p for p in procs}
+    while waiting:
+        timeout = deadline - time.monotonic()
+        ready, _, _ = select.select(list(waiting), [], [], max(0.0, timeout)) if timeout > 0 else ([], [], [])
+        if not ready:
+            raise BenchError("benchmark workers did not start")
+        for fd in ready:
+            if waiting.pop(fd).stdout.readline().strip() != "ready":
+                raise BenchError("benchmark worker failed to start")
+
+
+def _run_workers(workers, duration, stop, inherited=()):
+    """Run [(kind, fds)] in lockstep; return their results in order.
+
+    ``inherited`` fds are closed once the workers have their copies.
+    """
+    env = worker_env()
+    procs = []
+    try:
+        try:
+            for kind, fds in workers:
+                procs.append(subprocess.Popen(worker_command("bench", [kind, duration, *fds]), env=env, pass_fds=fds,
+                                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+        finally:
+            for fd in inherited:
+                os.close(fd)
+        _read_ready(procs, time.monotonic() + SPAWN_TIMEOUT)
+        for proc in procs:
+            proc.stdin.write("go\n")
+            proc.stdin.flush()
+
+        deadline = time.monotonic() + duration + SPAWN_TIMEOUT
+        results = []
+        for proc in procs:
+            while True:
+                try:
+                    proc.wait(0.1)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if stop.is_set():
+                    raise BenchCancelled("cancelled")
+                if time.monotonic() > deadline:
+                    raise BenchError("benchmark worker did not finish")
+            try:
+                results.append(json.loads(proc.stdout.read()))
+            except ValueError as e:
+                raise BenchError(f"benchmark worker {proc.args[-1]} failed") from e
+        return results
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            proc.stdin.close()
+            proc.stdout.close()
+
+
+def run_pipe(duration, stop) -> dict:
+    workers, fds = [], []
+    for _ in range(max(1, (os.cpu_count() or 2) // 2)):
+        to_pong, to_ping = os.pipe(), os.pipe()
+        fds += [*to_pong, *to_ping]
+        workers += [("ping", (to_ping[0], to_pong[1])), ("pong", (to_pong[0], to_ping[1]))]
+    counts = [c for c in _run_workers(workers, duration, stop, fds) if c is not None]
+    # Each round trip is two messages
+    return {"pipe_msgs_per_s": 2 * sum(counts) / duration}
+
+
+def run_wakeup(duration, stop) -> dict:
+    workers = [("sleeper", ())] + [("spin", ())] * (os.cpu_count() or 1)
+    overshoot = sorted(_run_workers(workers, duration, stop)[0])
+    return {
+        "wakeup_p50_us": percentile(overshoot, 50),
+        "wakeup_p99_us": percentile(overshoot, 99),
+        "wakeup_p999_us": percentile(overshoot, 99.9),
+        "wakeup_max_us": overshoot[-1] if overshoot else float("nan"),
+    }
+
+
+def run_cpu(duration, stop) -> dict:
+    ops = _run_workers([("spin", ())] * (os.cpu_count() or 1), duration, stop)
+    return {"cpu_mops_per_s": sum(ops) / duration / 1e6}
+
+
+WORKLOADS = {"pipe": run_pipe, "wakeup": run_wakeup, "cpu": run_cpu}
+
+
+def run_suite(duration=DEFAULT_DURATION, stop=None, workloads=tuple(WORKLOADS)) -> dict:
+    """Blocking; run on a worker thread."""
+    stop = stop or threading.Event()
+    metrics = {}
+    for name in workloads:
+        if stop.is_set():
+            raise BenchCancelled("cancelled")
+        metrics.update(WORKLOADS[name](duration, stop))
+    return metrics
+
+
+class BenchmarkRunner:
+    """Drives SchedulerCore through the cases, one after another.
+
+    Each case goes through ``core.apply`` (so the usual start/switch
+    choice and retry apply), waits ``settle`` seconds and runs the suite
+    on a core worker. Afterwards the state from before the run is put
+    back. Callbacks run on the core's dispatch thread.
+    """
+
+    def __init__(self, core, cases, on_result=None, on_finish=None,
+                 duration=DEFAULT_DURATION, settle=DEFAULT_SETTLE, workloads=tuple(WORKLOADS)):
+        self.core = core
+        self.cases = list(cases)
+        self.on_result = on_result
+        self.on_finish = on_finish
+        self.duration = duration
+        self.settle = settle
+        self.workloads = workloads
+        self.results = []
+        self.running = False
+        self._pending = []
+        self._stop = threading.Event()
+        self._restore = None
+
+    def start(self):
+        if self.core.backend is None:
+            raise BenchError("not connected to a scheduler backend yet")
+        self.running = True
+        self._pending = list(self.cases)
+        self._restore = self.core.state
+        self.core.log("bench", f"Benchmarking {len(self.cases)} configuration(s)")
+        self._next()
+
+    def cancel(self):
+        self._stop.set()
+
+    def _next(self):
+        if self._stop.is_set() or not self._pending:
+            self._finish()
+            return
+        case = self._pending.pop(0)
+        self.core.apply(case.scheduler, case.mode, case.args,
+                        callback=lambda output, error: self._applied(case, error))
+
+    def _applied(self, case, error):
+        if error:
+            self._record(BenchResult(case, {}, error))
+            self._next()
+            return
+
+        def measure():
+            if self._stop.wait(self.settle):
+                raise BenchCancelled("cancelled")
+            return run_suite(self.duration, self._stop, self.workloads)
+        self.core.log("bench", f"Measuring {case.label}")
+        self.core.submit(measure, lambda metrics, error: self._measured(case, metrics, error))
+
+    def _measured(self, case, metrics, error):
+        if error == "cancelled":
+            # Core cancel or ours: stop the workers either way
+            self._stop.set()
+        self._record(BenchResult(case, metrics or {}, error))
+        self._next()
+
+    def _record(self, result):
+        self.results.append(result)
+        if result.error:
+            self.core.log("bench", f"❌ {result.case.label}: {result.error}")
+        else:
+            summary = ", ".join(f"{COLUMNS[k]} {format_metric(v)}" for k, v in result.metrics.items())
+            self.core.log("bench", f"{result.case.label}: {summary}")
+        if self.on_result is not None:
+            self.on_result(result)
+
+    def _finish(self):
+        restore = self._restore
+
+        def done(*_):
+            self.running = False
+            self.core.log("bench", "Benchmark finished")
+            if self.on_finish is not None:
+                self.on_finish(self.results)
+        if restore is None:
+            done()
+        elif restore.running:
+            self.core.apply(restore.scheduler, restore.mode, shlex.join(restore.args), callback=done)
+        else:
+            self.core.stop(callback=done)
+
+
+def format_metric(value) -> str:
+    if value != value:
+        return "-"
+    return f"{value:,.0f}" if abs(value) >= 100 else f"{value:.2f}"
+
+
+def result_rows(results) -> list[dict]:
+    rows = []
+    for r in results:
+        row = {"case": r.case.label, "scheduler": r.case.scheduler,
+               "mode": r.case.mode or "", "args": r.case.args, "error": r.error or ""}
+        row.update({k: r.metrics.get(k) for k in COLUMNS})
+        rows.append(row)
+    return rows
+
+
+def export_csv(results, path: str):
+    rows = result_rows(results)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["case", "scheduler", "mode", "args", "error", *COLUMNS])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def export_json(results, path: str):
+    with open(path, "w") as f:
+        json.dump(result_rows(results), f, indent=2)
+
+
+def format_table(results) -> str:
+    header = ["Configuration", *COLUMNS.values()]
+    rows = [[r.case.label] + ([r.error] if r.error else
+                              [format_metric(r.metrics.get(k, float("nan"))) for k in COLUMNS])
+            for r in results]
+    widths = [max(len(row[i]) for row in [header] + rows if i < len(row)) for i in range(len(header))]
+    return "\n".join("  ".join(cell.ljust(w) for cell, w in zip(row, widths)) for row in [header] + rows)
+
+
+def main():
+    from .core import SchedulerCore
+    from .fake_backend import FakeBackend
+    from .mainloop import MainLoop
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="+", metavar="scheduler[:mode[:args]]")
+    parser.add_argument("--fake", action="store_true",
+                        help="use an in-process fake backend instead of scx_loader/scxctl")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help="seconds per workload")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS))
+    parser.add_argument("--csv")
+    parser.add_argument("--json")
+    opts = parser.parse_args()
+    cases = [BenchCase.parse(c) for c in opts.cases]
+
+    loop = MainLoop()
+    core = SchedulerCore(loop.dispatch)
+    core.connect("log", lambda entry: print(entry.format(), file=sys.stderr))
+    runner = BenchmarkRunner(core, cases, duration=opts.duration, settle=opts.settle,
+                             workloads=tuple(opts.workloads.split(",")),
+                             on_finish=lambda results: loop.quit())
+
+    def started(_):
+        if not runner.running and not runner.results:
+            runner.start()
+    backend = FakeBackend([c.scheduler for c in cases if c.scheduler != "default"]) if opts.fake else None
+    core.connect("state", started)
+    core.start(backend)
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        runner.cancel()
+    finally:
+        core.shutdown()
+
+    print(format_table(runner.results))
+    if opts.csv:
+        export_csv(runner.results, opts.csv)
+    if opts.json:
+        export_json(runner.results, opts.json)
+    return 1 if any(r.error for r in runner.results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""On-disk cache of the supported-scheduler list.
+
+The list only changes when the scx package is upgraded, so it is keyed by
+the identity (inode, mtime) of scxctl, scx_loader and every scx_* binary
+on PATH. A matching key lets the window paint the combo before asking the
+loader anything.
+"""
+
+import json
+import os
+import shutil
+
+CACHE_VERSION = 1
+# scx_loader usually lives outside a user's PATH
+EXTRA_DIRS = ("/usr/bin", "/usr/local/bin", "/usr/sbin", "/usr/local/sbin")
+
+
+def cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "scxctl_gui", "schedulers.json")
+
+
+def binaries_fingerprint() -> list:
+    """[path, inode, mtime_ns] for every binary the list depends on."""
+    paths = set()
+    for name in ("scxctl", "scx_loader"):
+        found = shutil.which(name) or shutil.which(name, path=os.pathsep.join(EXTRA_DIRS))
+        if found:
+            paths.add(found)
+
+    dirs = os.environ.get("PATH", "").split(os.pathsep)
+    for directory in dict.fromkeys(dirs + list(EXTRA_DIRS)):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("scx_"):
+                        paths.add(entry.path)
+        except OSError:
+            continue
+
+    key = []
+    for path in sorted(paths):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        key.append([path, st.st_ino, st.st_mtime_ns])
+    return key
+
+
+def load_schedulers(fingerprint: list | None = None) -> list[str] | None:
+    """The cached list, or None if missing or the binaries changed since."""
+    try:
+        with open(cache_path()) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return None
+    if fingerprint is None:
+        fingerprint = binaries_fingerprint()
+    if data.get("key") != fingerprint:
+        return None
+    schedulers = data.get("schedulers")
+    if not isinstance(schedulers, list) or not all(isinstance(s, str) for s in schedulers):
+        return None
+    return schedulers
+
+
+def save_schedulers(schedulers: list[str], fingerprint: list | None = None):
+    if fingerprint is None:
+        fingerprint = binaries_fingerprint()
+    path = cache_path()
+    data = {"version": CACHE_VERSION, "key": fingerprint, "schedulers": list(schedulers)}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        # A cache we can't write just means a slower next start
+        pass
@@ -0,0 +1,585 @@
+"""Local control socket: drive a running instance from scripts.
+
+JSON-RPC 2.0, one message per line, over a unix socket in
+$XDG_RUNTIME_DIR/scxctl_gui/ (~/.local/state/scxctl_gui/ without a runtime
+dir) that only our user can reach. A JSON array
+is a batch and is answered with one array once every call in it is done.
+Answers come from the instance's cached state and its already-open
+backend, so a query never spawns scxctl.
+
+Methods:
+
+* ``get_state()``: the cached SchedulerState
+* ``list_schedulers()``
+* ``apply(scheduler, mode=None, args="")`` / ``stop()``: answered once the
+  change is done, with the backend's output and the new state
+* ``get_metrics()``: the latest telemetry, scx_stats and latency samples
+* ``subscribe(events=None)`` / ``unsubscribe(events=None)``: events
+  (see EVENTS) arrive as notifications named after the event
+* ``activate(argv=[])``: a relaunch handing over its command line; the
+  frontend raises its window (see ``forward_to_instance``)
+
+The client side is ``ControlClient`` and ``remote_main``, which both
+frontends run for ``--remote``:
+
+    scxctl_gui_qt.py --remote apply lavd --mode gaming
+    python3 -m scxctl_core.control watch state log
+"""
+
+import itertools
+import json
+import os
+import select
+import shlex
+import socket
+import sys
+import threading
+from collections import deque
+
+EVENTS = ("state", "schedulers", "log", "busy", "telemetry", "stats", "latency")
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+FAILED = -32000
+
+# A subscriber that stops reading is dropped rather than buffered forever
+MAX_BUFFER = 4 << 20
+CONNECT_TIMEOUT = 2.0
+
+
+def runtime_dir() -> str:
+    """$XDG_RUNTIME_DIR/scxctl_gui, or the state directory without a runtime dir."""
+    # Kept free of other scxctl_core imports: a relaunch checks the socket
+    # before anything else is loaded
+    base = (os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("XDG_STATE_HOME")
+            or os.path.expanduser("~/.local/state"))
+    return os.path.join(base, "scxctl_gui")
+
+
+def socket_path() -> str:
+    return os.path.join(runtime_dir(), "control.sock")
+
+
+def state_dict(state) -> dict | None:
+    if state is None:
+        return None
+    return {"scheduler": state.scheduler, "mode": state.mode, "args": list(state.args),
+            "running": state.running, "text": state.describe()}
+
+
+def latency_dict(history) -> dict | None:
+    epoch = history.current
+    if epoch is None:
+        return None
+    return {"label": epoch.label, "since": epoch.started, **epoch.histogram.summary()}
+
+
+class ControlError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbuf = b""
+        self.outbuf = bytearray()
+        self.events = set()
+        self.closed = False
+
+
+class ControlServer:
+    """Serves a SchedulerCore on the control socket.
+
+    One thread does all the socket I/O; every request runs on the core's
+    thread through ``core.dispatch``, so it sees the same state the
+    widgets do. Only the connection table and buffers are shared.
+    """
+
+    def __init__(self, core, path: str | None = None, on_activate=None):
+        self.core = core
+        self.path = path or socket_path()
+        self.on_activate = on_activate
+        self.telemetry = {}
+        self.stats = {}
+        self._conns = {}
+        self._lock = threading.Lock()
+        self._wake_r = self._wake_w = None
+        self._listener = None
+        self._thread = None
+        self._handlers = {
+            "get_state": self._get_state,
+            "list_schedulers": self._list_schedulers,
+            "apply": self._apply,
+            "stop": self._stop,
+            "get_metrics": self._get_metrics,
+            "subscribe": self._subscribe,
+            "unsubscribe": self._unsubscribe,
+            "activate": self._activate,
+        }
+        self._listeners = {event: (lambda *args, event=event: self._on_event(event, *args))
+                           for event in EVENTS}
+
+    def start(self):
+        """Raises OSError if the socket can't be bound, e.g. another instance has it."""
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._bind()
+        except OSError:
+            self._listener.close()
+            raise
+        self._listener.setblocking(False)
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_w, False)
+        for event, fn in self._listeners.items():
+            self.core.connect(event, fn)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-control")
+        self._thread.start()
+
+    def _bind(self):
+        try:
+            self._listener.bind(self.path)
+        except OSError:
+            if instance_running(self.path):
+                raise OSError(f"{self.path} is served by another instance") from None
+            # Left behind by one that crashed
+            os.unlink(self.path)
+            self._listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self._listener.listen(8)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        for event, fn in self._listeners.items():
+            self.core.disconnect(event, fn)
+        self._wake(b"x")
+        self._thread.join(timeout=1)
+        self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    # I/O thread
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._listener, select.POLLIN)
+        poller.register(self._wake_r, select.POLLIN)
+        try:
+            while True:
+                with self._lock:
+                    for fd, conn in self._conns.items():
+                        poller.register(fd, select.POLLIN | (select.POLLOUT if conn.outbuf else 0))
+                for fd, mask in poller.poll():
+                    if fd == self._wake_r:
+                        if b"x" in os.read(self._wake_r, 64):
+                            return
+                    elif fd == self._listener.fileno():
+                        self._accept()
+                    else:
+                        self._service(fd, mask)
+                with self._lock:
+                    for fd, conn in list(self._conns.items()):
+                        if conn.closed:
+                            del self._conns[fd]
+                            try:
+                                poller.unregister(fd)
+                            except KeyError:
+                                pass  # closed before it was ever polled
+                            conn.sock.close()
+        finally:
+            with self._lock:
+                for conn in self._conns.values():
+                    conn.sock.close()
+                self._conns.clear()
+            self._listener.close()
+
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        with self._lock:
+            self._conns[sock.fileno()] = _Connection(sock)
+
+    def _service(self, fd, mask):
+        with self._lock:
+            conn = self._conns.get(fd)
+        if conn is None or conn.closed:
+            return
+        if mask & select.POLLOUT:
+            with self._lock:
+                try:
+                    sent = conn.sock.send(conn.outbuf)
+                    del conn.outbuf[:sent]
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    conn.closed = True
+        if mask & (select.POLLIN | select.POLLHUP | select.POLLERR):
+            try:
+                data = conn.sock.recv(65536)
+            except BlockingIOError:
+                return
+            except OSError:
+                data = b""
+            if not data:
+                conn.closed = True
+                return
+            conn.inbuf += data
+            *lines, conn.inbuf = conn.inbuf.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    self.core.dispatch(lambda line=line: self._handle(conn, line))
+
+    def _wake(self, what):
+        try:
+            os.write(self._wake_w, what)
+        except BlockingIOError:
+            pass  # already plenty of wake-ups pending
+
+    def _send(self, conn, message):
+        """Queue ``message`` for ``conn``."""
+        if self._thread is None:
+            return
+        data = json.dumps(message, ensure_ascii=False).encode() + b"\n"
+        with self._lock:
+            if conn.closed:
+                return
+            if len(conn.outbuf) + len(data) > MAX_BUFFER:
+                conn.closed = True
+            else:
+                conn.outbuf += data
+        self._wake(b"w")
+
+    # Core thread
+
+    def _handle(self, conn, line):
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            self._send(conn, _error(None, PARSE_ERROR, f"parse error: {e}"))
+            return
+        if not isinstance(message, list):
+            self._call(conn, message, lambda reply: reply and self._send(conn, reply))
+            return
+        if not message:
+            self._send(conn, _error(None, INVALID_REQUEST, "empty batch"))
+            return
+        replies = [None] * len(message)
+        left = [len(message)]
+
+        def done(index, reply):
+            replies[index] = reply
+            left[0] -= 1
+            if not left[0]:
+                # Notifications get no entry; an all-notification batch gets nothing
+                answered = [r for r in replies if r is not None]
+                if answered:
+                    self._send(conn, answered)
+        for index, request in enumerate(message):
+            self._call(conn, request, lambda reply, index=index: done(index, reply))
+
+    def _call(self, conn, request, reply):
+        """Run one request; ``reply(response_or_None)`` exactly once."""
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            reply(_error(None, INVALID_REQUEST, "not a JSON-RPC request"))
+            return
+        rid = request.get("id")
+        notification = "id" not in request
+
+        def respond(result=None, error=None):
+            if notification:
+                reply(None)
+            elif error is not None:
+                reply(_error(rid, *error))
+            else:
+                reply({"jsonrpc": "2.0", "id": rid, "result": result})
+
+        handler = self._handlers.get(request["method"])
+        if handler is None:
+            respond(error=(METHOD_NOT_FOUND, f"no such method: {request['method']}"))
+            return
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            respond(error=(INVALID_PARAMS, "params must be an object"))
+            return
+        try:
+            handler(conn, params, respond)
+        except (TypeError, ValueError) as e:
+            respond(error=(INVALID_PARAMS, str(e)))
+
+    def _on_event(self, event, *args):
+        if event == "telemetry":
+            self.telemetry = args[0]
+        elif event == "stats":
+            self.stats = args[0]
+        with self._lock:
+            subscribers = [c for c in self._conns.values() if event in c.events and not c.closed]
+        if not subscribers:
+            return
+        if event == "state":
+            params = state_dict(args[0])
+        elif event == "log":
+            params = {"time": args[0].time, "cmd": args[0].cmd, "text": args[0].text}
+        elif event == "latency":
+            params = latency_dict(args[0])
+        else:
+            params = args[0]
+        for conn in subscribers:
+            self._send(conn, {"jsonrpc": "2.0", "method": event, "params": params})
+
+    # Methods
+
+    def _get_state(self, conn, params, respond):
+        respond(state_dict(self.core.state))
+
+    def _list_schedulers(self, conn, params, respond):
+        respond(list(self.core.schedulers))
+
+    def _apply(self, conn, params, respond):
+        scheduler = params.get("scheduler")
+        if not isinstance(scheduler, str) or not scheduler:
+            raise ValueError("scheduler is required")
+        mode = params.get("mode")
+        args = params.get("args") or ""
+        if isinstance(args, list):
+            args = shlex.join(args)
+        self.core.log("control", f"apply {scheduler}" + (f" ({mode})" if mode else ""))
+        self.core.apply(scheduler, mode, args, self._change_done(respond))
+
+    def _stop(self, conn, params, respond):
+        self.core.log("control", "stop")
+        self.core.stop(self._change_done(respond))
+
+    def _change_done(self, respond):
+        def done(output, error):
+            if error:
+                respond(error=(FAILED, str(error)))
+            else:
+                respond({"output": output, "state": state_dict(self.core.state)})
+        return done
+
+    def _get_metrics(self, conn, params, respond):
+        telemetry = self.core.telemetry
+        respond({
+            "state": state_dict(self.core.state),
+            "scx_state": telemetry.scx_state if telemetry else None,
+            "scx_ops": telemetry.scx_ops if telemetry else None,
+            "telemetry": self.telemetry,
+            "stats": self.stats,
+            "latency": latency_dict(self.core.latency) if self.core.probe is not None else None,
+        })
+
+    def _subscribe(self, conn, params, respond):
+        events = _event_list(params)
+        with self._lock:
+            conn.events.update(events)
+            current = sorted(conn.events)
+        respond({"events": current})
+
+    def _unsubscribe(self, conn, params, respond):
+        events = _event_list(params)
+        with self._lock:
+            conn.events.difference_update(events)
+            current = sorted(conn.events)
+        respond({"events": current})
+
+    def _activate(self, conn, params, respond):
+        if self.on_activate is None:
+            respond(error=(METHOD_NOT_FOUND, "this instance has no window to activate"))
+            return
+        argv = params.get("argv") or []
+        if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+            raise ValueError("argv must be a list of strings")
+        self.on_activate(argv)
+        respond({"activated": True})
+
+
+def _event_list(params):
+    events = params.get("events") or EVENTS
+    if isinstance(events, str):
+        events = [events]
+    unknown = set(events) - set(EVENTS)
+    if unknown:
+        raise ValueError(f"unknown events: {', '.join(sorted(unknown))}")
+    return set(events)
+
+
+def _error(rid, code, message):
+    return {"jsonrpc": "2.0", "id": rid, "error": {"code": code, "message": message}}
+
+
+def instance_running(path: str | None = None) -> bool:
+    try:
+        ControlClient(path).close()
+    except OSError:
+        return False
+    return True
+
+
+def forward_to_instance(argv, path: str | None = None) -> bool:
+    """Hand this launch's arguments to the running instance, if there is one.
+
+    True if it took them, and this process should just exit.
+    """
+    try:
+        with ControlClient(path) as client:
+            client.call("activate", argv=list(argv))
+    except (OSError, ValueError, ControlError):
+        return False
+    return True
+
+
+class ControlClient:
+    """Blocking client. Notifications that arrive between replies are kept
+    for ``notifications()``."""
+
+    def __init__(self, path: str | None = None, timeout: float | None = CONNECT_TIMEOUT):
+        self.path = path or socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(self.path)
+        except OSError:
+            self._sock.close()
+            raise
+        # Changes can take a while; only connecting is bounded
+        self._sock.settimeout(None)
+        self._reader = self._sock.makefile("rb")
+        self._ids = itertools.count(1)
+        self._pending = deque()
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("control socket closed")
+        return json.loads(line)
+
+    def _reply(self, is_ours):
+        while True:
+            message = self._read()
+            if is_ours(message):
+                return message
+            self._pending.append(message)
+
+    def call(self, method: str, **params):
+        """The result; raises ControlError if the instance reports one."""
+        rid = next(self._ids)
+        request = {"jsonrpc": "2.0", "id": rid, "method": method, "params": params}
+        self._sock.sendall(json.dumps(request).encode() + b"\n")
+        return _result(self._reply(lambda m: isinstance(m, dict) and "method" not in m))
+
+    def batch(self, calls) -> list:
+        """``[(method, params), ...]`` in one round-trip; a ControlError
+        takes the place of a failed call's result."""
+        requests = [{"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or {}}
+                    for method, params in calls]
+        self._sock.sendall(json.dumps(requests).encode() + b"\n")
+        replies = self._reply(lambda m: isinstance(m, list))
+        if isinstance(replies, dict):
+            replies = [replies]
+        by_id = {reply.get("id"): reply for reply in replies}
+        results = []
+        for request in requests:
+            try:
+                results.append(_result(by_id[request["id"]]))
+            except ControlError as e:
+                results.append(e)
+        return results
+
+    def notifications(self):
+        """Yield ``(event, params)`` forever."""
+        while True:
+            message = self._pending.popleft() if self._pending else self._read()
+            if isinstance(message, dict) and "method" in message:
+                yield message["method"], message.get("params")
+
+
+def _result(reply):
+    if "error" in reply:
+        raise ControlError(reply["error"].get("code", FAILED), reply["error"].get("message", ""))
+    return reply.get("result")
+
+
+def _print(value):
+    print(json.dumps(value, indent=2, ensure_ascii=False))
+
+
+def remote_main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog="scxctl-gui --remote",
+                                     description="Drive the running scxctl GUI instance.")
+    parser.add_argument("--socket", help="control socket (default: %(default)s)", default=socket_path())
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("state", help="print the current scheduler state")
+    sub.add_parser("schedulers", help="list supported schedulers")
+    apply = sub.add_parser("apply", help="start or switch to a scheduler")
+    apply.add_argument("scheduler")
+    apply.add_argument("--mode")
+    apply.add_argument("--args", default="")
+    sub.add_parser("stop", help="return to the default kernel scheduler")
+    sub.add_parser("metrics", help="print the latest telemetry, stats and latency")
+    watch = sub.add_parser("watch", help="print events as JSON lines until interrupted")
+    watch.add_argument("events", nargs="*", help=f"any of: {', '.join(EVENTS)} (default: all)")
+    batch = sub.add_parser("batch", help="send a JSON array of {method, params} from stdin as one batch")
+    batch.add_argument("file", nargs="?", type=argparse.FileType("r"), default=sys.stdin)
+    opts = parser.parse_args(argv)
+
+    try:
+        client = ControlClient(opts.socket)
+    except OSError as e:
+        print(f"No running instance at {opts.socket}: {e}", file=sys.stderr)
+        return 2
+    try:
+        with client:
+            if opts.command in (None, "state"):
+                _print(client.call("get_state"))
+            elif opts.command == "schedulers":
+                _print(client.call("list_schedulers"))
+            elif opts.command == "apply":
+                _print(client.call("apply", scheduler=opts.scheduler, mode=opts.mode, args=opts.args))
+            elif opts.command == "stop":
+                _print(client.call("stop"))
+            elif opts.command == "metrics":
+                _print(client.call("get_metrics"))
+            elif opts.command == "watch":
+                client.call("subscribe", events=opts.events or list(EVENTS))
+                for event, params in client.notifications():
+                    print(json.dumps({"event": event, "params": params}, ensure_ascii=False), flush=True)
+            elif opts.command == "batch":
+                calls = [(c["method"], c.get("params")) for c in json.load(opts.file)]
+                _print([r if not isinstance(r, ControlError) else {"error": str(r), "code": r.code}
+                        for r in client.batch(calls)])
+    except ControlError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(remote_main())
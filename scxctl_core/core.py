@@ -0,0 +1,625 @@
+"""SchedulerCore: everything the GUIs do, minus the widgets.
+
+It owns the backend, the cached SchedulerState and scheduler list, and a
+small worker pool that runs every blocking request. Results come back
+through ``dispatch``, a callable that runs a function on the caller's
+thread (QueuedConnection in Qt, GLib.idle_add in GTK, MainLoop.dispatch
+headless), so listeners never need locking.
+
+Scheduler changes go through a single writer: one start/switch/stop is
+in flight at a time, a newer request replaces one still waiting (only
+the last desired state is applied), and a request for what is already
+running, or already on its way, costs no backend call. Refreshes are
+coalesced to one in flight plus one queued, and never overlap a change.
+
+Events, registered with ``connect``:
+
+* ``state(SchedulerState)``: the cached state changed
+* ``schedulers(list[str])``: the supported-scheduler list changed
+* ``log(LogEntry)``: something was added to ``activity``
+* ``busy(bool)``: whether any request is in flight
+* ``action(ActionResult)``: a start/switch/stop finished, failed or not
+* ``transition(TransitionLog)``: a change's phases were all timed, up to
+  the kernel state and a status read showing it (transition.py)
+* ``telemetry(dict)``: a new sample; history is in ``telemetry.series``
+* ``stats_schema(StatsColumns | None)``: the scheduler's stats socket
+  (dis)connected; a new scheduler brings new columns
+* ``stats(dict)``: a new scx_stats sample, already in the columns
+* ``latency(LatencyHistory)``: the wakeup-latency probe reported
+* ``heatmap(CpuSamples)``: a new per-CPU sample (``start_heatmap``)
+* ``apps(AppHistory)``: the pinned apps were sampled (``start_apps``)
+
+``start_history`` records changes and metrics to disk (history.py),
+``start_exporter`` serves them to Prometheus (exporter.py), and
+``start_control`` lets scripts do all of this through a running instance
+(see control.py).
+"""
+
+from collections import defaultdict
+from typing import NamedTuple
+
+from . import cache
+from .activity import ActivityLog, default_spill_path
+from .backend import open_backend
+from .guard import GuardedApply, GuardThresholds
+from .probe import LatencyHistogram, LatencyHistory, LatencyProbe, epoch_label
+from .stats import StatsStream
+from .state import SchedulerState, pick_action, requested_state, retry_action
+from .telemetry import DEFAULT_INTERVAL, METRICS, TelemetrySampler
+from .transition import SwitchTrace, TransitionLog, format_trace
+
+
+class _Task:
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+
+class _Write:
+    """A desired state, and whoever wants to know once it's reached."""
+
+    def __init__(self, target, request, callback):
+        self.target = target
+        self.request = request  # (scheduler, mode, args), or None to stop
+        self.callbacks = [callback] if callback is not None else []
+        # Created with the request: apply()/stop() run from the click
+        self.trace = SwitchTrace(epoch_label(target), target)
+
+
+class ActionResult(NamedTuple):
+    cmd: str  # "start lavd", "switch lavd" or "stop"
+    request: tuple | None  # (scheduler, mode, args), or None for stop
+    output: str | None
+    error: str | None
+    seconds: float  # from sending it to the backend until it answered
+
+    @property
+    def kind(self) -> str:
+        return self.cmd.split()[0]
+
+
+class SchedulerCore:
+    def __init__(self, dispatch, spill_path=None):
+        self.dispatch = dispatch
+        self.backend = None
+        self.watcher = None
+        self.sampler = None
+        self.stats_stream = None
+        self.probe = None
+        self.heatmap = None
+        self.app_tracker = None
+        # AppHistory, kept across stop_apps/start_apps once there is one
+        self.apps = None
+        self.recorder = None
+        self.exporter = None
+        self.latency = LatencyHistory()
+        self.transitions = TransitionLog()
+        self.guard = None
+        self.control = None
+        # Last known scheduler state: from get, events and our own actions
+        self.state = None
+        self.schedulers = []
+        self.busy = False
+        self.activity = ActivityLog(spill_path=spill_path or default_spill_path())
+        self._fingerprint = None
+        self._cached_schedulers = None
+        self._listeners = defaultdict(list)
+        self._tasks = []
+        self._writing = None
+        self._queued_write = None
+        self._write_seq = 0
+        # The last change's trace, until all its phases are in
+        self._trace = None
+        self._refreshing = False
+        self._refresh_queued = None  # None, or whether the queued one logs
+        # Created on first use: the frontends paint before starting anything
+        self._pool = None
+
+    # Events
+
+    def connect(self, event: str, fn):
+        self._listeners[event].append(fn)
+
+    def disconnect(self, event: str, fn):
+        if fn in self._listeners[event]:
+            self._listeners[event].remove(fn)
+
+    def _emit(self, event, *args):
+        # Listeners may disconnect themselves
+        for fn in list(self._listeners[event]):
+            fn(*args)
+
+    def log(self, cmd: str, text: str):
+        self._emit("log", self.activity.append(cmd, text))
+
+    def _log_result(self, cmd, text, error):
+        self.log(cmd, f"❌ Error: {error}" if error else text)
+
+    # Task scheduling
+
+    def submit(self, fn, callback):
+        """Run blocking ``fn`` on a worker; ``callback(result, error)`` on ours."""
+        task = _Task(callback)
+        self._tasks.append(task)
+        self._set_busy(True)
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="scxctl-core")
+        future = self._pool.submit(fn)
+        future.add_done_callback(lambda f: self.dispatch(lambda: self._finish(task, f)))
+
+    def _finish(self, task, future):
+        self._tasks.remove(task)
+        if task.cancelled:
+            task.callback(None, "cancelled")
+        elif future.exception() is not None:
+            task.callback(None, str(future.exception()))
+        else:
+            task.callback(future.result(), None)
+        # The callback may have queued a follow-up request
+        if not self._tasks:
+            self._set_busy(False)
+
+    def _set_busy(self, busy):
+        if busy != self.busy:
+            self.busy = busy
+            self._emit("busy", busy)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancelled = True
+        if self._queued_write is not None:
+            self._drop_write(self._queued_write, "cancelled")
+            self._queued_write = None
+        if self.backend is not None:
+            self.backend.cancel()
+
+    # Lifecycle
+
+    def load_cached_schedulers(self) -> list[str]:
+        """Synchronously read the on-disk list, so the UI can paint with it."""
+        self._fingerprint = cache.binaries_fingerprint()
+        self._cached_schedulers = cache.load_schedulers(self._fingerprint)
+        self.schedulers = list(self._cached_schedulers or [])
+        return self.schedulers
+
+    def start(self, backend=None):
+        """Connect in the background; ``backend`` skips discovery (e.g. FakeBackend)."""
+        self.submit(lambda: backend or open_backend(), self._on_backend)
+
+    def shutdown(self):
+        self.stop_control()
+        self.stop_telemetry()
+        self.stop_stats()
+        self.stop_probe()
+        self.stop_heatmap()
+        self.stop_apps()
+        self.stop_history()
+        self.stop_exporter()
+        if self._trace is not None:
+            self._trace.close()
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.cancel()
+        if self.backend is not None:
+            self.backend.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self.activity.close()
+
+    def _on_backend(self, backend, error):
+        if backend is None:
+            self._log_result("backend", "", error)
+            if self._queued_write is not None:
+                self._drop_write(self._queued_write, error)
+                self._queued_write = None
+            return
+        self.backend = backend
+        if backend.name == "scxctl":
+            self.log("backend", "scx_loader not reachable over D-Bus, using scxctl")
+
+        self.refresh(log=False)
+        self.list_schedulers()
+
+        # Brings in jeepney, so not imported before the first paint
+        from .watch import StateWatcher
+        loader = backend if backend.name == "dbus" else None
+        self.watcher = StateWatcher(lambda state: self.dispatch(lambda: self._on_watch(state)), loader)
+        self.watcher.start()
+        if self.watcher.sources:
+            self.log("watch", f"Live updates via {', '.join(self.watcher.sources)}")
+
+    def start_telemetry(self, interval: float = DEFAULT_INTERVAL):
+        if self.sampler is None:
+            self.sampler = TelemetrySampler(
+                lambda values: self.dispatch(lambda: self._emit("telemetry", values)), interval)
+            self.sampler.start()
+
+    def stop_telemetry(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+
+    @property
+    def telemetry(self):
+        return self.sampler.telemetry if self.sampler is not None else None
+
+    def start_stats(self):
+        if self.stats_stream is None:
+            self.stats_stream = StatsStream(
+                lambda columns: self.dispatch(lambda: self._emit("stats_schema", columns)),
+                lambda sample: self.dispatch(lambda: self._emit("stats", sample)))
+            self.stats_stream.start()
+
+    def stop_stats(self):
+        if self.stats_stream is not None:
+            self.stats_stream.stop()
+            self.stats_stream = None
+
+    def start_probe(self):
+        if self.probe is None:
+            self.latency.new_epoch(epoch_label(self.state))
+            self.probe = LatencyProbe(lambda batch: self.dispatch(lambda: self._on_probe(batch)))
+            self.probe.start()
+
+    def stop_probe(self):
+        if self.probe is not None:
+            self.probe.stop()
+            self.probe = None
+
+    def start_heatmap(self, interval: float = DEFAULT_INTERVAL):
+        """Sample per-CPU load for the heatmap; needs NumPy (heatmap.HAVE_NUMPY)."""
+        if self.heatmap is None:
+            # Brings in NumPy, so only for whoever opens the heatmap
+            from .heatmap import HeatmapSampler
+            self.heatmap = HeatmapSampler(
+                lambda samples: self.dispatch(lambda: self._emit("heatmap", samples)), interval)
+            self.heatmap.start()
+
+    def stop_heatmap(self):
+        if self.heatmap is not None:
+            self.heatmap.stop()
+            self.heatmap = None
+
+    def start_apps(self, pinned=None):
+        """Track the run delay of pinned apps per scheduler (apptrack.py).
+
+        ``pinned`` defaults to the saved list; with nothing pinned nothing runs.
+        """
+        from .apptrack import AppHistory, AppTracker, load_pinned
+        pinned = load_pinned() if pinned is None else pinned
+        if self.app_tracker is None and pinned:
+            if self.apps is None:
+                self.apps = AppHistory()
+            self.apps.new_epoch(epoch_label(self.state))
+            self.app_tracker = AppTracker(lambda batch: self.dispatch(lambda: self._on_apps(batch)), pinned)
+            self.app_tracker.start()
+            self.log("apps", f"Tracking {', '.join(pinned)}")
+
+    def pin_apps(self, pinned):
+        """Save ``pinned`` and track exactly those; an empty list stops tracking."""
+        from .apptrack import save_pinned
+        try:
+            save_pinned(pinned)
+        except OSError as e:
+            self.log("apps", f"Could not save the pinned apps: {e}")
+        if not pinned:
+            self.stop_apps()
+        elif self.app_tracker is None:
+            self.start_apps(pinned)
+        else:
+            self.app_tracker.pin(pinned)
+            self.log("apps", f"Tracking {', '.join(pinned)}")
+
+    def stop_apps(self):
+        if self.app_tracker is not None:
+            self.app_tracker.stop()
+            self.app_tracker = None
+
+    def _on_apps(self, batch):
+        if self.app_tracker is not None:
+            self.apps.add_batch(batch)
+            self._emit("apps", self.apps)
+
+    def _new_app_epoch(self, state):
+        from .apptrack import format_totals
+        # The "before" half of the comparison, for the log
+        epoch = self.apps.current
+        if epoch is not None:
+            for entry, totals in epoch.apps.items():
+                self.log("apps", f"{entry} under {epoch.label}: {format_totals(totals)}")
+        self.apps.new_epoch(epoch_label(state))
+
+    def start_history(self, path=None):
+        """Keep every change and the telemetry/latency samples in history.py's store."""
+        if self.recorder is None:
+            import sqlite3
+            from .history import HistoryRecorder
+            try:
+                self.recorder = HistoryRecorder(path)
+            except (OSError, sqlite3.Error) as e:
+                self.log("history", f"Not recording history: {e}")
+                return
+            self.recorder.start()
+            self.connect("telemetry", self._record_telemetry)
+            self.connect("action", self._record_action)
+
+    def stop_history(self):
+        if self.recorder is not None:
+            self.disconnect("telemetry", self._record_telemetry)
+            self.disconnect("action", self._record_action)
+            self.recorder.stop()
+            self.recorder = None
+
+    def _record_telemetry(self, values):
+        # Only the headline numbers; the per-event sched_ext counters would
+        # multiply the file size for little use
+        self.recorder.add_samples({name: value for name, value in values.items() if name in METRICS})
+
+    def _record_action(self, result):
+        scheduler, mode, args = result.request or (None, None, None)
+        detail = (str(result.error) if result.error else (result.output or "").strip())[:500]
+        self.recorder.add_event(result.kind, scheduler, mode, args, not result.error, detail or None)
+
+    def start_exporter(self, address=None):
+        """Serve OpenMetrics at ``address`` (see exporter.py), from what we already have.
+
+        Starts telemetry, which is where the sched_ext state and the
+        sampled metrics come from.
+        """
+        if self.exporter is None:
+            from .exporter import MetricsExporter
+            try:
+                exporter = MetricsExporter(self, address)
+                exporter.start()
+            except (OSError, ValueError) as e:
+                self.log("exporter", f"Not serving metrics: {e}")
+                return
+            self.exporter = exporter
+            self.start_telemetry()
+            self.log("exporter", f"Serving metrics on {exporter.url}")
+
+    def stop_exporter(self):
+        if self.exporter is not None:
+            self.exporter.stop()
+            self.exporter = None
+
+    def start_control(self, on_activate=None):
+        """Serve the control socket (control.py), unless another instance does.
+
+        ``on_activate(argv)`` handles a relaunch of the frontend.
+        """
+        if self.control is None:
+            # Imported here so `python -m scxctl_core.control` runs it fresh
+            from .control import ControlServer
+            control = ControlServer(self, on_activate=on_activate)
+            try:
+                control.start()
+            except OSError as e:
+                self.log("control", f"Not serving the control socket: {e}")
+                return
+            self.control = control
+
+    def stop_control(self):
+        if self.control is not None:
+            self.control.stop()
+            self.control = None
+
+    def _on_probe(self, batch):
+        if self.probe is not None:
+            self.latency.add_batch(batch)
+            if self.recorder is not None and batch["count"]:
+                histogram = LatencyHistogram()
+                histogram.merge(batch["buckets"], batch["count"], batch["max"])
+                self.recorder.add_samples({"latency_p50": histogram.percentile(50),
+                                           "latency_p99": histogram.percentile(99),
+                                           "latency_max": histogram.max})
+            self._emit("latency", self.latency)
+
+    def _on_watch(self, state):
+        # Without a loader the watcher only knows that something changed
+        if state is None:
+            self.refresh()
+            return
+        if self._trace is not None:
+            self._trace.see_state(state, refreshed=False)
+            self._trace_progress(self._trace)
+        if state != self.state:
+            self.log("event", state.describe())
+            # Ours are recorded when they finish
+            if self.recorder is not None and self._writing is None:
+                self.recorder.add_event("external", state.scheduler if state.running else None,
+                                        state.mode, " ".join(state.args), detail=state.describe())
+            self.set_state(state)
+
+    # Requests
+
+    def set_state(self, state: SchedulerState):
+        previous, self.state = self.state, state
+        # A new scheduler process means a new stats socket and schema
+        if self.stats_stream is not None and (previous is None or previous.scheduler != state.scheduler):
+            self.stats_stream.reconnect()
+        if self.probe is not None and state != previous:
+            self.latency.new_epoch(epoch_label(state))
+        if self.app_tracker is not None and state != previous:
+            self._new_app_epoch(state)
+        self._emit("state", state)
+
+    def refresh(self, log=True):
+        if self.backend is None:
+            return
+        if self._refreshing or self._writing is not None:
+            # The one in flight may predate whatever prompted this
+            self._refresh_queued = bool(self._refresh_queued) or log
+            return
+        self._refreshing = True
+        seq = self._write_seq
+
+        def done(state, error):
+            self._refreshing = False
+            if log or error:
+                self._log_result("get", state and state.describe(), error)
+            if self._trace is not None and seq == self._write_seq:
+                self._trace.see_state(state, refreshed=True)
+                self._trace_progress(self._trace)
+            # A change that started meanwhile knows better
+            if state is not None and seq == self._write_seq:
+                self.set_state(state)
+            self._run_queued()
+        self.submit(self.backend.get_state, done)
+
+    def _run_queued(self):
+        if self._writing is not None:
+            return
+        if self._queued_write is not None:
+            write, self._queued_write = self._queued_write, None
+            self._start_write(write)
+        elif self._refresh_queued is not None and not self._refreshing:
+            log, self._refresh_queued = self._refresh_queued, None
+            self.refresh(log)
+
+    def list_schedulers(self):
+        if self.backend is None:
+            return
+
+        def done(schedulers, error):
+            if error:
+                self._log_result("list", "", error)
+                return
+            if schedulers != self._cached_schedulers:
+                cache.save_schedulers(schedulers, self._fingerprint)
+                self._cached_schedulers = schedulers
+            if schedulers != self.schedulers:
+                self.schedulers = schedulers
+                self._emit("schedulers", schedulers)
+        self.submit(self.backend.supported_schedulers, done)
+
+    def apply(self, scheduler: str, mode: str | None = None, args: str = "", callback=None):
+        """``callback(output, error)`` runs once the action (and any retry) is done.
+
+        The error is "superseded" if a later apply/stop replaced this one
+        before it started.
+        """
+        if scheduler == "default":
+            self.stop(callback)
+            return
+        self._request(_Write(requested_state(scheduler, mode, args), (scheduler, mode, args), callback))
+
+    def _request(self, write):
+        if self._queued_write is not None:
+            self._drop_write(self._queued_write, "superseded")
+            self._queued_write = None
+        if self.backend is None:
+            # e.g. --apply at launch: runs once connected and refreshed
+            self._queued_write = write
+            return
+        heading_to = self._writing.target if self._writing is not None else self.state
+        if write.target == heading_to:
+            if self._writing is not None:
+                self._writing.callbacks += write.callbacks
+                return
+            self.log("apply", f"Already {write.target.describe()}, nothing to do")
+            for callback in write.callbacks:
+                self.dispatch(lambda callback=callback: callback("already running", None))
+            # In case the cached state is stale
+            self.refresh(log=False)
+            return
+        if self._writing is not None:
+            self._queued_write = write
+            return
+        self._start_write(write)
+
+    def _drop_write(self, write, reason):
+        self.log("apply", f"Skipped {write.request[0] if write.request else 'stop'}: {reason}")
+        for callback in write.callbacks:
+            self.dispatch(lambda callback=callback: callback(None, reason))
+
+    def _start_write(self, write):
+        self._writing = write
+        self._write_seq += 1
+        if self._trace is not None:
+            self._finish_trace()
+        trace = self._trace = write.trace
+        trace.mark("dispatched")
+        trace.watch_kernel(lambda states, reached: self.dispatch(
+            lambda: self._on_kernel_state(trace, states, reached)))
+        if write.request is None:
+            self.submit(lambda: self._acked(trace, self.backend.stop),
+                        lambda output, error: self._action_done("stop", output, error, write))
+        else:
+            self._apply(pick_action(self.state), write)
+
+    def _apply(self, action, write, retry=True):
+        # The cached state picks start vs switch, and the action's own
+        # result updates it. The read-back after it is only for timing (or,
+        # after a failure, to learn what is running).
+        scheduler, mode, args = write.request
+
+        def done(output, error):
+            fallback = retry_action(action, error) if error and retry else None
+            if fallback:
+                self.log(action, f"❌ Error: {error} (retrying as {fallback})")
+                self._apply(fallback, write, retry=False)
+            else:
+                self._action_done(f"{action} {scheduler}", output, error, write)
+        method = getattr(self.backend, action)
+        self.submit(lambda: self._acked(write.trace, method, scheduler, mode, args), done)
+
+    @staticmethod
+    def _acked(trace, method, *args):
+        # On the worker, so the mark is the answer, not when we got to it
+        try:
+            return method(*args)
+        finally:
+            trace.mark("acked")
+
+    def _on_kernel_state(self, trace, states, reached):
+        if trace is self._trace:
+            trace.set_kernel(states, reached)
+            self._trace_progress(trace)
+
+    def _trace_progress(self, trace):
+        if trace is self._trace and trace.complete:
+            self._finish_trace()
+
+    def _finish_trace(self):
+        trace, self._trace = self._trace, None
+        trace.close()
+        self.transitions.add(trace)
+        self.log("timing", format_trace(trace))
+        self._emit("transition", self.transitions)
+
+    def guarded_apply(self, scheduler: str, mode: str | None = None, args: str = "",
+                      limits: GuardThresholds = GuardThresholds()):
+        """apply, then roll back if pressure or latency regress (see guard.py)."""
+        self.cancel_guard()
+        self.guard = GuardedApply(self, scheduler, mode, args, limits)
+        self.guard.start()
+
+    def cancel_guard(self):
+        if self.guard is not None:
+            self.guard.cancel()
+            self.guard = None
+
+    def stop(self, callback=None):
+        self._request(_Write(SchedulerState(), None, callback))
+
+    def _action_done(self, cmd, output, error, write):
+        self._log_result(cmd, output, error)
+        trace = write.trace
+        trace.name, trace.error = cmd, error
+        self._emit("action", ActionResult(cmd, write.request, output, error, trace.duration("loader") or 0.0))
+        self._writing = None
+        if error:
+            self._trace_progress(trace)
+            # We no longer know what is running
+            self.refresh()
+        else:
+            self.set_state(write.target)
+            if not trace.complete:
+                # The first status read after the answer, unless an event beat it
+                self.refresh(log=False)
+            self._trace_progress(trace)
+        for callback in write.callbacks:
+            callback(output, error)
+        self._run_queued()
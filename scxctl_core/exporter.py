@@ -0,0 +1,377 @@
+"""OpenMetrics endpoint for Prometheus: which scheduler runs, and how it's doing.
+
+Serves ``GET /metrics`` over HTTP on localhost or a unix socket. Nothing
+is measured per scrape: the exporter keeps a copy of what SchedulerCore
+already reported (state, telemetry, scx_stats, latency, switch results),
+renders it once after each change and hands the same bytes to every
+scrape until the next one, so a 1 s scrape interval costs a send().
+
+    python3 -m scxctl_core.exporter --listen 127.0.0.1:9863
+    curl -s localhost:9863/metrics
+
+Rates (PSI, run-queue wait, timeslices) are the sampler's, per second
+over its interval, and exported as gauges.
+"""
+
+import argparse
+import bisect
+import math
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+DEFAULT_ADDRESS = "127.0.0.1:9863"
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+CLIENT_TIMEOUT = 2.0
+
+SCX_STATES = ("enabling", "enabled", "disabling", "disabled")
+ACTIONS = ("start", "switch", "stop")
+SWITCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# telemetry name -> (metric, help, scale to base units)
+TELEMETRY_METRICS = {
+    "psi_some": ("scxctl_cpu_pressure_some_ratio",
+                 "Share of time at least one runnable task waited for a CPU", 0.01),
+    "psi_full": ("scxctl_cpu_pressure_full_ratio",
+                 "Share of time every non-idle task waited for a CPU", 0.01),
+    "rq_wait": ("scxctl_runqueue_wait_ratio",
+                "Seconds spent waiting on a run queue per second, per CPU", 0.001),
+    "timeslices": ("scxctl_timeslices_per_second", "Timeslices run per second, all CPUs", 1),
+    "scx_events": ("scxctl_sched_ext_events_per_second", "sched_ext events per second, all kinds", 1),
+}
+
+
+def parse_address(text: str | None) -> tuple[int, object]:
+    """(family, address) from "host:port", ":port", "[::1]:port", "unix:/path" or "/path"."""
+    text = text or DEFAULT_ADDRESS
+    if text.startswith("unix:") or text.startswith("/"):
+        path = text.removeprefix("unix:")
+        if not path:
+            raise ValueError(f"no socket path in {text!r}")
+        return socket.AF_UNIX, path
+    host, sep, port = text.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"expected host:port or unix:/path, got {text!r}")
+    if host.startswith("["):
+        return socket.AF_INET6, (host.strip("[]"), int(port))
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(int(value))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "scxctl-exporter"
+    timeout = CLIENT_TIMEOUT
+
+    def do_GET(self):
+        if self.path.partition("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        # The exporter passes itself as the server
+        body = self.server.render()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """Serves a SchedulerCore's cached state as OpenMetrics.
+
+    Listeners run on the core's thread and only update the snapshot; one
+    thread of our own accepts and answers scrapes, one at a time.
+    """
+
+    def __init__(self, core, address: str | None = None):
+        self.core = core
+        self.family, self.address = parse_address(address)
+        self._state = None
+        self._scx_state = None
+        self._scx_ops = None
+        self._telemetry = {}
+        self._stats = {}
+        self._latency = None
+        self._switches = {(action, result): 0 for action in ACTIONS for result in ("ok", "error")}
+        self._buckets = [0] * (len(SWITCH_BUCKETS) + 1)
+        self._duration_sum = 0.0
+        self._last_switch = None
+        self._body = None
+        self._lock = threading.Lock()
+        self._listener = None
+        self._wake_r = self._wake_w = None
+        self._thread = None
+        self._listeners = {
+            "state": self._on_state,
+            "telemetry": self._on_telemetry,
+            "stats_schema": self._on_stats_schema,
+            "stats": self._on_stats,
+            "latency": self._on_latency,
+            "action": self._on_action,
+        }
+
+    @property
+    def url(self) -> str:
+        if self.family == socket.AF_UNIX:
+            return f"unix:{self.address}"
+        host, port = self.address
+        return f"http://{f'[{host}]' if self.family == socket.AF_INET6 else host}:{port}/metrics"
+
+    def start(self):
+        """Raises OSError if the address can't be bound."""
+        self._listener = socket.socket(self.family, socket.SOCK_STREAM)
+        try:
+            self._bind()
+        except OSError:
+            self._listener.close()
+            raise
+        self._listener.setblocking(False)
+        self._wake_r, self._wake_w = os.pipe()
+        self._state = self.core.state
+        for event, fn in self._listeners.items():
+            self.core.connect(event, fn)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-exporter")
+        self._thread.start()
+
+    def _bind(self):
+        if self.family != socket.AF_UNIX:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind(self.address)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.address)), exist_ok=True)
+            try:
+                self._listener.bind(self.address)
+            except OSError:
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(self.address)
+                    raise OSError(f"{self.address} is in use") from None
+                except ConnectionRefusedError:
+                    # Left behind by one that crashed
+                    os.unlink(self.address)
+                    self._listener.bind(self.address)
+                finally:
+                    probe.close()
+            # Read-only, like a TCP port on localhost: whoever scrapes may connect
+            os.chmod(self.address, 0o666)
+        self._listener.listen(16)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        for event, fn in self._listeners.items():
+            self.core.disconnect(event, fn)
+        os.write(self._wake_w, b"x")
+        self._thread.join(timeout=CLIENT_TIMEOUT + 1)
+        self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        if self.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    # Core thread
+
+    def _changed(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                setattr(self, f"_{name}", value)
+            self._body = None
+
+    def _on_state(self, state):
+        self._changed(state=state)
+
+    def _on_telemetry(self, values):
+        telemetry = self.core.telemetry
+        latency = self._latency if self.core.probe is not None else None
+        self._changed(telemetry=values, scx_state=telemetry and telemetry.scx_state,
+                      scx_ops=telemetry and telemetry.scx_ops, latency=latency)
+
+    def _on_stats_schema(self, columns):
+        if columns is None:
+            self._changed(stats={})
+
+    def _on_stats(self, sample):
+        self._changed(stats={name: value for name, value in sample.items()
+                             if isinstance(value, (int, float))})
+
+    def _on_latency(self, history):
+        epoch = history.current
+        self._changed(latency=(epoch.label, epoch.histogram.summary()) if epoch is not None else None)
+
+    def _on_action(self, result):
+        with self._lock:
+            key = (result.kind, "error" if result.error else "ok")
+            self._switches[key] = self._switches.get(key, 0) + 1
+            self._buckets[bisect.bisect_left(SWITCH_BUCKETS, result.seconds)] += 1
+            self._duration_sum += result.seconds
+            self._last_switch = time.time()
+            self._body = None
+
+    # Exporter thread
+
+    def render(self) -> bytes:
+        with self._lock:
+            if self._body is None:
+                self._body = self._render().encode()
+            return self._body
+
+    def _render(self) -> str:
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+
+        state = self._state
+        if state is not None:
+            family("scxctl_scheduler", "info", "The sched_ext scheduler scx_loader runs, default for the kernel's own")
+            lines.append(f'scxctl_scheduler_info{{scheduler="{_label(state.scheduler or "default")}",'
+                         f'mode="{_label(state.mode or "")}",args="{_label(" ".join(state.args))}"}} 1')
+            family("scxctl_scheduler_running", "gauge", "1 while a sched_ext scheduler is loaded")
+            lines.append(f"scxctl_scheduler_running {int(state.running)}")
+
+        if self._scx_state:
+            family("scxctl_sched_ext_state", "stateset", "/sys/kernel/sched_ext/state")
+            for name in SCX_STATES:
+                lines.append(f'scxctl_sched_ext_state{{scxctl_sched_ext_state="{name}"}} '
+                             f"{int(self._scx_state == name)}")
+        if self._scx_ops:
+            family("scxctl_sched_ext_ops", "info", "/sys/kernel/sched_ext/root/ops")
+            lines.append(f'scxctl_sched_ext_ops_info{{ops="{_label(self._scx_ops)}"}} 1')
+
+        family("scxctl_switches", "counter", "Scheduler starts, switches and stops since the exporter started")
+        for (action, result), count in self._switches.items():
+            lines.append(f'scxctl_switches_total{{action="{action}",result="{result}"}} {count}')
+        family("scxctl_switch_duration_seconds", "histogram", "Time from sending a start/switch/stop until it finished")
+        total = 0
+        for bound, count in zip(SWITCH_BUCKETS + (math.inf,), self._buckets):
+            total += count
+            lines.append(f'scxctl_switch_duration_seconds_bucket{{le="{_number(float(bound))}"}} {total}')
+        lines.append(f"scxctl_switch_duration_seconds_sum {_number(self._duration_sum)}")
+        lines.append(f"scxctl_switch_duration_seconds_count {total}")
+        if self._last_switch is not None:
+            family("scxctl_last_switch_timestamp_seconds", "gauge", "When the last start/switch/stop finished")
+            lines.append(f"scxctl_last_switch_timestamp_seconds {_number(self._last_switch)}")
+
+        for name, (metric, help_text, scale) in TELEMETRY_METRICS.items():
+            value = self._telemetry.get(name)
+            if value is not None:
+                family(metric, "gauge", help_text)
+                lines.append(f"{metric} {_number(value * scale)}")
+        events = {name[len("scx_event:"):]: value for name, value in self._telemetry.items()
+                  if name.startswith("scx_event:")}
+        if events:
+            family("scxctl_sched_ext_event_rate", "gauge", "sched_ext events per second, by kind")
+            for name, value in sorted(events.items()):
+                lines.append(f'scxctl_sched_ext_event_rate{{event="{_label(name)}"}} {_number(value)}')
+
+        if self._latency is not None:
+            label, summary = self._latency
+            family("scxctl_wakeup_latency_seconds", "summary",
+                   "Timer wakeup latency under the current scheduler, since it was started")
+            for quantile, key in (("0.5", "p50"), ("0.99", "p99"), ("0.999", "p999")):
+                lines.append(f'scxctl_wakeup_latency_seconds{{quantile="{quantile}"}} '
+                             f"{_number(summary[key] / 1e6)}")
+            lines.append(f"scxctl_wakeup_latency_seconds_count {summary['count']}")
+            family("scxctl_wakeup_latency_max_seconds", "gauge", "Worst timer wakeup latency under the current scheduler")
+            lines.append(f"scxctl_wakeup_latency_max_seconds {_number(summary['max'] / 1e6)}")
+
+        if self._stats:
+            family("scxctl_scheduler_stat", "gauge", "The running scheduler's own scx_stats, top-level fields")
+            for name, value in sorted(self._stats.items()):
+                lines.append(f'scxctl_scheduler_stat{{name="{_label(name)}"}} {_number(value)}')
+
+        lines.append("# EOF\n")
+        return "\n".join(lines)
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._listener, select.POLLIN)
+        poller.register(self._wake_r, select.POLLIN)
+        try:
+            while True:
+                for fd, _ in poller.poll():
+                    if fd == self._wake_r:
+                        return
+                    try:
+                        sock, peer = self._listener.accept()
+                    except OSError:
+                        continue
+                    sock.setblocking(True)
+                    try:
+                        _Handler(sock, peer, self)
+                    except OSError:
+                        pass  # a client that went away mid-request
+                    finally:
+                        sock.close()
+        finally:
+            self._listener.close()
+
+
+def main(argv=None) -> int:
+    from .activity import default_spill_path
+    from .core import SchedulerCore
+    from .fake_backend import FakeBackend
+    from .mainloop import MainLoop
+
+    parser = argparse.ArgumentParser(prog="python3 -m scxctl_core.exporter",
+                                     description="Serve scheduler state and metrics as OpenMetrics.")
+    parser.add_argument("--listen", default=DEFAULT_ADDRESS,
+                        help=f"host:port or unix:/path (default {DEFAULT_ADDRESS})")
+    parser.add_argument("--probe", action="store_true",
+                        help="also run the wakeup-latency probe (a helper process waking every 2 ms)")
+    parser.add_argument("--fake", action="store_true",
+                        help="use an in-process fake backend instead of scx_loader/scxctl")
+    opts = parser.parse_args(argv)
+    try:
+        parse_address(opts.listen)
+    except ValueError as e:
+        parser.error(str(e))
+
+    loop = MainLoop()
+    spill = os.path.join(os.path.dirname(default_spill_path()), "exporter.log")
+    core = SchedulerCore(loop.dispatch, spill_path=spill)
+    core.connect("log", lambda entry: print(entry.format(), file=sys.stderr, flush=True))
+    core.start_exporter(opts.listen)
+    if core.exporter is None:
+        core.shutdown()
+        return 1
+    core.start(FakeBackend(["bpfland", "lavd", "rusty"]) if opts.fake else None)
+    core.start_stats()
+    if opts.probe:
+        core.start_probe()
+    signal.signal(signal.SIGTERM, lambda *_: loop.quit())
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        core.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""An in-process backend that pretends to be scx_loader.
+
+For running SchedulerCore (and the benchmark harness) headless on a
+machine without sched_ext:
+
+    core.start(FakeBackend(["lavd", "bpfland"]))
+
+It follows the same strict start/switch rules as mock_loader.
+"""
+
+import threading
+import time
+
+from .backend import BackendError
+from .state import MODES, SchedulerState, requested_state, strip_scx_prefix
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self, schedulers=("bpfland", "lavd", "rusty"), delay: float = 0.0):
+        self.schedulers = [strip_scx_prefix(s) for s in schedulers]
+        self.delay = delay
+        self.state = SchedulerState()
+        self._lock = threading.Lock()
+
+    def close(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def get_state(self) -> SchedulerState:
+        return self.state
+
+    def supported_schedulers(self) -> list[str]:
+        return list(self.schedulers)
+
+    def start(self, scheduler: str, mode: str | None = None, args: str = "") -> str:
+        return self._start_or_switch(False, scheduler, mode, args)
+
+    def switch(self, scheduler: str, mode: str | None = None, args: str = "") -> str:
+        return self._start_or_switch(True, scheduler, mode, args)
+
+    def stop(self) -> str:
+        time.sleep(self.delay)
+        with self._lock:
+            self.state = SchedulerState()
+        return "stopped scheduler"
+
+    def _start_or_switch(self, switch, scheduler, mode, args):
+        scheduler = strip_scx_prefix(scheduler)
+        if scheduler not in self.schedulers:
+            raise BackendError(f"unsupported scheduler {scheduler}")
+        if mode and mode.lower() not in MODES:
+            raise BackendError(f"unknown mode: {mode}")
+        time.sleep(self.delay)
+        with self._lock:
+            if switch and not self.state.running:
+                raise BackendError("no scheduler is running")
+            if not switch and self.state.running:
+                raise BackendError("a scheduler is already running")
+            self.state = requested_state(scheduler, mode, args)
+        return f"{'switched to' if switch else 'started'} {scheduler}"
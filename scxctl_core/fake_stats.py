@@ -0,0 +1,106 @@
+"""A stand-in scx_stats server for working without a running scheduler.
+
+    python3 -m scxctl_core.fake_stats --socket /tmp/scx_stats &
+    SCXCTL_GUI_STATS_SOCKET=/tmp/scx_stats python3 scxctl_gui_qt.py
+
+It answers stats_meta and stats like an scx scheduler would, with a
+small lavd-like set of counters that move on every request.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import threading
+
+FIELDS = {
+    "nr_sched": ("U64", "Number of scheduling decisions"),
+    "nr_migrations": ("U64", "Number of task migrations"),
+    "nr_preemptions": ("U64", "Number of preemptions"),
+    "dsq_lat_us": ("Float", "Average dispatch latency in microseconds"),
+    "pc_pc_util": ("Float", "Performance-core utilization in percent"),
+    "nr_active": ("I64", "Number of active CPUs"),
+    "mode": ("String", "Power mode"),
+    "per_cpu": ({"Dict": {"key": "U64", "datum": {"Struct": "CpuStats"}}}, "Per-CPU stats"),
+}
+
+
+class FakeStats:
+    def __init__(self, name="lavd"):
+        self.name = name
+        self.counters = {"nr_sched": 0, "nr_migrations": 0, "nr_preemptions": 0}
+
+    def meta(self):
+        fields = {k: {"kind": kind, "desc": desc} for k, (kind, desc) in FIELDS.items()}
+        return {
+            "SysStats": {"name": "SysStats", "desc": f"{self.name} system stats",
+                         "fields": fields, "attrs": {"top": "true"}},
+            "CpuStats": {"name": "CpuStats", "desc": "per-CPU",
+                         "fields": {"util": {"kind": "Float"}}, "attrs": {}},
+        }
+
+    def stats(self):
+        self.counters["nr_sched"] += random.randint(5000, 20000)
+        self.counters["nr_migrations"] += random.randint(10, 400)
+        self.counters["nr_preemptions"] += random.randint(0, 50)
+        return dict(self.counters,
+                    dsq_lat_us=random.uniform(2.0, 40.0),
+                    pc_pc_util=random.uniform(0.0, 100.0),
+                    nr_active=random.randint(1, os.cpu_count() or 1),
+                    mode="performance",
+                    per_cpu={"0": {"util": 1.0}})
+
+    def handle(self, request):
+        req = request.get("req")
+        if req == "stats_meta":
+            return {"errno": 0, "args": {"resp": self.meta()}}
+        if req == "stats":
+            return {"errno": 0, "args": {"resp": self.stats()}}
+        return {"errno": 22, "args": {}}
+
+
+def _serve_client(conn, fake):
+    with conn, conn.makefile("rb") as reader:
+        try:
+            for line in reader:
+                try:
+                    reply = fake.handle(json.loads(line))
+                except ValueError:
+                    reply = {"errno": 22, "args": {}}
+                conn.sendall(json.dumps(reply).encode() + b"\n")
+        except OSError:
+            pass
+
+
+def serve(path, name="lavd"):
+    fake = FakeStats(name)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen()
+        print(f"fake {name} stats serving {path}", flush=True)
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=_serve_client, args=(conn, fake), daemon=True).start()
+        finally:
+            os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default="/tmp/scx_stats")
+    parser.add_argument("--scheduler", default="lavd")
+    opts = parser.parse_args()
+    try:
+        serve(opts.socket, opts.scheduler)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Guarded apply: switch, watch, and roll back if things got worse.
+
+Before applying, a baseline is taken from telemetry (CPU pressure and
+run-queue wait) and, when the probe is on, wakeup latency; if telemetry
+wasn't running, the switch waits for BASELINE_SAMPLES samples first. For
+``window`` seconds after the switch the same metrics are collected; if
+they regress past the thresholds, or the scheduler exits (sched_ext state
+goes ``disabled``), the previous scheduler/mode/args is put back.
+
+Without a baseline, or without knowing what runs now, there would be
+nothing to compare or to go back to, so the switch is refused.
+"""
+
+import shlex
+import time
+from typing import NamedTuple
+
+
+BASELINE_SAMPLES = 10
+# Fewer probe wakeups than this and p99 is noise
+MIN_LATENCY_SAMPLES = 200
+
+
+class GuardThresholds(NamedTuple):
+    window: float = 15.0       # seconds watched after the switch
+    psi_some: float = 10.0     # allowed rise in CPU pressure, percentage points
+    rq_wait: float = 1.5       # allowed run-queue wait ratio over baseline...
+    rq_wait_floor: float = 1.0  # ...once above this many ms/s per CPU
+    latency_p99: float = 2.0   # allowed p99 wakeup latency ratio over baseline...
+    latency_floor: int = 200   # ...once above this many µs
+
+
+def _mean(values):
+    values = [v for v in values if v == v]
+    return sum(values) / len(values) if values else None
+
+
+def baseline_ready(core) -> bool:
+    telemetry = core.telemetry
+    return telemetry is not None and any(
+        len(telemetry.series.get(name, ())) >= BASELINE_SAMPLES for name in ("psi_some", "rq_wait"))
+
+
+def baseline_metrics(core) -> dict:
+    metrics = {}
+    telemetry = core.telemetry
+    if telemetry is not None:
+        for name in ("psi_some", "rq_wait"):
+            series = telemetry.series.get(name)
+            if series is not None:
+                metrics[name] = _mean(series.values()[-BASELINE_SAMPLES:])
+    epoch = core.latency.current if core.probe is not None else None
+    if epoch is not None and epoch.histogram.count >= MIN_LATENCY_SAMPLES:
+        metrics["latency_p99"] = epoch.histogram.percentile(99)
+    return {k: v for k, v in metrics.items() if v is not None}
+
+
+def find_regressions(baseline: dict, after: dict, limits: GuardThresholds) -> list[str]:
+    """Human-readable reasons ``after`` is worse than ``baseline``; empty if fine."""
+    reasons = []
+    if "psi_some" in baseline and "psi_some" in after:
+        if after["psi_some"] - baseline["psi_some"] > limits.psi_some:
+            reasons.append(f"CPU pressure {baseline['psi_some']:.1f}% → {after['psi_some']:.1f}%")
+    if "rq_wait" in baseline and "rq_wait" in after:
+        if after["rq_wait"] > limits.rq_wait_floor and \
+                after["rq_wait"] > baseline["rq_wait"] * limits.rq_wait:
+            reasons.append(f"run-queue wait {baseline['rq_wait']:.2f} → {after['rq_wait']:.2f} ms/s per CPU")
+    if "latency_p99" in baseline and "latency_p99" in after:
+        if after["latency_p99"] > limits.latency_floor and \
+                after["latency_p99"] > baseline["latency_p99"] * limits.latency_p99:
+            reasons.append(f"p99 wakeup latency {baseline['latency_p99']} → {after['latency_p99']} µs")
+    return reasons
+
+
+def _describe(metrics):
+    parts = []
+    if "psi_some" in metrics:
+        parts.append(f"CPU pressure {metrics['psi_some']:.1f}%")
+    if "rq_wait" in metrics:
+        parts.append(f"run-queue wait {metrics['rq_wait']:.2f} ms/s")
+    if "latency_p99" in metrics:
+        parts.append(f"p99 latency {metrics['latency_p99']} µs")
+    return ", ".join(parts) or "no metrics yet"
+
+
+class GuardedApply:
+    """One guarded switch, driven by SchedulerCore events on its thread."""
+
+    def __init__(self, core, scheduler, mode=None, args="", limits=GuardThresholds(), on_done=None):
+        self.core = core
+        self.target = (scheduler, mode, args)
+        self.limits = limits
+        self.on_done = on_done
+        self.previous = None
+        self.baseline = {}
+        self.samples = {"psi_some": [], "rq_wait": []}
+        self.active = False
+        self._watch_from = None
+        self._baseline_ticks = 0
+
+    def start(self):
+        core = self.core
+        self.active = True
+        if core.state is None:
+            core.refresh(log=False)
+            self._refuse("the current scheduler isn't known yet")
+            return
+        core.start_telemetry()
+        if baseline_ready(core):
+            self._apply()
+        else:
+            core.log("guard", f"Taking a {BASELINE_SAMPLES}-sample baseline before switching")
+            core.connect("telemetry", self._on_baseline)
+
+    def _on_baseline(self, values):
+        # The first sample has no rates yet, and some metrics may never come
+        self._baseline_ticks += 1
+        if baseline_ready(self.core) or self._baseline_ticks > BASELINE_SAMPLES:
+            self.core.disconnect("telemetry", self._on_baseline)
+            self._apply()
+
+    def _apply(self):
+        core = self.core
+        # May have changed while the baseline was taken
+        self.previous = core.state
+        if self.previous is None:
+            self._refuse("the current scheduler isn't known")
+            return
+        self.baseline = baseline_metrics(core)
+        if not self.baseline:
+            self._refuse("no CPU pressure, run-queue wait or latency to compare against")
+            return
+        core.log("guard", f"Baseline: {_describe(self.baseline)}")
+        core.apply(*self.target, callback=self._applied)
+
+    def _refuse(self, reason):
+        self.core.log("guard", f"❌ Not switching to {self.target[0]} with a guard: {reason}")
+        self._finish(False)
+
+    def cancel(self):
+        if self.active:
+            if self._watch_from is None:
+                self.core.log("guard", f"Cancelled the guarded switch to {self.target[0]}")
+            else:
+                self.core.log("guard", "Stopped watching; keeping the current scheduler")
+            self._finish(False)
+
+    def _applied(self, output, error):
+        if not self.active:
+            return
+        if error:
+            # Nothing changed, so nothing to roll back
+            self._finish(False)
+            return
+        self._watch_from = time.monotonic()
+        self.core.connect("telemetry", self._on_telemetry)
+        self.core.connect("state", self._on_state)
+        self.core.log("guard", f"Watching {self.target[0]} for {self.limits.window:.0f}s")
+
+    def _on_state(self, state):
+        if self.target[0] == "default":
+            if state.running:
+                self.core.log("guard", f"{state.scheduler} was started; not rolling back")
+                self._finish(False)
+        elif state.running and state.scheduler != self.target[0]:
+            # Someone else switched; theirs to keep
+            self.core.log("guard", f"{state.scheduler} replaced {self.target[0]}; not rolling back")
+            self._finish(False)
+        elif not state.running:
+            self._rollback(f"{self.target[0]} exited")
+
+    def _on_telemetry(self, values):
+        telemetry = self.core.telemetry
+        if telemetry is not None and telemetry.scx_state == "disabled" and self.target[0] != "default":
+            self._rollback(f"sched_ext is disabled, {self.target[0]} exited")
+            return
+        for name in self.samples:
+            if name in values:
+                self.samples[name].append(values[name])
+        if time.monotonic() - self._watch_from < self.limits.window:
+            return
+
+        after = {name: _mean(v) for name, v in self.samples.items() if v}
+        epoch = self.core.latency.current if self.core.probe is not None else None
+        if epoch is not None and epoch.histogram.count >= MIN_LATENCY_SAMPLES:
+            after["latency_p99"] = epoch.histogram.percentile(99)
+        reasons = find_regressions(self.baseline, after, self.limits)
+        if reasons:
+            self._rollback("; ".join(reasons))
+        else:
+            self.core.log("guard", f"✅ Keeping {self.target[0]}: {_describe(after)}")
+            self._finish(False)
+
+    def _rollback(self, reason):
+        if not self.active:
+            return
+        previous = self.previous
+        self.core.log("guard", f"⚠️ Rolling back: {reason}")
+        self._finish(True)
+        if previous.running:
+            self.core.apply(previous.scheduler, previous.mode, shlex.join(previous.args))
+        else:
+            self.core.stop()
+
+    def _finish(self, rolled_back):
+        self.active = False
+        self.core.disconnect("telemetry", self._on_baseline)
+        self.core.disconnect("telemetry", self._on_telemetry)
+        self.core.disconnect("state", self._on_state)
+        if self.on_done is not None:
+            self.on_done(rolled_back)
@@ -0,0 +1,351 @@
+"""Per-CPU load over time, laid out by cache topology, as one image.
+
+Rows are online CPUs grouped by package and last-level cache (LLC), with
+a separator row between LLC domains; columns are the last HISTORY
+samples, newest on the right. Everything per CPU is a NumPy array: the
+/proc/stat and /proc/schedstat counters are parsed into one matrix each,
+deltas and colours are whole-array operations, and the result is a
+single 32-bit pixel buffer the frontends blit scaled. That keeps it
+cheap on hosts with hundreds of CPUs.
+
+NumPy is optional: without it ``HAVE_NUMPY`` is False and the frontends
+leave the heatmap out.
+"""
+
+import glob
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+from .sysfs import SysfsFile, read_sysfs
+from .telemetry import DEFAULT_INTERVAL, HISTORY, MIN_INTERVAL, SCHEDSTAT_PATH
+
+CPU_SYSFS = "/sys/devices/system/cpu"
+STAT_PATH = "/proc/stat"
+
+# name -> (label, unit, fixed top of the colour scale or None to autoscale)
+HEATMAP_METRICS = {
+    "busy": ("CPU busy", "%", 100.0),
+    "rq_wait": ("Run-queue wait", "ms/s", None),
+    "timeslices": ("Timeslices", "/s", None),
+}
+
+# Colour ramp stops (position, 0xRRGGBB): idle is dark, saturated is hot
+RAMP = ((0.0, 0x101830), (0.25, 0x1f4e9c), (0.5, 0x2196f3), (0.75, 0xffc107), (1.0, 0xf44336))
+NO_DATA = 0xff1e1e1e
+SEPARATOR = 0xff000000
+
+
+def parse_cpulist(text: str) -> list[int]:
+    """[0, 1, 2, 3, 8] from "0-3,8", as in sysfs cpu lists."""
+    cpus = []
+    for part in (text or "").strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def _read_int(path: str, default: int) -> int:
+    try:
+        return int(read_sysfs(path))
+    except (TypeError, ValueError):
+        return default
+
+
+def _llc_of(cpu_dir: str) -> tuple[int, str] | None:
+    """(lowest CPU sharing it, its cpu list) for the CPU's last-level cache."""
+    best = None
+    for index in glob.glob(os.path.join(cpu_dir, "cache", "index*")):
+        if read_sysfs(os.path.join(index, "type")) == "Instruction":
+            continue
+        level = _read_int(os.path.join(index, "level"), -1)
+        shared = read_sysfs(os.path.join(index, "shared_cpu_list"))
+        if shared and (best is None or level > best[0]):
+            best = (level, shared)
+    if best is None:
+        return None
+    return min(parse_cpulist(best[1])), best[1]
+
+
+class Topology:
+    """Online CPUs in drawing order, with their LLC domains.
+
+    ``cpus`` is the CPU id of each row; ``domains`` is one
+    ``(label, start, stop)`` per LLC, covering consecutive rows.
+    """
+
+    def __init__(self, cpus: list[tuple[int, int, int, int]], llc_lists: dict[int, str]):
+        # (package, llc, core, cpu), sorted so each LLC is contiguous
+        cpus = sorted(cpus)
+        self.cpus = np.array([cpu for *_, cpu in cpus], dtype=np.int64)
+        self.package = np.array([package for package, *_ in cpus], dtype=np.int64)
+        self.domains = []
+        start = 0
+        for i in range(1, len(cpus) + 1):
+            if i == len(cpus) or cpus[i][:2] != cpus[start][:2]:
+                package, llc = cpus[start][:2]
+                self.domains.append((f"package {package}, LLC {llc_lists.get(llc, llc)}", start, i))
+                start = i
+        # CPU id -> row, -1 for CPUs we don't know about
+        self.row_of = np.full(int(self.cpus.max(initial=0)) + 1, -1, dtype=np.int64)
+        self.row_of[self.cpus] = np.arange(len(self.cpus))
+        # Image row -> CPU row, with -1 for the separators between domains
+        rows = []
+        for _, start, stop in self.domains:
+            if rows:
+                rows.append(-1)
+            rows.extend(range(start, stop))
+        self.image_rows = np.array(rows, dtype=np.int64)
+        self.domain_starts = np.array([start for _, start, _ in self.domains], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.cpus)
+
+    def domain_of(self, row: int) -> str:
+        for label, start, stop in self.domains:
+            if start <= row < stop:
+                return label
+        return ""
+
+
+def read_topology(root: str = CPU_SYSFS) -> Topology:
+    online = parse_cpulist(read_sysfs(os.path.join(root, "online")) or "")
+    if not online:
+        online = sorted(int(path.rsplit("cpu", 1)[1]) for path in
+                        glob.glob(os.path.join(root, "cpu[0-9]*")))
+    cpus = []
+    llc_lists = {}
+    for cpu in online:
+        cpu_dir = os.path.join(root, f"cpu{cpu}")
+        package = _read_int(os.path.join(cpu_dir, "topology", "physical_package_id"), 0)
+        core = _read_int(os.path.join(cpu_dir, "topology", "core_id"), cpu)
+        llc = _llc_of(cpu_dir)
+        if llc is None:
+            # No cache info (some VMs): one domain per package
+            llc = (-1 - package, f"{package}")
+        llc_lists[llc[0]] = llc[1]
+        cpus.append((package, llc[0], core, cpu))
+    return Topology(cpus, llc_lists)
+
+
+_topology = None
+
+
+def topology(refresh: bool = False) -> Topology:
+    """The cached Topology; sysfs is only walked again after a CPU hotplug."""
+    global _topology
+    if _topology is None or refresh:
+        _topology = read_topology()
+    return _topology
+
+
+def cpu_rows(text: str):
+    """(CPU ids, counter matrix) from the cpuN lines of /proc/stat or /proc/schedstat."""
+    lines = [line for line in text.splitlines() if line.startswith("cpu") and line[3:4].isdigit()]
+    if not lines:
+        return None, None
+    fields = np.array(" ".join(lines).split()).reshape(len(lines), -1)
+    ids = np.char.lstrip(fields[:, 0], "cpu").astype(np.int64)
+    return ids, fields[:, 1:].astype(np.int64)
+
+
+def make_palette(stops=RAMP, size: int = 256):
+    """``size`` opaque 0xffRRGGBB colours interpolated along ``stops``."""
+    at = np.linspace(0.0, 1.0, size)
+    positions = [p for p, _ in stops]
+    channels = [np.interp(at, positions, [(colour >> shift) & 0xff for _, colour in stops])
+                for shift in (16, 8, 0)]
+    r, g, b = (np.rint(c).astype(np.uint32) for c in channels)
+    return 0xff000000 | (r << 16) | (g << 8) | b
+
+
+class CpuSamples:
+    """Per-CPU rates over time, in Topology row order.
+
+    ``sample()`` is not thread-safe; HeatmapSampler calls it from its own
+    thread and the frontends only read, once told a sample is in.
+    """
+
+    def __init__(self, history: int = HISTORY):
+        self.history = history
+        self.palette = make_palette()
+        self._files = {path: SysfsFile(path) for path in (STAT_PATH, SCHEDSTAT_PATH)}
+        self._reset(topology())
+
+    def _reset(self, topo: Topology):
+        self.topology = topo
+        n = len(topo)
+        self.values = {name: np.full((n, self.history), np.nan, dtype=np.float32)
+                       for name in HEATMAP_METRICS}
+        self.count = 0
+        self._pos = 0
+        self._prev = {}
+        self._prev_time = None
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+    def _in_rows(self, path: str):
+        """The file's counters with one row per Topology row, or None."""
+        text = self._files[path].read()
+        if not text:
+            return None
+        ids, counters = cpu_rows(text)
+        if ids is None:
+            return None
+        topo = self.topology
+        rows = topo.row_of[ids] if ids.max() < len(topo.row_of) else None
+        if rows is None or len(ids) != len(topo) or (rows < 0).any():
+            # A CPU came or went: new layout, and no deltas across it
+            self._reset(topology(refresh=True))
+            return None
+        ordered = np.empty_like(counters)
+        ordered[rows] = counters
+        return ordered
+
+    def _delta(self, key, counters):
+        prev = self._prev.get(key)
+        self._prev[key] = counters
+        if prev is None or prev.shape != counters.shape:
+            return None
+        # A counter going backwards (CPU reset) counts as no activity
+        return np.maximum(counters - prev, 0)
+
+    def sample(self, now: float) -> bool:
+        """Take a sample; False until there are two to diff."""
+        dt = now - self._prev_time if self._prev_time is not None else None
+        self._prev_time = now
+        topo = self.topology
+        stat = self._in_rows(STAT_PATH)
+        schedstat = self._in_rows(SCHEDSTAT_PATH)
+        if self.topology is not topo:
+            return False
+        columns = {}
+
+        if stat is not None:
+            # user nice system idle iowait irq softirq steal (guest is in user)
+            delta = self._delta("stat", stat[:, :8])
+            if delta is not None:
+                total = delta.sum(axis=1)
+                idle = delta[:, 3] + delta[:, 4]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    columns["busy"] = np.where(total > 0, 100.0 * (1.0 - idle / total), np.nan)
+
+        if schedstat is not None and schedstat.shape[1] >= 9:
+            # ... run_ns wait_ns timeslices, the last three fields
+            delta = self._delta("schedstat", schedstat[:, 6:9])
+            if delta is not None and dt:
+                columns["rq_wait"] = delta[:, 1] / dt / 1e6
+                columns["timeslices"] = delta[:, 2] / dt
+
+        if not columns or dt is None:
+            return False
+        for name, values in self.values.items():
+            values[:, self._pos] = columns.get(name, np.nan)
+        self._pos = (self._pos + 1) % self.history
+        self.count = min(self.count + 1, self.history)
+        return True
+
+    def series(self, name: str):
+        """(CPUs, history) matrix, oldest column first, NaN where not sampled yet."""
+        values = self.values[name]
+        return np.concatenate((values[:, self._pos:], values[:, :self._pos]), axis=1)
+
+    def latest(self, name: str):
+        """The newest column, one value per Topology row."""
+        return self.values[name][:, self._pos - 1]
+
+    def scale(self, name: str) -> float:
+        """Top of the colour scale: fixed for percentages, else the visible peak."""
+        top = HEATMAP_METRICS[name][2]
+        if top is not None:
+            return top
+        values = self.values[name]
+        values = values[~np.isnan(values)]
+        peak = float(values.max()) if values.size else 0.0
+        return peak if peak > 0 else 1.0
+
+    def image(self, name: str):
+        """0xffRRGGBB pixels, rows by topology (plus separators), as a C-contiguous uint32 array.
+
+        Both QImage.Format_RGB32 and cairo FORMAT_RGB24 take it as is.
+        """
+        values = self.series(name)
+        levels = np.clip(values / self.scale(name), 0.0, 1.0) * (len(self.palette) - 1)
+        pixels = np.where(np.isnan(values), NO_DATA,
+                          self.palette[np.nan_to_num(levels).astype(np.intp)]).astype(np.uint32)
+        rows = self.topology.image_rows
+        image = pixels[np.maximum(rows, 0)]
+        image[rows < 0] = SEPARATOR
+        return np.ascontiguousarray(image)
+
+    def domain_means(self, name: str):
+        """Mean of the latest values per LLC domain, in ``topology.domains`` order."""
+        latest = np.nan_to_num(self.latest(name))
+        sizes = np.diff(np.append(self.topology.domain_starts, len(latest)))
+        return np.add.reduceat(latest, self.topology.domain_starts) / sizes
+
+    def describe(self, name: str, image_row: int) -> str | None:
+        """Tooltip text for an image row: the CPU, its domain and latest value."""
+        rows = self.topology.image_rows
+        if not 0 <= image_row < len(rows) or rows[image_row] < 0:
+            return None
+        row = int(rows[image_row])
+        label, unit, _ = HEATMAP_METRICS[name]
+        value = self.latest(name)[row]
+        text = f"{value:,.1f} {unit}" if value == value else "-"
+        return f"CPU {self.topology.cpus[row]} ({self.topology.domain_of(row)})\n{label}: {text}"
+
+    def summary(self, name: str) -> str:
+        """One line on how evenly the latest sample is spread across LLC domains."""
+        if not self.count:
+            return "Sampling…"
+        label, unit, _ = HEATMAP_METRICS[name]
+        if np.isnan(self.latest(name)).all():
+            # e.g. /proc/schedstat needs CONFIG_SCHEDSTATS
+            return f"{label}: not available on this system"
+        means = self.domain_means(name)
+        text = f"{len(self.topology)} CPUs in {len(means)} LLC domains"
+        if len(means) > 1:
+            busiest, idlest = int(np.argmax(means)), int(np.argmin(means))
+            text += (f" · busiest: {self.topology.domains[busiest][0]} {means[busiest]:,.1f} {unit}"
+                     f" · idlest: {self.topology.domains[idlest][0]} {means[idlest]:,.1f} {unit}")
+        else:
+            text += f" · mean {means[0]:,.1f} {unit}"
+        return text
+
+
+class HeatmapSampler:
+    """Runs CpuSamples on a background thread and reports each sample."""
+
+    def __init__(self, on_sample, interval: float = DEFAULT_INTERVAL, history: int = HISTORY):
+        self.on_sample = on_sample
+        self.interval = max(interval, MIN_INTERVAL)
+        self.samples = CpuSamples(history)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-heatmap")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.samples.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.samples.sample(time.monotonic()):
+                self.on_sample(self.samples)
+            self._stop.wait(self.interval)
@@ -0,0 +1,372 @@
+"""Persistent history of scheduler changes and sampled metrics, in SQLite.
+
+Every start/switch/stop, ours or one noticed from outside, goes into
+``events`` with its arguments and outcome. Metrics are kept at three
+resolutions (raw samples, 10 s and 1 min buckets), each row holding
+count, sum, min and max so a bucket rolls up into a coarser one exactly.
+Every tier has its own retention, so the file stops growing.
+
+Samples are keyed (tier, metric, time) in a WITHOUT ROWID table: a range
+query is one index seek plus a sequential read, and the tier is picked so
+that even weeks of history come back as a few thousand rows.
+
+The GUI thread only appends to a list; HistoryRecorder writes batches
+from its own thread, which only exists once there is something to record
+and sleeps while nothing comes in. Readers open their own connection (the file is in
+WAL mode, so they never wait for the writer).
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+from .telemetry import METRICS
+
+SCHEMA_VERSION = 1
+FLUSH_INTERVAL = 5.0
+# A bucket is only rolled up once samples for it can't still be buffered,
+# here or in another recorder (the GUI and the rules daemon share the file)
+ROLLUP_DELAY = 2 * FLUSH_INTERVAL
+EXPIRE_INTERVAL = 3600
+MAX_POINTS = 1000
+
+# (bucket seconds, retention seconds); bucket 0 is the raw samples
+TIERS = ((0, 86400), (10, 7 * 86400), (60, 90 * 86400))
+
+# name -> (label, unit) for what gets recorded beyond the telemetry METRICS
+LATENCY_METRICS = {
+    "latency_p50": ("Wakeup latency p50", "µs"),
+    "latency_p99": ("Wakeup latency p99", "µs"),
+    "latency_max": ("Wakeup latency max", "µs"),
+}
+HISTORY_METRICS = {**METRICS, **LATENCY_METRICS}
+
+# (label, seconds) for the ranges the GUIs offer
+RANGES = (("1 hour", 3600), ("6 hours", 6 * 3600), ("1 day", 86400), ("1 week", 7 * 86400),
+          ("30 days", 30 * 86400), ("90 days", 90 * 86400))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS samples (
+    tier INTEGER NOT NULL, metric INTEGER NOT NULL, time INTEGER NOT NULL,
+    count INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL,
+    PRIMARY KEY (tier, metric, time)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    time INTEGER NOT NULL, kind TEXT NOT NULL, scheduler TEXT, mode TEXT, args TEXT,
+    ok INTEGER NOT NULL, detail TEXT);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER) WITHOUT ROWID;
+"""
+
+
+def history_path() -> str:
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "scxctl_gui", "history.sqlite")
+
+
+class HistoryEvent(NamedTuple):
+    time: float
+    kind: str  # "start", "switch", "stop" or "external"
+    scheduler: str | None
+    mode: str | None
+    args: str | None
+    ok: bool
+    detail: str | None
+
+    def format(self) -> str:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        what = " ".join(part for part in (self.kind, self.scheduler, self.mode and f"({self.mode})",
+                                          self.args) if part)
+        outcome = "" if self.ok else "❌ "
+        return f"{stamp} {outcome}{what}" + (f": {self.detail}" if self.detail else "")
+
+
+class Point(NamedTuple):
+    time: float
+    mean: float
+    min: float
+    max: float
+
+
+def _ms(seconds: float) -> int:
+    return int(seconds * 1000)
+
+
+class HistoryStore:
+    """One connection to the history file. Not shared between threads."""
+
+    def __init__(self, path: str | None = None, readonly: bool = False):
+        self.path = path or history_path()
+        if readonly:
+            self.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.db = sqlite3.connect(self.path)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            with self.db:
+                self.db.executescript(SCHEMA)
+                self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._metric_ids = {name: id for id, name in self.db.execute("SELECT id, name FROM metrics")}
+
+    def close(self):
+        self.db.close()
+
+    # Writing
+
+    def _metric_id(self, name: str) -> int:
+        id = self._metric_ids.get(name)
+        if id is None:
+            id = self.db.execute("INSERT INTO metrics (name) VALUES (?)", (name,)).lastrowid
+            self._metric_ids[name] = id
+        return id
+
+    def write(self, samples: list[tuple[float, str, float]], events: list[HistoryEvent]):
+        """Adds raw ``(time, metric, value)`` samples and events in one transaction."""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO samples VALUES (0, ?, ?, 1, ?, ?, ?)",
+                [(self._metric_id(name), _ms(when), value, value, value) for when, name, value in samples])
+            self.db.executemany(
+                "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(_ms(e.time), e.kind, e.scheduler, e.mode, e.args, int(e.ok), e.detail) for e in events])
+
+    def roll_up(self, now: float):
+        """Folds every finished bucket into the next coarser tier."""
+        with self.db:
+            for (source, _), (bucket, _) in zip(TIERS, TIERS[1:]):
+                size = bucket * 1000
+                key = f"rolled_{bucket}"
+                row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                start = row[0] if row else 0
+                end = _ms(now - ROLLUP_DELAY) // size * size
+                if end <= start:
+                    continue
+                # Per metric, so every statement is a range on the primary key
+                for id in self._metric_ids.values():
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO samples "
+                        "SELECT ?, metric, time / ? * ?, sum(count), sum(sum), min(min), max(max) "
+                        "FROM samples WHERE tier = ? AND metric = ? AND time >= ? AND time < ? "
+                        "GROUP BY time / ?",
+                        (bucket, size, size, source, id, start, end, size))
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, end))
+
+    def expire(self, now: float):
+        """Drops what every tier has kept past its retention."""
+        with self.db:
+            for bucket, retention in TIERS:
+                cutoff = _ms(now - retention)
+                for id in self._metric_ids.values():
+                    self.db.execute("DELETE FROM samples WHERE tier = ? AND metric = ? AND time < ?",
+                                    (bucket, id, cutoff))
+            self.db.execute("DELETE FROM events WHERE time < ?", (_ms(now - TIERS[-1][1]),))
+
+    # Reading
+
+    def metrics(self) -> list[str]:
+        return sorted(self._metric_ids)
+
+    def query(self, metric: str, start: float, end: float, points: int = MAX_POINTS,
+              now: float | None = None) -> list[Point]:
+        """``metric`` between two Unix times, as at most about ``points`` points.
+
+        Reads the coarsest tier that is still at least as fine as one
+        point, among those that go back to ``start``, and groups whatever
+        is denser than that in SQL.
+        """
+        id = self._metric_ids.get(metric)
+        if id is None or end <= start:
+            return []
+        now = time.time() if now is None else now
+        step = max(_ms(end - start) // max(points, 1), 1)
+        covering = [tier for tier in TIERS if start >= now - tier[1]] or [TIERS[-1]]
+        fine_enough = [tier for tier in covering if tier[0] * 1000 <= step]
+        bucket = (fine_enough[-1] if fine_enough else covering[0])[0]
+        step = max(step, bucket * 1000)
+        rows = self.db.execute(
+            "SELECT time / ? * ? AS t, sum(sum) / sum(count), min(min), max(max) FROM samples "
+            "WHERE tier = ? AND metric = ? AND time >= ? AND time < ? GROUP BY t ORDER BY t",
+            (step, step, bucket, id, _ms(start), _ms(end)))
+        return [Point(t / 1000, mean, lo, hi) for t, mean, lo, hi in rows]
+
+    def events(self, start: float, end: float, limit: int = 10000) -> list[HistoryEvent]:
+        rows = self.db.execute(
+            "SELECT * FROM events WHERE time >= ? AND time < ? ORDER BY time LIMIT ?",
+            (_ms(start), _ms(end), limit))
+        return [HistoryEvent(t / 1000, kind, scheduler, mode, args, bool(ok), detail)
+                for t, kind, scheduler, mode, args, ok, detail in rows]
+
+
+class HistoryRecorder:
+    """Collects samples and events from any thread; a background thread stores them.
+
+    Raises sqlite3.Error or OSError from the constructor if the file
+    can't be opened.
+    """
+
+    def __init__(self, path: str | None = None, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path or history_path()
+        self.flush_interval = flush_interval
+        # Once here, so a broken file is reported to whoever creates us;
+        # sqlite3 connections then stay on the thread that opened them
+        HistoryStore(self.path).close()
+        self._samples = []
+        self._events = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._started = False
+        self._thread = None
+        # Until then the last samples still have buckets to roll up
+        self._rollup_until = None
+        self._expired = 0.0
+        self.error = None
+
+    def start(self):
+        # The thread comes with the first sample or event
+        with self._lock:
+            self._started = True
+            if self._samples or self._events:
+                self._added()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def add_samples(self, values: dict[str, float], when: float | None = None):
+        when = time.time() if when is None else when
+        with self._lock:
+            self._samples.extend((when, name, value) for name, value in values.items())
+            self._added()
+
+    def add_event(self, kind: str, scheduler: str | None = None, mode: str | None = None,
+                  args: str | None = None, ok: bool = True, detail: str | None = None):
+        with self._lock:
+            self._events.append(HistoryEvent(time.time(), kind, scheduler, mode, args or None, ok, detail))
+            self._added()
+
+    def _added(self):
+        if self._thread is None and self._started and not self._stop.is_set():
+            self._thread = threading.Thread(target=self._run, daemon=True, name="scx-history")
+            self._thread.start()
+        self._wake.set()
+
+    def _flush(self, store):
+        with self._lock:
+            samples, self._samples = self._samples, []
+            events, self._events = self._events, []
+            self._wake.clear()
+        now = time.time()
+        if samples or events:
+            store.write(samples, events)
+        if samples:
+            # The last of them reach the coarsest tier once its bucket is over
+            self._rollup_until = max(when for when, _, _ in samples) + TIERS[-1][0] + ROLLUP_DELAY
+        if self._rollup_until is not None:
+            store.roll_up(now)
+            if now >= self._rollup_until:
+                self._rollup_until = None
+        if now - self._expired >= EXPIRE_INTERVAL:
+            store.expire(now)
+            self._expired = now
+
+    def _run(self):
+        store = HistoryStore(self.path)
+        try:
+            while not self._stop.is_set():
+                # Asleep until something comes in or a roll-up is due
+                timeout = None if self._rollup_until is None else max(self._rollup_until - time.time(), 0)
+                self._wake.wait(timeout)
+                # Then gather a batch
+                self._stop.wait(self.flush_interval)
+                self._flush(store)
+            self._flush(store)
+        except sqlite3.Error as e:
+            # e.g. the disk filled up; stop recording rather than pile up
+            self.error = e
+        finally:
+            store.close()
+
+
+def read_range(metric: str, start: float, end: float, points: int = MAX_POINTS,
+               path: str | None = None) -> tuple[list[Point], list[HistoryEvent]] | None:
+    """(points, events) for a chart, or None if there is no readable history yet."""
+    try:
+        store = HistoryStore(path, readonly=True)
+        try:
+            return store.query(metric, start, end, points), store.events(start, end)
+        finally:
+            store.close()
+    except sqlite3.Error:
+        return None
+
+
+def split_gaps(points: list[Point], span: float, wanted: int = MAX_POINTS) -> list[list[Point]]:
+    """``points`` cut wherever nothing was recorded for a while, so a chart
+    doesn't draw a line across the time the GUI wasn't running."""
+    gap = 3 * span / max(wanted, 1)
+    runs = []
+    for point in points:
+        if not runs or point.time - runs[-1][-1].time > max(gap, 3 * TIERS[1][0]):
+            runs.append([])
+        runs[-1].append(point)
+    return runs
+
+
+def describe_range(metric: str, points: list[Point], events: list[HistoryEvent]) -> str:
+    changes = f"{len(events)} scheduler change{'s' if len(events) != 1 else ''}"
+    label, unit = HISTORY_METRICS.get(metric, (metric, ""))
+    if not points:
+        return f"{label}: nothing recorded in this range; {changes}"
+    mean = sum(point.mean for point in points) / len(points)
+    peak = max(point.max for point in points)
+    return f"{label}: mean {mean:,.2f} {unit} · peak {peak:,.2f} {unit}; {changes}"
+
+
+def parse_duration(text: str) -> float:
+    """Seconds from "90", "30m", "12h", "7d" or "2w"."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python3 -m scxctl_core.history",
+                                     description="Show recorded scheduler changes and metrics.")
+    parser.add_argument("--file", help=f"history file (default {history_path()})")
+    parser.add_argument("--since", default="1d", type=parse_duration,
+                        help="how far back, e.g. 30m, 12h, 7d (default 1d)")
+    parser.add_argument("--points", type=int, default=60, help="points per metric (default 60)")
+    parser.add_argument("metric", nargs="*", help="metrics to show; none lists events and metrics")
+    args = parser.parse_args(argv)
+
+    try:
+        store = HistoryStore(args.file, readonly=True)
+    except sqlite3.Error as e:
+        print(f"Can't open {args.file or history_path()}: {e}", file=sys.stderr)
+        return 1
+    end = time.time()
+    start = end - args.since
+    if not args.metric:
+        for event in store.events(start, end):
+            print(event.format())
+        print(f"\nmetrics: {', '.join(store.metrics()) or 'none yet'}")
+        return 0
+    for metric in args.metric:
+        print(f"{metric}:")
+        for point in store.query(metric, start, end, args.points):
+            stamp = time.strftime("%m-%d %H:%M:%S", time.localtime(point.time))
+            print(f"  {stamp}  mean {point.mean:12.3f}  min {point.min:12.3f}  max {point.max:12.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Direct D-Bus access to scx_loader (the service scxctl itself talks to).
+
+jeepney is optional: without it, or without a reachable loader,
+``open_loader`` returns None and the frontends fall back to scxctl.
+"""
+
+import os
+import shlex
+
+try:
+    from jeepney import DBusAddress, MatchRule, Properties, message_bus, new_method_call
+    from jeepney.io.threading import DBusRouter, RouterClosed, open_dbus_connection
+    from jeepney.low_level import MessageFlag
+    from jeepney.wrappers import DBusErrorResponse, unwrap_msg
+    HAVE_JEEPNEY = True
+except ImportError:
+    HAVE_JEEPNEY = False
+
+from .backend import BackendError
+from .state import MODES, SchedulerState, strip_scx_prefix
+
+BUS_NAME = "org.scx.Loader"
+OBJECT_PATH = "/org/scx/Loader"
+INTERFACE = "org.scx.Loader"
+PROPS_INTERFACE = "org.freedesktop.DBus.Properties"
+
+# Seconds. Actions may sit behind an interactive polkit prompt.
+READ_TIMEOUT = 5
+ACTION_TIMEOUT = 120
+
+
+class LoaderError(BackendError):
+    pass
+
+
+class LoaderClient:
+    """Blocking client over one persistent bus connection.
+
+    Calls are thread-safe; replies are matched by a jeepney router thread.
+    """
+
+    name = "dbus"
+
+    def __init__(self, bus: str = "SYSTEM"):
+        if not HAVE_JEEPNEY:
+            raise LoaderError("jeepney is not installed")
+        try:
+            self._conn = open_dbus_connection(bus=bus)
+        except (OSError, ValueError, KeyError) as e:
+            raise LoaderError(f"cannot connect to the {bus.lower()} bus: {e}") from e
+        self._router = DBusRouter(self._conn)
+        self._addr = DBusAddress(OBJECT_PATH, bus_name=BUS_NAME, interface=INTERFACE)
+        self._props = Properties(self._addr)
+
+    def close(self):
+        self._router.close()
+        self._conn.close()
+
+    def cancel(self):
+        # A D-Bus request can't be taken back; SchedulerCore drops the reply
+        pass
+
+    def _call(self, msg, timeout=READ_TIMEOUT):
+        try:
+            return unwrap_msg(self._router.send_and_get_reply(msg, timeout=timeout))
+        except DBusErrorResponse as e:
+            detail = e.data[0] if e.data and isinstance(e.data[0], str) else e.name
+            raise LoaderError(detail) from e
+        except TimeoutError as e:
+            raise LoaderError(f"scx_loader did not answer within {timeout}s") from e
+        except (OSError, RouterClosed) as e:
+            raise LoaderError(f"lost connection to scx_loader: {e}") from e
+
+    def _method(self, name, signature=None, body=(), timeout=ACTION_TIMEOUT):
+        msg = new_method_call(self._addr, name, signature, body)
+        # Let scx_loader raise a polkit prompt instead of refusing outright
+        msg.header.flags |= MessageFlag.allow_interactive_authorization
+        return self._call(msg, timeout)
+
+    def subscribe(self, queue):
+        """Route the loader's PropertiesChanged signals into ``queue``.
+
+        Returns a handle whose ``close()`` stops the routing.
+        """
+        # The bus matches on the well-known name, so this survives loader
+        # restarts; locally, signals only carry the unique name, so leave
+        # the sender out there.
+        rule = dict(type="signal", path=OBJECT_PATH, interface=PROPS_INTERFACE,
+                    member="PropertiesChanged")
+        self._call(message_bus.AddMatch(MatchRule(sender=BUS_NAME, **rule)))
+        return self._router.filter(MatchRule(**rule), queue=queue)
+
+    def get_state(self) -> SchedulerState:
+        props = self._call(self._props.get_all())[0]
+        return state_from_properties(props)
+
+    def supported_schedulers(self) -> list[str]:
+        _, value = self._call(self._props.get("SupportedSchedulers"))[0]
+        return [strip_scx_prefix(s) for s in value]
+
+    def start(self, scheduler: str, mode: str | None = None, args: str = "") -> str:
+        return self._start_or_switch("Start", scheduler, mode, args)
+
+    def switch(self, scheduler: str, mode: str | None = None, args: str = "") -> str:
+        return self._start_or_switch("Switch", scheduler, mode, args)
+
+    def stop(self) -> str:
+        self._method("StopScheduler")
+        return "stopped scheduler"
+
+    def _start_or_switch(self, verb, scheduler, mode, args):
+        name = "scx_" + strip_scx_prefix(scheduler)
+        done = {"Start": "started", "Switch": "switched to"}[verb]
+        # Like scxctl: explicit arguments replace the mode preset
+        if args:
+            argv = shlex.split(args)
+            self._method(f"{verb}SchedulerWithArgs", "sas", (name, argv))
+            return f"{done} {scheduler} with arguments \"{args}\""
+        mode = (mode or MODES[0]).lower()
+        if mode not in MODES:
+            raise LoaderError(f"unknown mode: {mode}")
+        self._method(f"{verb}Scheduler", "su", (name, MODES.index(mode)))
+        return f"{done} {scheduler} in {mode} mode"
+
+
+def state_from_properties(props: dict) -> SchedulerState:
+    """Build a state from an org.scx.Loader a{sv} property dict."""
+    current = props.get("CurrentScheduler", ("s", "unknown"))[1]
+    if not current or current == "unknown":
+        return SchedulerState()
+    mode_idx = props.get("SchedulerMode", ("u", 0))[1]
+    mode = MODES[mode_idx] if 0 <= mode_idx < len(MODES) else None
+    args = tuple(props.get("CurrentSchedulerArgs", ("as", []))[1])
+    return SchedulerState(strip_scx_prefix(current), None if args else mode, args)
+
+
+def open_loader():
+    """Connect to scx_loader, or return None when only scxctl is usable.
+
+    SCXCTL_GUI_BACKEND=scxctl forces the fallback; SCXCTL_GUI_BUS selects
+    another bus (e.g. ``session`` for scxctl_core.mock_loader).
+    """
+    if not HAVE_JEEPNEY or os.environ.get("SCXCTL_GUI_BACKEND") == "scxctl":
+        return None
+    bus = os.environ.get("SCXCTL_GUI_BUS", "SYSTEM")
+    if bus.lower() in ("system", "session"):
+        bus = bus.upper()
+    try:
+        client = LoaderClient(bus)
+    except LoaderError:
+        return None
+    try:
+        client.get_state()
+    except LoaderError:
+        client.close()
+        return None
+    return client
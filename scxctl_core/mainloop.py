@@ -0,0 +1,63 @@
+import heapq
+import itertools
+import queue
+import time
+
+_QUIT = object()
+
+
+class Timer:
+    def __init__(self, when, fn):
+        self.when = when
+        self.fn = fn
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class MainLoop:
+    """Minimal loop for running SchedulerCore without a GUI toolkit.
+
+    ``dispatch`` is thread-safe, and safe from signal handlers too, and is
+    what SchedulerCore expects; the frontends pass their toolkit's
+    equivalent instead.
+    """
+
+    def __init__(self):
+        # SimpleQueue.put is reentrant, unlike Queue.put
+        self._queue = queue.SimpleQueue()
+        self._timers = []
+        self._seq = itertools.count()
+
+    def dispatch(self, fn):
+        self._queue.put(fn)
+
+    def call_later(self, delay: float, fn) -> Timer:
+        """Run ``fn`` on the loop after ``delay`` seconds. Loop thread only."""
+        timer = Timer(time.monotonic() + delay, fn)
+        heapq.heappush(self._timers, (timer.when, next(self._seq), timer))
+        return timer
+
+    def quit(self):
+        self._queue.put(_QUIT)
+
+    def run(self):
+        while True:
+            timeout = None
+            if self._timers:
+                timeout = max(0.0, self._timers[0][0] - time.monotonic())
+            try:
+                fn = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                fn = None
+            if fn is _QUIT:
+                return
+            if fn is not None:
+                fn()
+
+            now = time.monotonic()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, timer = heapq.heappop(self._timers)
+                if not timer.cancelled:
+                    timer.fn()
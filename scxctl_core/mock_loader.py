@@ -0,0 +1,118 @@
+"""A stand-in org.scx.Loader service for working without sched_ext.
+
+    dbus-run-session -- sh -c 'python3 -m scxctl_core.mock_loader & \
+        SCXCTL_GUI_BUS=session python3 scxctl_gui_qt.py'
+
+It keeps state in memory and emits PropertiesChanged like the real loader.
+"""
+
+import argparse
+import time
+
+from jeepney import DBusAddress, MessageType, HeaderFields, new_error, new_method_return, new_signal
+from jeepney.bus_messages import message_bus
+from jeepney.io.blocking import open_dbus_connection
+
+from .loader import BUS_NAME, INTERFACE, OBJECT_PATH, PROPS_INTERFACE
+
+FAILED = "org.freedesktop.DBus.Error.Failed"
+
+
+class MockLoader:
+    def __init__(self, schedulers, delay=0.0):
+        self.schedulers = ["scx_" + s for s in schedulers]
+        self.delay = delay
+        self.current = "unknown"
+        self.mode = 0
+        self.args = []
+
+    def properties(self):
+        return {
+            "CurrentScheduler": ("s", self.current),
+            "SchedulerMode": ("u", self.mode),
+            "CurrentSchedulerArgs": ("as", self.args),
+            "SupportedSchedulers": ("as", self.schedulers),
+        }
+
+    def handle(self, msg):
+        """Return (reply, changed_property_names)."""
+        fields = msg.header.fields
+        iface = fields.get(HeaderFields.interface)
+        member = fields.get(HeaderFields.member)
+
+        if iface == PROPS_INTERFACE:
+            props = self.properties()
+            if member == "GetAll":
+                return new_method_return(msg, "a{sv}", (props,)), []
+            if member == "Get" and msg.body[1] in props:
+                return new_method_return(msg, "v", (props[msg.body[1]],)), []
+            return new_error(msg, "org.freedesktop.DBus.Error.UnknownProperty", "s", (str(msg.body),)), []
+
+        if iface != INTERFACE:
+            return new_error(msg, "org.freedesktop.DBus.Error.UnknownInterface", "s", (str(iface),)), []
+
+        before = self.properties()
+        time.sleep(self.delay)
+        if member == "StopScheduler":
+            self.current, self.mode, self.args = "unknown", 0, []
+        elif member in ("StartScheduler", "SwitchScheduler",
+                        "StartSchedulerWithArgs", "SwitchSchedulerWithArgs"):
+            name, extra = msg.body
+            if name not in self.schedulers:
+                return new_error(msg, FAILED, "s", (f"unsupported scheduler {name}",)), []
+            # Stricter than the real loader, to exercise callers' start/switch choice
+            running = self.current != "unknown"
+            if member.startswith("Start") and running:
+                return new_error(msg, FAILED, "s", ("a scheduler is already running",)), []
+            if member.startswith("Switch") and not running:
+                return new_error(msg, FAILED, "s", ("no scheduler is running",)), []
+            self.current = name
+            if member.endswith("WithArgs"):
+                self.mode, self.args = 0, list(extra)
+            else:
+                self.mode, self.args = extra, []
+        else:
+            return new_error(msg, "org.freedesktop.DBus.Error.UnknownMethod", "s", (str(member),)), []
+
+        after = self.properties()
+        changed = [k for k in after if after[k] != before[k]]
+        return new_method_return(msg), changed
+
+
+def serve(bus="SESSION", schedulers=("bpfland", "lavd", "rusty"), delay=0.0):
+    loader = MockLoader(schedulers, delay)
+    emitter = DBusAddress(OBJECT_PATH, interface=PROPS_INTERFACE)
+    with open_dbus_connection(bus=bus) as conn:
+        conn.send_and_get_reply(message_bus.RequestName(BUS_NAME))
+        print(f"mock scx_loader serving {BUS_NAME} on {conn.unique_name}", flush=True)
+        while True:
+            msg = conn.receive()
+            if msg.header.message_type != MessageType.method_call:
+                continue
+            if msg.header.fields.get(HeaderFields.path) != OBJECT_PATH:
+                conn.send(new_error(msg, "org.freedesktop.DBus.Error.UnknownObject"))
+                continue
+            reply, changed = loader.handle(msg)
+            conn.send(reply)
+            if changed:
+                props = loader.properties()
+                conn.send(new_signal(emitter, "PropertiesChanged", "sa{sv}as",
+                                     (INTERFACE, {k: props[k] for k in changed}, [])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bus", default="SESSION")
+    parser.add_argument("--schedulers", default="bpfland,lavd,rusty",
+                        help="comma-separated names without the scx_ prefix")
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="seconds each action takes, to mimic BPF load time")
+    opts = parser.parse_args()
+    try:
+        serve(opts.bus, opts.schedulers.split(","), opts.delay)
+    except (KeyboardInterrupt, ConnectionError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Always-on wakeup-latency probe, cyclictest style.
+
+A helper process (see worker.py) arms a periodic absolute timerfd and
+blocks in read(); each wakeup records how late it came, in microseconds,
+into a log-bucketed HDR-style histogram. Every REPORT_INTERVAL it prints
+the bucket deltas plus its own CPU time, so the probe's overhead is
+measured rather than guessed. SchedulerCore keeps one histogram per
+scheduler epoch, starting a fresh one on every start/switch/stop.
+"""
+
+import ctypes
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+
+from .state import SchedulerState
+from .worker import worker_command, worker_env
+
+PERIOD_US = 2000
+REPORT_INTERVAL = 0.5
+MAX_EPOCHS = 8
+
+# Values below 2**SUB_BITS µs are exact; above, each power of two is split
+# into 2**(SUB_BITS-1) buckets, i.e. under 1.6% relative error.
+SUB_BITS = 7
+SUB = 1 << SUB_BITS
+HALF = SUB >> 1
+MAX_VALUE = (1 << 32) - 1  # µs, a bit over an hour
+
+CLOCK_MONOTONIC = 1
+TFD_TIMER_ABSTIME = 1
+TFD_CLOEXEC = 0o2000000
+
+
+def bucket_index(value: int) -> int:
+    if value < SUB:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BITS
+    return SUB + (shift - 1) * HALF + ((value >> shift) - HALF)
+
+
+def bucket_high(index: int) -> int:
+    """Highest value that lands in ``index``."""
+    if index < SUB:
+        return index
+    shift = (index - SUB) // HALF + 1
+    mantissa = (index - SUB) % HALF + HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = array("Q", [0]) * (bucket_index(MAX_VALUE) + 1)
+        self.count = 0
+        self.max = 0
+
+    def record(self, value: int):
+        value = min(value, MAX_VALUE)
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, buckets: dict, count: int, max_value: int):
+        for index, n in buckets.items():
+            self.counts[int(index)] += n
+        self.count += count
+        self.max = max(self.max, max_value)
+
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        target = max(1, round(p / 100 * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(bucket_high(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {"p50": self.percentile(50), "p99": self.percentile(99),
+                "p999": self.percentile(99.9), "max": self.max, "count": self.count}
+
+
+def epoch_label(state: SchedulerState | None) -> str:
+    if state is None:
+        return "unknown"
+    if not state.running:
+        return "default"
+    if state.args:
+        return f"{state.scheduler} {' '.join(state.args)}"
+    return f"{state.scheduler} ({state.mode or 'auto'})"
+
+
+class LatencyEpoch:
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.time()
+        self.histogram = LatencyHistogram()
+
+
+class LatencyHistory:
+    """The current epoch plus the last few, and the probe's measured cost."""
+
+    def __init__(self, max_epochs: int = MAX_EPOCHS):
+        self.epochs = deque(maxlen=max_epochs)
+        self.cpu_percent = None
+        self.cost_us = None
+        self._cpu = self._wall = self._wakeups = 0.0
+
+    @property
+    def current(self) -> LatencyEpoch | None:
+        return self.epochs[-1] if self.epochs else None
+
+    def new_epoch(self, label: str):
+        # A sleeper that was mid-period during the switch belongs to neither
+        if self.current is not None and not self.current.histogram.count:
+            self.epochs.pop()
+        self.epochs.append(LatencyEpoch(label))
+
+    def add_batch(self, batch: dict):
+        if self.current is not None:
+            self.current.histogram.merge(batch["buckets"], batch["count"], batch["max"])
+        cpu, wall = batch["cpu"] - self._cpu, batch["wall"] - self._wall
+        wakeups = batch["wakeups"] - self._wakeups
+        # A new probe process's first report includes interpreter start-up
+        fresh = batch["wall"] <= self._wall or not self._wall
+        self._cpu, self._wall, self._wakeups = batch["cpu"], batch["wall"], batch["wakeups"]
+        if not fresh and wall > 0 and wakeups > 0:
+            self.cpu_percent = 100 * cpu / wall
+            self.cost_us = 1e6 * cpu / wakeups
+
+
+def format_summary(summary: dict) -> str:
+    if not summary["count"]:
+        return "no samples yet"
+    return (f"p50 {summary['p50']} µs · p99 {summary['p99']} µs · "
+            f"p99.9 {summary['p999']} µs · max {summary['max']} µs")
+
+
+def format_overhead(history: LatencyHistory) -> str:
+    if history.cpu_percent is None:
+        return ""
+    return f"probe overhead {history.cpu_percent:.2f}% CPU ({history.cost_us:.1f} µs/wakeup)"
+
+
+# The probe process
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", _Timespec), ("it_value", _Timespec)]
+
+
+def _timespec(ns):
+    return _Timespec(ns // 1_000_000_000, ns % 1_000_000_000)
+
+
+def open_timerfd(start_ns: int, period_ns: int) -> int:
+    """A CLOCK_MONOTONIC timerfd firing at ``start_ns`` and every ``period_ns`` after."""
+    if hasattr(os, "timerfd_create"):  # Python 3.13+
+        fd = os.timerfd_create(time.CLOCK_MONOTONIC, flags=os.TFD_CLOEXEC)
+        os.timerfd_settime_ns(fd, flags=os.TFD_TIMER_ABSTIME, initial=start_ns, interval=period_ns)
+        return fd
+    libc = ctypes.CDLL(None, use_errno=True)
+    fd = libc.timerfd_create(CLOCK_MONOTONIC, TFD_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "timerfd_create")
+    spec = _Itimerspec(_timespec(period_ns), _timespec(start_ns))
+    if libc.timerfd_settime(fd, TFD_TIMER_ABSTIME, ctypes.byref(spec), None) < 0:
+        err = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(err, "timerfd_settime")
+    return fd
+
+
+def probe_main(argv) -> int:
+    period_ns = int(argv[0]) * 1000 if argv else PERIOD_US * 1000
+    clock = time.monotonic_ns
+    start = clock() + period_ns
+    fd = open_timerfd(start, period_ns)
+    read = os.read
+
+    buckets = {}
+    count = max_value = expirations = wakeups = 0
+    began = time.monotonic()
+    report_at = began + REPORT_INTERVAL
+    while True:
+        expirations += int.from_bytes(read(fd, 8), sys.byteorder)
+        late = (clock() - start - (expirations - 1) * period_ns) // 1000
+        index = bucket_index(min(late, MAX_VALUE))
+        buckets[index] = buckets.get(index, 0) + 1
+        count += 1
+        wakeups += 1
+        if late > max_value:
+            max_value = late
+
+        now = time.monotonic()
+        if now >= report_at:
+            times = os.times()
+            batch = {"buckets": buckets, "count": count, "max": max_value,
+                     "cpu": times.user + times.system, "wall": now - began, "wakeups": wakeups}
+            try:
+                sys.stdout.write(json.dumps(batch) + "\n")
+                sys.stdout.flush()
+            except BrokenPipeError:
+                return 0
+            buckets = {}
+            count = max_value = 0
+            report_at = now + REPORT_INTERVAL
+
+
+class LatencyProbe:
+    """Runs the probe process; ``on_batch(dict)`` gets each report on the reader thread."""
+
+    def __init__(self, on_batch, period_us: int = PERIOD_US):
+        self.on_batch = on_batch
+        self.period_us = period_us
+        self._proc = None
+        self._thread = None
+
+    def start(self):
+        self._proc = subprocess.Popen(worker_command("probe", [self.period_us]), env=worker_env(),
+                                      stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, text=True)
+        self._thread = threading.Thread(target=self._read, daemon=True, name="scx-probe")
+        self._thread.start()
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self._proc is not None:
+            self._proc.stdout.close()
+
+    def _read(self):
+        for line in self._proc.stdout:
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                continue
+            self.on_batch(batch)
@@ -0,0 +1,259 @@
+"""Process start/exit events for the rules engine.
+
+The netlink proc connector pushes every exec and exit; subscribing needs
+CAP_NET_ADMIN. Without it, ProcessWatcher falls back to diffing the PID
+list every SCAN_INTERVAL for starts (only new PIDs are read) and to
+pidfds for the exits of processes someone asked to follow.
+"""
+
+import errno
+import os
+import select
+import socket
+import struct
+import threading
+
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+PROC_EVENT_NONE = 0
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+NLMSG_DONE = 3
+
+NLMSGHDR = struct.Struct("=IHHII")
+CN_MSG = struct.Struct("=IIIIHH")
+PROC_EVENT = struct.Struct("=IIQ")
+PIDS = struct.Struct("=II")
+
+SCAN_INTERVAL = 2.0
+ACK_TIMEOUT = 0.5
+
+
+def list_pids():
+    for name in os.listdir("/proc"):
+        if name.isdigit():
+            yield int(name)
+
+
+def process_names(pid: int) -> tuple[str, ...]:
+    """comm plus the basenames of argv[0] and argv[1] (for interpreters/wrappers)."""
+    names = []
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            names.append(f.read().strip())
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            argv = f.read(4096).split(b"\0")[:2]
+    except OSError:
+        return tuple(names)
+    for arg in argv:
+        if arg:
+            names.append(os.path.basename(arg.decode(errors="replace")))
+    return tuple(dict.fromkeys(names))
+
+
+class ProcConnector:
+    """Raw proc connector socket. Raises PermissionError without CAP_NET_ADMIN."""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        try:
+            self.sock.bind((0, CN_IDX_PROC))
+            self._control(PROC_CN_MCAST_LISTEN)
+            self._check_ack()
+        except OSError:
+            self.sock.close()
+            raise
+
+    def _check_ack(self):
+        # Newer kernels answer the subscription with PROC_EVENT_NONE carrying
+        # an errno; older ones say nothing, which means it worked
+        if not select.select([self.sock], [], [], ACK_TIMEOUT)[0]:
+            return
+        data = self.sock.recv(65536)
+        body = NLMSGHDR.size + CN_MSG.size
+        if len(data) >= body + PROC_EVENT.size + 4:
+            what = PROC_EVENT.unpack_from(data, body)[0]
+            err = struct.unpack_from("=I", data, body + PROC_EVENT.size)[0]
+            if what == PROC_EVENT_NONE and err:
+                raise OSError(err, "proc connector subscription refused")
+
+    def _control(self, op):
+        payload = struct.pack("=I", op)
+        cn = CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0) + payload
+        header = NLMSGHDR.pack(NLMSGHDR.size + len(cn), NLMSG_DONE, 0, 0, os.getpid())
+        self.sock.send(header + cn)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def close(self):
+        try:
+            self._control(PROC_CN_MCAST_IGNORE)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def read(self) -> list[tuple[str, int]]:
+        """[("exec"|"exit", tgid)] from one datagram."""
+        data = self.sock.recv(65536)
+        events = []
+        offset = 0
+        while offset + NLMSGHDR.size <= len(data):
+            length = NLMSGHDR.unpack_from(data, offset)[0]
+            body = offset + NLMSGHDR.size + CN_MSG.size
+            if length < NLMSGHDR.size or body + PROC_EVENT.size + PIDS.size > len(data):
+                break
+            what = PROC_EVENT.unpack_from(data, body)[0]
+            pid, tgid = PIDS.unpack_from(data, body + PROC_EVENT.size)
+            if what == PROC_EVENT_EXEC:
+                events.append(("exec", tgid))
+            elif what == PROC_EVENT_EXIT and pid == tgid:
+                # Only whole processes, not each thread
+                events.append(("exit", tgid))
+            offset += (length + 3) & ~3
+        return events
+
+
+class ProcessWatcher:
+    """Calls ``on_start(pid, names)`` and ``on_exit(pid)`` from its own thread.
+
+    ``follow(pid)`` asks for the exit of a process; with the proc
+    connector every exit is reported anyway. With ``existing`` the
+    processes already running are reported once as started, after the
+    subscription so nothing falls in between.
+    """
+
+    def __init__(self, on_start, on_exit, existing=True):
+        self.on_start = on_start
+        self.on_exit = on_exit
+        self.existing = existing
+        self.source = None
+        self._stop_r, self._stop_w = os.pipe()
+        self._pidfds = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._exited = True
+
+    def start(self):
+        try:
+            connector = ProcConnector()
+            self.source = "proc connector"
+        except OSError:
+            connector = None
+            self.source = "PID scan + pidfd"
+        # Taken here, not on the thread, so a process started right after
+        # start() returns is never mistaken for an existing one
+        known = set(list_pids())
+        self._exited = False
+        self._thread = threading.Thread(target=self._run, args=(connector, known), daemon=True,
+                                        name="scx-procwatch")
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            os.write(self._stop_w, b"x")
+            if self._thread is None:
+                os.close(self._stop_r)
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        with self._lock:
+            self._close_wake()
+
+    def _close_wake(self):
+        # Only once the thread is out: until then a follow() or the thread
+        # itself may still use the pipe, and a closed fd number gets reused
+        if self._stopping and self._exited and self._stop_w is not None:
+            os.close(self._stop_w)
+            self._stop_w = None
+
+    def follow(self, pid: int):
+        if self.source == "proc connector":
+            return
+        try:
+            fd = os.pidfd_open(pid)
+        except OSError:
+            return
+        with self._lock:
+            if self._stopping:
+                os.close(fd)
+                return
+            self._pidfds[fd] = pid
+            os.write(self._stop_w, b"w")  # wake the poll to add it
+
+    def _run(self, connector, known):
+        try:
+            if self.existing:
+                for pid in sorted(known):
+                    self.on_start(pid, process_names(pid))
+            if connector is not None:
+                self._run_connector(connector)
+            else:
+                self._run_fallback(known)
+        finally:
+            os.close(self._stop_r)
+            with self._lock:
+                self._exited = True
+                # stop() gave up waiting; the pipe is ours to close
+                self._close_wake()
+
+    def _run_connector(self, connector):
+        poller = select.poll()
+        poller.register(connector, select.POLLIN)
+        poller.register(self._stop_r, select.POLLIN)
+        try:
+            while True:
+                for fd, _ in poller.poll():
+                    if fd == self._stop_r:
+                        return
+                    try:
+                        events = connector.read()
+                    except OSError as e:
+                        if e.errno != errno.ENOBUFS:
+                            raise
+                        continue  # dropped events under load; the next exec catches up
+                    for kind, pid in events:
+                        if kind == "exec":
+                            self.on_start(pid, process_names(pid))
+                        else:
+                            self.on_exit(pid)
+        finally:
+            connector.close()
+
+    def _run_fallback(self, known):
+        poller = select.poll()
+        poller.register(self._stop_r, select.POLLIN)
+        registered = set()
+        try:
+            while True:
+                with self._lock:
+                    for fd in self._pidfds.keys() - registered:
+                        poller.register(fd, select.POLLIN)
+                        registered.add(fd)
+                for fd, _ in poller.poll(SCAN_INTERVAL * 1000):
+                    if fd == self._stop_r:
+                        if os.read(self._stop_r, 64).count(b"x"):
+                            return
+                        continue
+                    poller.unregister(fd)
+                    registered.discard(fd)
+                    with self._lock:
+                        pid = self._pidfds.pop(fd)
+                    os.close(fd)
+                    self.on_exit(pid)
+
+                pids = set(list_pids())
+                for pid in sorted(pids - known):
+                    self.on_start(pid, process_names(pid))
+                known = pids
+        finally:
+            with self._lock:
+                for fd in self._pidfds:
+                    os.close(fd)
+                self._pidfds.clear()
@@ -0,0 +1,725 @@
+"""Rules engine: switch scheduler/mode as the workload changes.
+
+Conditions, all optional, all of a rule's must hold:
+
+* ``process``: glob patterns matched, case-insensitively, against each
+  new process's comm and argv[0]/argv[1] basenames (see procwatch.py)
+* ``xruns``: at least this many audio xruns in the last XRUN_WINDOW seconds
+* ``locked``: every graphical session of ours is locked
+* ``pressure``: a PSI trigger fired within the last two windows, e.g.
+  ``{"some": 20, "window": 2}`` for CPU stalls over 20% of 2 s; also
+  ``resource`` (cpu/memory/io) and ``cgroup`` for a cgroup's own file
+* ``power``: ``"battery"`` or ``"ac"``, from power_supply uevents
+
+Of the rules that hold, the highest priority wins (file order breaks
+ties). A rule without a scheduler keeps the current one and only changes
+the mode. When no rule holds any more, the state from before the first
+switch comes back, or ``fallback`` if the file has one.
+
+Flapping is held off three ways: a condition must hold for ``debounce``
+seconds before it counts and be gone for ``release`` seconds before it
+stops counting, and a switch is never followed by another within
+``min_dwell`` seconds. A switch someone else makes is left alone until
+the set of holding rules changes.
+
+Runs headless as ``python -m scxctl_core.rules``, or in the AppImage as
+``--scxctl-worker rules`` (contrib has a systemd user unit); SIGHUP
+reloads the rules file.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import shlex
+import signal
+import sys
+import time
+from collections import deque
+from typing import NamedTuple
+
+from .activity import default_spill_path
+from .control import runtime_dir
+from .procwatch import ProcessWatcher
+from .state import SchedulerState, requested_state
+from .triggers import (
+    PowerMonitor, PressureMonitor, PressureTrigger, SessionLockMonitor, XrunMonitor, format_pressure,
+    read_pressure,
+)
+
+XRUN_WINDOW = 60.0
+DEBOUNCE = 2.0
+RELEASE = 10.0
+MIN_DWELL = 30.0
+# State events this soon after our own switch may be the loader passing
+# through "nothing running"; look again once it has settled
+SETTLE = 3.0
+# A switch the loader refused is not asked for again sooner than this
+RETRY_FAILED = 300.0
+
+DEFAULT_RULES = {
+    "rules": [
+        {"name": "Audio xruns", "when": {"xruns": 3}, "scheduler": None, "mode": "lowlatency",
+         "priority": 30},
+        {"name": "Gaming", "when": {"process": ["steam", "proton", "gamescope"]},
+         "scheduler": "lavd", "mode": "gaming", "priority": 20},
+        {"name": "CPU pressure", "when": {"pressure": {"some": 25, "window": 2}}, "scheduler": None,
+         "mode": "server", "priority": 15},
+        {"name": "Session locked", "when": {"locked": True}, "scheduler": None, "mode": "server",
+         "priority": 10},
+        {"name": "On battery", "when": {"power": "battery"}, "scheduler": None, "mode": "powersave",
+         "priority": 5},
+    ],
+    "fallback": None,
+    "debounce": DEBOUNCE,
+    "release": RELEASE,
+    "min_dwell": MIN_DWELL,
+}
+
+
+class Rule(NamedTuple):
+    name: str
+    process: tuple[str, ...] = ()
+    xruns: int = 0
+    locked: bool = False
+    pressure: PressureTrigger | None = None
+    power: str | None = None  # "ac" or "battery"
+    scheduler: str | None = None  # None keeps the running one
+    mode: str | None = None
+    args: str = ""
+    priority: int = 0
+
+
+class RulesConfig(NamedTuple):
+    rules: list[Rule]
+    fallback: SchedulerState | None = None
+    debounce: float = DEBOUNCE
+    release: float = RELEASE
+    min_dwell: float = MIN_DWELL
+
+
+def config_dir() -> str:
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(base, "scxctl_gui")
+
+
+def rules_path() -> str:
+    return os.path.join(config_dir(), "rules.json")
+
+
+def log_path() -> str:
+    return os.path.join(os.path.dirname(default_spill_path()), "rules.log")
+
+
+def pid_path() -> str:
+    return os.path.join(runtime_dir(), "rules.pid")
+
+
+def _number(data, key, default):
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"{key} must be a non-negative number")
+    return float(value)
+
+
+def parse_pressure(name: str, data) -> PressureTrigger:
+    if not isinstance(data, dict):
+        raise ValueError(f"{name}: pressure must be an object like {{\"some\": 20}}")
+    unknown = data.keys() - {"some", "full", "window", "resource", "cgroup"}
+    if unknown:
+        raise ValueError(f"{name}: unknown pressure setting {', '.join(sorted(unknown))}")
+    kinds = [k for k in ("some", "full") if k in data]
+    if len(kinds) != 1:
+        raise ValueError(f"{name}: pressure needs exactly one of some, full")
+    percent = data[kinds[0]]
+    if isinstance(percent, bool) or not isinstance(percent, (int, float)) or not 0 < percent < 100:
+        raise ValueError(f"{name}: pressure {kinds[0]} must be a percentage")
+    window = data.get("window", 2)
+    if isinstance(window, bool) or not isinstance(window, (int, float)) or not 0.5 <= window <= 10:
+        raise ValueError(f"{name}: pressure window must be 0.5 to 10 seconds")
+    resource = data.get("resource", "cpu")
+    if resource not in ("cpu", "memory", "io"):
+        raise ValueError(f"{name}: pressure resource must be cpu, memory or io")
+    cgroup = data.get("cgroup")
+    if cgroup is not None and (not isinstance(cgroup, str) or ".." in cgroup.split("/")):
+        raise ValueError(f"{name}: pressure cgroup must be a path under /sys/fs/cgroup")
+    return PressureTrigger(resource, kinds[0], float(percent), float(window), cgroup)
+
+
+def parse_rule(data: dict, index: int) -> Rule:
+    if not isinstance(data, dict):
+        raise ValueError(f"rule {index + 1}: expected an object")
+    name = data.get("name") or f"rule {index + 1}"
+    when = data.get("when")
+    if not isinstance(when, dict) or not when:
+        raise ValueError(f"{name}: 'when' needs at least one of process, xruns, locked, pressure, power")
+    unknown = when.keys() - {"process", "xruns", "locked", "pressure", "power"}
+    if unknown:
+        raise ValueError(f"{name}: unknown condition {', '.join(sorted(unknown))}")
+
+    process = when.get("process", [])
+    if isinstance(process, str):
+        process = [process]
+    if not isinstance(process, list) or not all(isinstance(p, str) and p for p in process):
+        raise ValueError(f"{name}: process must be a list of name patterns")
+    xruns = when.get("xruns", 0)
+    if isinstance(xruns, bool) or not isinstance(xruns, int) or xruns < 0:
+        raise ValueError(f"{name}: xruns must be a count")
+    locked = when.get("locked", False)
+    if not isinstance(locked, bool):
+        raise ValueError(f"{name}: locked must be true or false")
+    pressure = parse_pressure(name, when["pressure"]) if "pressure" in when else None
+    power = when.get("power")
+    if power is not None and power not in ("ac", "battery"):
+        raise ValueError(f"{name}: power must be \"ac\" or \"battery\"")
+    if not (process or xruns or locked or pressure or power):
+        raise ValueError(f"{name}: no condition would ever hold")
+
+    scheduler, mode, args = data.get("scheduler"), data.get("mode"), data.get("args", "")
+    if scheduler is not None and not isinstance(scheduler, str):
+        raise ValueError(f"{name}: scheduler must be a name or null")
+    if mode is not None and not isinstance(mode, str):
+        raise ValueError(f"{name}: mode must be a string or null")
+    if not isinstance(args, str):
+        raise ValueError(f"{name}: args must be a string")
+    if scheduler is None and not mode:
+        raise ValueError(f"{name}: needs a scheduler, a mode, or both")
+    try:
+        shlex.split(args)
+    except ValueError as e:
+        raise ValueError(f"{name}: args: {e}") from e
+    priority = data.get("priority", 0)
+    if isinstance(priority, bool) or not isinstance(priority, int):
+        raise ValueError(f"{name}: priority must be an integer")
+    return Rule(name, tuple(p.lower() for p in process), xruns, locked, pressure, power,
+                scheduler, mode.lower() if mode else None, args, priority)
+
+
+def parse_rules(data: dict) -> RulesConfig:
+    """Validate a rules file's contents. Raises ValueError saying what's wrong."""
+    if not isinstance(data, dict) or not isinstance(data.get("rules"), list):
+        raise ValueError("expected an object with a 'rules' list")
+    rules = [parse_rule(r, i) for i, r in enumerate(data["rules"])]
+    names = [r.name for r in rules]
+    for name in names:
+        if names.count(name) > 1:
+            raise ValueError(f"two rules are called {name!r}")
+
+    fallback = data.get("fallback")
+    if fallback is not None:
+        if not isinstance(fallback, dict) or not isinstance(fallback.get("scheduler"), str):
+            raise ValueError("fallback must be null or an object with a scheduler")
+        fallback = requested_state(fallback["scheduler"], fallback.get("mode"), fallback.get("args", ""))
+    return RulesConfig(rules, fallback, _number(data, "debounce", DEBOUNCE),
+                       _number(data, "release", RELEASE), _number(data, "min_dwell", MIN_DWELL))
+
+
+def load_rules_text(path: str | None = None) -> str:
+    """The rules file as written, or the defaults if there is none."""
+    try:
+        with open(path or rules_path()) as f:
+            return f.read()
+    except FileNotFoundError:
+        return json.dumps(DEFAULT_RULES, indent=2) + "\n"
+
+
+def load_rules(path: str | None = None) -> RulesConfig:
+    """Raises ValueError (bad JSON or rules) or OSError."""
+    return parse_rules(json.loads(load_rules_text(path)))
+
+
+def save_rules_text(text: str, path: str | None = None):
+    """Validate and write atomically. Raises ValueError or OSError."""
+    parse_rules(json.loads(text))
+    path = path or rules_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def daemon_pid() -> int | None:
+    """The running daemon's pid, from its pid file."""
+    try:
+        with open(pid_path()) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return None
+    return pid
+
+
+def reload_daemon() -> bool:
+    pid = daemon_pid()
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, signal.SIGHUP)
+    except OSError:
+        return False
+    return True
+
+
+def tail_log(lines: int = 200) -> list[str]:
+    try:
+        with open(log_path(), "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - lines * 200))
+            data = f.read().decode(errors="replace")
+    except OSError:
+        return []
+    return data.splitlines()[-lines:]
+
+
+def describe_target(state: SchedulerState) -> str:
+    if not state.running:
+        return "the default scheduler"
+    if state.args:
+        return f"{state.scheduler} {shlex.join(state.args)}"
+    return f"{state.scheduler} in {state.mode or 'auto'} mode"
+
+
+class _Condition:
+    def __init__(self):
+        self.raw = False
+        self.active = False
+        self.timer = None
+
+
+class RulesEngine:
+    """Drives a SchedulerCore from rules; runs on the core's thread.
+
+    ``call_later(delay, fn)`` must return something with ``cancel()``
+    (MainLoop.call_later, or a QTimer/GLib wrapper).
+    """
+
+    def __init__(self, core, call_later, config: RulesConfig):
+        self.core = core
+        self.call_later = call_later
+        self.config = config
+        self.baseline = None  # what to go back to once no rule holds
+        self.sources = []
+        self._conditions = {}
+        self._procs = {}  # pid -> (names, rule names)
+        self._xruns = deque(maxlen=1024)
+        self._locked = False
+        self._on_ac = True
+        self._pressure_at = {}  # rule name -> (when its trigger last fired, firings in a row)
+        # rule name -> ((time, stall total) at the first firing of a run, ... at the latest)
+        self._pressure_seen = {}
+        self._watcher = self._xrun_monitor = self._lock_monitor = None
+        self._pressure_monitor = self._power_monitor = None
+        self._matchers = ()
+        self._generation = 0
+        self._seen = set()  # pids the watcher thread has reported; that thread only
+        self._expected = None
+        self._pending = False
+        self._switched_at = None
+        self._override = None
+        self._failed = None
+        self._retry = None
+
+    # Lifecycle
+
+    def start(self):
+        self.core.connect("state", self._on_state)
+        self._configure()
+
+    def stop(self):
+        self.core.disconnect("state", self._on_state)
+        self._stop_sources()
+        for condition in self._conditions.values():
+            if condition.timer is not None:
+                condition.timer.cancel()
+        if self._retry is not None:
+            self._retry.cancel()
+
+    def reload(self, config: RulesConfig):
+        self._stop_sources()
+        self.config = config
+        self._failed = None
+        self._configure()
+        self.core.log("rules", f"Reloaded {len(config.rules)} rules")
+
+    def _configure(self):
+        old = self._conditions
+        self._conditions = {rule.name: old.pop(rule.name, _Condition()) for rule in self.config.rules}
+        for condition in old.values():
+            if condition.timer is not None:
+                condition.timer.cancel()
+        self._procs.clear()
+        # Reports from the previous watcher may still be queued
+        self._generation += 1
+        self._start_sources()
+        # Kept conditions start from what's known now; the process scan
+        # re-asserts matches before ``release`` runs out
+        self._update()
+        self._evaluate()
+
+    def _start_sources(self):
+        rules = self.config.rules
+        dispatch = self.core.dispatch
+        self.sources = []
+        self._matchers = tuple((r.name, r.process) for r in rules if r.process)
+        if self._matchers:
+            self._seen = set()
+            self._watcher = ProcessWatcher(self._watch_start, self._watch_exit)
+            self._watcher.start()
+            self.sources.append(self._watcher.source)
+        if any(r.xruns for r in rules):
+            self._xrun_monitor = XrunMonitor(lambda n: dispatch(lambda: self._on_xruns(n)))
+            try:
+                self._xrun_monitor.start()
+                self.sources.append("pw-top")
+            except OSError as e:
+                self._xrun_monitor = None
+                self.core.log("rules", f"xrun rules disabled: {e}")
+        if any(r.locked for r in rules):
+            self._lock_monitor = SessionLockMonitor(lambda locked: dispatch(lambda: self._on_locked(locked)))
+            try:
+                self._lock_monitor.start()
+                self._locked = self._lock_monitor.locked
+                self.sources.append("logind")
+            except OSError as e:
+                self._lock_monitor = None
+                self.core.log("rules", f"session lock rules disabled: {e}")
+        pressure_rules = [r for r in rules if r.pressure]
+        if pressure_rules:
+            self._pressure_at = {}
+            self._pressure_seen = {}
+            self._pressure_monitor = PressureMonitor(lambda name: dispatch(lambda: self._on_pressure(name)))
+            added = 0
+            for rule in pressure_rules:
+                try:
+                    self._pressure_monitor.add(rule.name, rule.pressure)
+                    added += 1
+                except OSError as e:
+                    self.core.log("rules", f"{rule.name}: disabled: {e}")
+            if added:
+                self._pressure_monitor.start()
+                self.sources.append("PSI triggers")
+            else:
+                self._pressure_monitor = None
+        if any(r.power for r in rules):
+            self._power_monitor = PowerMonitor(lambda on_ac: dispatch(lambda: self._on_power(on_ac)))
+            try:
+                self._power_monitor.start()
+                self._on_ac = self._power_monitor.on_ac
+                self.sources.append("power_supply uevents")
+            except OSError as e:
+                self._power_monitor = None
+                self.core.log("rules", f"power rules disabled: {e}")
+        if self.sources:
+            self.core.log("rules", f"Watching via {', '.join(self.sources)}")
+
+    def _stop_sources(self):
+        for source in (self._watcher, self._xrun_monitor, self._lock_monitor, self._pressure_monitor,
+                       self._power_monitor):
+            if source is not None:
+                source.stop()
+        self._watcher = self._xrun_monitor = self._lock_monitor = None
+        self._pressure_monitor = self._power_monitor = None
+
+    # Inputs. The _watch_* callbacks run on the watcher thread: match
+    # there, so only interesting processes cost a dispatch.
+
+    def _watch_start(self, pid, names):
+        lowered = [n.lower() for n in names]
+        matched = tuple(name for name, patterns in self._matchers
+                        if any(fnmatch.fnmatchcase(n, p) for n in lowered for p in patterns))
+        if matched:
+            self._seen.add(pid)
+            self._watcher.follow(pid)
+            generation = self._generation
+            self.core.dispatch(lambda: self._on_proc_start(pid, names, matched, generation))
+
+    def _watch_exit(self, pid):
+        if pid in self._seen:
+            self._seen.discard(pid)
+            self.core.dispatch(lambda: self._on_proc_exit(pid))
+
+    def _on_proc_start(self, pid, names, matched, generation):
+        if generation == self._generation:
+            self._procs[pid] = (names, matched)
+            self._update()
+
+    def _on_proc_exit(self, pid):
+        if self._procs.pop(pid, None) is not None:
+            self._update()
+
+    def _on_xruns(self, count):
+        now = time.monotonic()
+        self._xruns.extend([now] * count)
+        self.core.log("rules", f"{count} audio xrun{'s' if count > 1 else ''}")
+        self._update()
+        # Look again when these age out of the window
+        self.call_later(XRUN_WINDOW + 0.1, self._update)
+
+    def _on_locked(self, locked):
+        self._locked = locked
+        self.core.log("rules", "Session locked" if locked else "Session unlocked")
+        self._update()
+
+    def _on_power(self, on_ac):
+        self._on_ac = on_ac
+        self.core.log("rules", "On AC power" if on_ac else "On battery")
+        self._update()
+
+    def _on_pressure(self, name):
+        rule = next((r for r in self.config.rules if r.name == name), None)
+        if rule is None or rule.pressure is None:
+            return  # from before a reload
+        now = time.monotonic()
+        last, count = self._pressure_at.get(name, (None, 0))
+        new_run = last is None or now - last > 2 * rule.pressure.window
+        self._pressure_at[name] = (now, 1 if new_run else count + 1)
+        # The log says how bad the stall was since the run began, and
+        # how calm it has been since the last firing
+        total = read_pressure(rule.pressure).get(f"{rule.pressure.kind}_total")
+        if total is not None:
+            first = (now, total) if new_run else self._pressure_seen.get(name, ((now, total),))[0]
+            self._pressure_seen[name] = (first, (now, total))
+        self._update()
+        # The kernel says nothing once the stall subsides; it just stops
+        # firing, so look again when the next one would be overdue
+        self.call_later(2 * rule.pressure.window + 0.1, self._update)
+
+    # Conditions
+
+    def _holds(self, rule):
+        if rule.process and not any(rule.name in matched for _, matched in self._procs.values()):
+            return False
+        if rule.xruns:
+            cutoff = time.monotonic() - XRUN_WINDOW
+            if sum(1 for t in self._xruns if t >= cutoff) < rule.xruns:
+                return False
+        if rule.locked and not self._locked:
+            return False
+        if rule.pressure:
+            # One window over the threshold is a blip; the trigger has to
+            # fire again in the next one
+            last, count = self._pressure_at.get(rule.name, (None, 0))
+            if count < 2 or time.monotonic() - last > 2 * rule.pressure.window:
+                return False
+        if rule.power and (rule.power == "ac") != self._on_ac:
+            return False
+        return True
+
+    def _why(self, rule):
+        reasons = []
+        if rule.process:
+            pids = [(pid, names[0]) for pid, (names, matched) in self._procs.items() if rule.name in matched]
+            reasons.append(", ".join(f"{name} ({pid})" for pid, name in pids[:3]) +
+                           (f" and {len(pids) - 3} more" if len(pids) > 3 else ""))
+        if rule.xruns:
+            reasons.append("audio xruns")
+        if rule.locked:
+            reasons.append("session locked")
+        if rule.pressure:
+            reasons.append(f"{rule.pressure.describe()}: {self._pressure_text(rule)}")
+        if rule.power:
+            reasons.append("on AC power" if rule.power == "ac" else "on battery")
+        return "; ".join(reasons)
+
+    def _pressure_text(self, rule, latest=False):
+        seen = self._pressure_seen.get(rule.name)
+        since = seen[latest] if seen else None
+        return format_pressure(rule.pressure, read_pressure(rule.pressure), since, time.monotonic())
+
+    def _update(self):
+        for rule in self.config.rules:
+            condition = self._conditions[rule.name]
+            raw = self._holds(rule)
+            if raw == condition.raw:
+                continue
+            condition.raw = raw
+            if condition.timer is not None:
+                condition.timer.cancel()
+                condition.timer = None
+            if raw != condition.active:
+                delay = self.config.debounce if raw else self.config.release
+                condition.timer = self.call_later(delay, lambda rule=rule: self._settle(rule))
+
+    def _settle(self, rule):
+        condition = self._conditions.get(rule.name)
+        if condition is None or condition.raw == condition.active:
+            return
+        condition.timer = None
+        condition.active = condition.raw
+        if condition.active:
+            self.core.log("rules", f"{rule.name}: holds ({self._why(rule)})")
+        elif rule.pressure:
+            self.core.log("rules", f"{rule.name}: released ({self._pressure_text(rule, latest=True)})")
+        else:
+            self.core.log("rules", f"{rule.name}: released")
+        self._evaluate()
+
+    # Decisions
+
+    def active_rules(self) -> list[Rule]:
+        return [r for r in self.config.rules if self._conditions[r.name].active]
+
+    def _target(self, rule, active):
+        if rule is None:
+            return self.config.fallback or self.baseline
+        if rule.scheduler is not None:
+            return requested_state(rule.scheduler, rule.mode, rule.args)
+        # Mode only: on the scheduler another holding rule wants, else
+        # on the one the user had chosen
+        for other in sorted(active, key=lambda r: -r.priority):
+            if other.scheduler is not None:
+                return requested_state(other.scheduler, rule.mode, rule.args)
+        for state in (self.baseline, self.core.state):
+            if state is not None and state.running:
+                return requested_state(state.scheduler, rule.mode, rule.args)
+        return None
+
+    def _evaluate(self):
+        if self._pending or self.core.state is None:
+            return
+        active = self.active_rules()
+        names = frozenset(r.name for r in active)
+        if self._override is not None:
+            if names == self._override:
+                return
+            self._override = None
+        # max() keeps the first of equal priorities
+        rule = max(active, key=lambda r: r.priority, default=None)
+        if rule is None and self.baseline is None:
+            return
+        if rule is not None and self.baseline is None:
+            self.baseline = self.core.state
+
+        target = self._target(rule, active)
+        if target is None:
+            self.core.log("rules", f"{rule.name}: no scheduler running to change the mode of")
+            return
+        if target == self.core.state:
+            if rule is None:
+                self.baseline = None
+            return
+        if target == self._failed and time.monotonic() - self._switched_at < RETRY_FAILED:
+            return
+
+        if self._retry is not None:
+            self._retry.cancel()
+            self._retry = None
+        wait = 0 if self._switched_at is None else \
+            self.config.min_dwell - (time.monotonic() - self._switched_at)
+        if wait > 0:
+            self.core.log("rules", f"Holding for {wait:.0f}s before switching again")
+            self._retry = self.call_later(wait, self._evaluate)
+            return
+
+        why = f"rule {rule.name}: {self._why(rule)}" if rule is not None else "no rule holds any more"
+        self.core.log("rules", f"→ {describe_target(target)} ({why})")
+        self._switch(target, rule is None)
+
+    def _switch(self, target, restoring):
+        self._pending = True
+        self._expected = target
+
+        def done(output, error):
+            self._pending = False
+            self._switched_at = time.monotonic()
+            if error:
+                # Don't hammer the loader with the same request
+                self._failed = target
+            else:
+                self._failed = None
+                if restoring:
+                    self.baseline = None
+            self._evaluate()
+        self.core.apply(target.scheduler or "default", target.mode, shlex.join(target.args), callback=done)
+
+    def _on_state(self, state):
+        if self._pending or state == self._expected:
+            return
+        if self._failed is not None:
+            # The refresh after our failed switch, not a choice of the user's
+            self._expected = state
+            return
+        if self._switched_at is not None and time.monotonic() - self._switched_at < SETTLE:
+            self.call_later(SETTLE, lambda: self._on_state(self.core.state))
+            return
+        self._expected = state
+        names = frozenset(r.name for r in self.active_rules())
+        if names:
+            self._override = names
+            self.core.log("rules", f"{describe_target(state)} was chosen by hand; "
+                                   "leaving it until the rules change")
+        # Once no rule holds, the hand-picked state is the one to keep
+        self.baseline = state if names else None
+
+
+def _write_pid_file():
+    path = pid_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"{os.getpid()}\n")
+    return path
+
+
+def main(argv=None):
+    from .core import SchedulerCore
+    from .fake_backend import FakeBackend
+    from .mainloop import MainLoop
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", help=f"rules file (default {rules_path()})")
+    parser.add_argument("--fake", action="store_true",
+                        help="use an in-process fake backend instead of scx_loader/scxctl")
+    parser.add_argument("--metrics", metavar="ADDRESS",
+                        help="also serve OpenMetrics on host:port or unix:/path (see exporter.py)")
+    opts = parser.parse_args(argv)
+
+    try:
+        config = load_rules(opts.rules)
+    except (OSError, ValueError) as e:
+        print(f"cannot load rules: {e}", file=sys.stderr)
+        return 1
+
+    loop = MainLoop()
+    core = SchedulerCore(loop.dispatch, spill_path=log_path())
+    core.connect("log", lambda entry: print(entry.format(), file=sys.stderr, flush=True))
+    engine = RulesEngine(core, loop.call_later, config)
+
+    def reload():
+        try:
+            engine.reload(load_rules(opts.rules))
+        except (OSError, ValueError) as e:
+            core.log("rules", f"❌ Keeping the old rules: {e}")
+
+    def started(_):
+        core.disconnect("state", started)
+        engine.start()
+
+    signal.signal(signal.SIGHUP, lambda *_: loop.dispatch(reload))
+    signal.signal(signal.SIGTERM, lambda *_: loop.quit())
+    pid_file = _write_pid_file()
+    schedulers = sorted({r.scheduler for r in config.rules if r.scheduler} | {"bpfland"})
+    core.connect("state", started)
+    core.start(FakeBackend(schedulers) if opts.fake else None)
+    if not opts.fake:
+        # The rules' switches next to the GUI's, for looking back later
+        core.start_history()
+    if opts.metrics:
+        core.start_exporter(opts.metrics)
+        core.start_stats()
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        core.shutdown()
+        try:
+            os.unlink(pid_file)
+        except OSError:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""Start-up phase timings for ``--profile-startup``.
+
+Times are milliseconds since the kernel exec'd us (from /proc/self/stat),
+so interpreter start-up counts too. Each mark names the phase that just
+ended; the report has both the running total and each phase's share,
+and is written as JSON once the frontend has painted and the backend
+has answered.
+
+    python3 scxctl_gui_qt.py --profile-startup=startup.json
+"""
+
+import os
+import sys
+import time
+
+FLAG = "--profile-startup"
+# Not worth waiting for forever if the backend never answers
+GIVE_UP_AFTER = 15.0
+
+
+def process_start() -> float | None:
+    """CLOCK_BOOTTIME of our exec, to the kernel's tick (usually 10 ms)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # comm may contain spaces; starttime is field 22
+            fields = f.read().rpartition(")")[2].split()
+        return int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def default_report_path() -> str:
+    base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "scxctl_gui", "startup-profile.json")
+
+
+def profile_path(argv) -> str | None:
+    """The report path if ``argv`` asks for one, ahead of any real parsing."""
+    for i, arg in enumerate(argv):
+        if arg.startswith(FLAG + "="):
+            return arg.split("=", 1)[1]
+        if arg == FLAG:
+            following = argv[i + 1] if i + 1 < len(argv) else None
+            if following and not following.startswith("-"):
+                return following
+            return default_report_path()
+    return None
+
+
+def without_profile_flag(argv) -> list[str]:
+    """``argv`` minus the flag (and its file), for a toolkit that parses the rest."""
+    out = []
+    skip = False
+    for i, arg in enumerate(argv):
+        if skip:
+            skip = False
+        elif arg == FLAG:
+            # Same rule as profile_path for a separate file argument
+            following = argv[i + 1] if i + 1 < len(argv) else None
+            skip = bool(following) and not following.startswith("-")
+        elif not arg.startswith(FLAG + "="):
+            out.append(arg)
+    return out
+
+
+class StartupProfile:
+    """Collects marks; with no ``path`` it is switched off and ``mark`` is free.
+
+    Only the first mark of a name counts, so a handler that runs on every
+    event can mark the first one.
+    """
+
+    def __init__(self, frontend: str, path: str | None = None):
+        self.frontend = frontend
+        self.path = path
+        self.enabled = path is not None
+        self.marks = []
+        self.written = False
+        if self.enabled:
+            self._origin = process_start()
+            if self._origin is None:
+                # No procfs: count from here, and say so in the report
+                self._origin = time.clock_gettime(time.CLOCK_BOOTTIME)
+                self.mark("no process start time")
+
+    def mark(self, name: str):
+        if self.enabled and not self.written and not self.has(name):
+            self.marks.append((name, time.clock_gettime(time.CLOCK_BOOTTIME) - self._origin))
+
+    def has(self, name: str) -> bool:
+        return any(mark == name for mark, _ in self.marks)
+
+    def report(self) -> dict:
+        phases = []
+        previous = 0.0
+        for name, at in self.marks:
+            phases.append({"phase": name, "ms": round((at - previous) * 1000, 2),
+                           "at_ms": round(at * 1000, 2)})
+            previous = at
+        totals = {name: round(at * 1000, 2) for name, at in self.marks}
+        return {
+            "frontend": self.frontend,
+            "python": sys.version.split()[0],
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "argv": sys.argv[1:],
+            "time": time.time(),
+            "first_frame_ms": totals.get("first paint"),
+            "ready_ms": round(self.marks[-1][1] * 1000, 2) if self.marks else None,
+            "phases": phases,
+        }
+
+    def write(self) -> str | None:
+        """Write the report once; the path, or None if off or already written."""
+        if not self.enabled or self.written:
+            return None
+        import json
+        report = self.report()
+        self.written = True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        return self.path
+
+    def summary(self) -> str:
+        return " · ".join(f"{name} {(at - prev) * 1000:.0f} ms" for (name, at), prev in
+                          zip(self.marks, [0.0] + [at for _, at in self.marks]))
+
+
+def _run_once(command, timeout: float) -> dict | None:
+    """Launch ``command`` profiling into a temporary file; its report, or None."""
+    import json
+    import subprocess
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="scxctl-startup-") as tmp:
+        path = os.path.join(tmp, "profile.json")
+        proc = subprocess.Popen([*command, f"{FLAG}={path}"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        try:
+            while not os.path.exists(path):
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    return None
+                time.sleep(0.02)
+            # Written in one go, but don't race the close
+            time.sleep(0.05)
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+def _spread(values) -> dict | None:
+    import statistics
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {"min": min(values), "median": round(statistics.median(values), 2), "max": max(values)}
+
+
+def main(argv=None) -> int:
+    """Time-to-first-frame over several launches, kept in a history file.
+
+        python3 -m scxctl_core.startup --runs 10 --label v1.4 -- python3 scxctl_gui_qt.py
+
+    The first launch runs with cold caches (as far as we can tell) and is
+    reported on its own; the rest are summarised. With ``--history``, each
+    result is appended as one JSON line and compared with the one before.
+    """
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog="python3 -m scxctl_core.startup",
+                                     description="Benchmark frontend start-up.")
+    parser.add_argument("--runs", type=int, default=5, help="launches to time (default 5)")
+    parser.add_argument("--timeout", type=float, default=GIVE_UP_AFTER + 5,
+                        help="seconds to wait for each report")
+    parser.add_argument("--history", metavar="FILE", help="append the result to this JSONL file")
+    parser.add_argument("--label", help="name for this result, e.g. a version or commit")
+    parser.add_argument("command", nargs="+", help="frontend command line")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for i in range(max(1, args.runs)):
+        report = _run_once(args.command, args.timeout)
+        if report is None:
+            print(f"run {i + 1}: no report (did it start?)", file=sys.stderr)
+            continue
+        reports.append(report)
+        print(f"run {i + 1}: first frame {report['first_frame_ms']} ms, ready {report['ready_ms']} ms")
+    if not reports:
+        return 1
+
+    cold, warm = reports[0], reports[1:] or reports[:1]
+    phases = {}
+    for report in warm:
+        for phase in report["phases"]:
+            phases.setdefault(phase["phase"], []).append(phase["ms"])
+    result = {
+        "label": args.label,
+        "time": time.time(),
+        "command": args.command,
+        "frontend": cold.get("frontend"),
+        "python": cold.get("python"),
+        "runs": len(reports),
+        "cold": {"first_frame_ms": cold["first_frame_ms"], "ready_ms": cold["ready_ms"]},
+        "first_frame_ms": _spread(r["first_frame_ms"] for r in warm),
+        "ready_ms": _spread(r["ready_ms"] for r in warm),
+        "phases": {name: _spread(ms)["median"] for name, ms in phases.items()},
+    }
+
+    print(f"\ncold: first frame {cold['first_frame_ms']} ms, ready {cold['ready_ms']} ms")
+    for key in ("first_frame_ms", "ready_ms"):
+        spread = result[key]
+        if spread:
+            print(f"{key[:-3].replace('_', ' ')}: {spread['median']} ms median "
+                  f"({spread['min']}–{spread['max']})")
+    for name, ms in result["phases"].items():
+        print(f"  {name:<24} {ms:>8.1f} ms")
+
+    if args.history:
+        previous = None
+        try:
+            with open(args.history) as f:
+                lines = [line for line in f if line.strip()]
+            previous = json.loads(lines[-1]) if lines else None
+        except (OSError, ValueError):
+            pass
+        if previous and previous.get("first_frame_ms") and result["first_frame_ms"]:
+            before = previous["first_frame_ms"]["median"]
+            after = result["first_frame_ms"]["median"]
+            print(f"\nvs {previous.get('label') or 'previous'}: first frame "
+                  f"{after - before:+.1f} ms ({(after - before) / before * 100:+.1f}%)")
+        with open(args.history, "a") as f:
+            f.write(json.dumps(result) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
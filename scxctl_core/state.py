@@ -0,0 +1,135 @@
+import shlex
+from typing import NamedTuple
+
+from .sysfs import SCX_STATE_PATH, read_sysfs
+
+# Order matches scx_loader's SchedMode enum, so the index is the D-Bus value
+MODES = ("auto", "gaming", "powersave", "lowlatency", "server")
+
+
+# First match wins, so more specific names come before their prefixes
+SCHEDULER_EMOJI = (
+    ("rust", "🦀"),
+    ("lavd", "🌋"),
+    ("flash", "⚡"),
+    ("cosmos", "🌌"),
+    ("bpfland", "🎢"),
+    ("p2dq", "🏎️"),
+    ("tickless", "🕰️"),
+    ("mitosis", "🧬"),
+    ("central", "🎯"),
+    ("layer", "🍰"),
+    ("nest", "🪺"),
+    ("joule", "🔋"),
+    ("flat", "🥞"),
+    ("pair", "👯"),
+    ("simple", "👶"),
+    ("bpf", "🐝"),
+)
+
+
+def scheduler_emoji(name: str) -> str:
+    n = name.lower()
+    for needle, emoji in SCHEDULER_EMOJI:
+        if needle in n:
+            return emoji
+    return "🚀"
+
+
+def strip_scx_prefix(name: str) -> str:
+    name = name.strip().lower()
+    return name[4:] if name.startswith("scx_") else name
+
+
+class SchedulerState(NamedTuple):
+    """What the loader is running. ``scheduler`` is None for the kernel default."""
+
+    scheduler: str | None = None
+    mode: str | None = None
+    args: tuple[str, ...] = ()
+
+    @property
+    def running(self) -> bool:
+        return self.scheduler is not None
+
+    def describe(self) -> str:
+        # Same wording as `scxctl get`, so the log reads the same on every backend
+        if not self.running:
+            return "no scx scheduler running"
+        if self.args:
+            return f'running {self.scheduler} with arguments "{shlex.join(self.args)}"'
+        return f"running {self.scheduler} in {self.mode or MODES[0]} mode"
+
+
+def parse_get_output(output: str) -> SchedulerState:
+    """Parse `scxctl get`. Raises ValueError on anything unrecognised."""
+    text = output.strip()
+    lower = text.lower()
+    if "no scx scheduler running" in lower:
+        return SchedulerState()
+    if not lower.startswith("running"):
+        raise ValueError(f"unexpected scxctl get output: {text!r}")
+
+    parts = text.split()
+    if len(parts) < 2:
+        raise ValueError(f"unexpected scxctl get output: {text!r}")
+    scheduler = strip_scx_prefix(parts[1])
+
+    if " with arguments " in lower:
+        quoted = text.split(" with arguments ", 1)[1].strip().strip('"')
+        return SchedulerState(scheduler, None, tuple(shlex.split(quoted)))
+
+    mode = None
+    if " in " in lower:
+        after_in = lower.split(" in ", 1)[1].split()
+        if after_in:
+            mode = after_in[0]
+    return SchedulerState(scheduler, mode)
+
+
+def parse_list_output(output: str) -> list[str]:
+    """Parse `scxctl list`. Raises ValueError on anything unrecognised."""
+    for line in output.splitlines():
+        if "supported schedulers:" in line:
+            sched_list = line.split("supported schedulers:", 1)[1].strip()
+            # Only the scxctl backend needs it, and never before the first paint
+            import ast
+            try:
+                schedulers = ast.literal_eval(sched_list)
+            except (SyntaxError, ValueError) as e:
+                raise ValueError(f"cannot parse scheduler list: {e}") from e
+            return [strip_scx_prefix(s) for s in schedulers]
+    raise ValueError(f"unexpected scxctl list output: {output.strip()!r}")
+
+
+def requested_state(scheduler: str, mode: str | None, args: str = "") -> SchedulerState:
+    """The state a successful start/switch with these inputs leaves behind."""
+    if not scheduler or scheduler == "default":
+        return SchedulerState()
+    if args:
+        return SchedulerState(strip_scx_prefix(scheduler), None, tuple(shlex.split(args)))
+    return SchedulerState(strip_scx_prefix(scheduler), (mode or MODES[0]).lower())
+
+
+def pick_action(known: SchedulerState | None) -> str:
+    """start or switch, decided without asking the loader.
+
+    Uses the last known state, or the kernel's own view if there is none
+    yet. A wrong guess is cheap: see ``retry_action``.
+    """
+    if known is not None:
+        return "switch" if known.running else "start"
+    return "switch" if read_sysfs(SCX_STATE_PATH) == "enabled" else "start"
+
+
+def retry_action(action: str, error: str) -> str | None:
+    """The action to retry with after ``action`` failed, if any.
+
+    The loader rejects start while something runs and switch while nothing
+    does, so flip once. Authorization failures, timeouts and cancellation
+    are final.
+    """
+    lower = error.lower()
+    if any(word in lower for word in ("authoriz", "denied", "permission", "cancelled", "timed out")):
+        return None
+    return {"start": "switch", "switch": "start"}.get(action)
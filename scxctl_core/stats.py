@@ -0,0 +1,220 @@
+"""Client for the scx_stats socket that scx schedulers export.
+
+The protocol is newline-delimited JSON over a unix socket:
+
+    {"req": "stats_meta", "args": {}}
+    {"req": "stats", "args": {"target": "top"}}
+
+each answered by ``{"errno": 0, "args": {"resp": ...}}``. The schema
+from ``stats_meta`` decides which fields get a column; only top-level
+scalars are kept, nested per-domain/per-layer structs are skipped.
+"""
+
+import json
+import os
+import socket
+import threading
+from typing import NamedTuple
+
+from .telemetry import HISTORY, Series
+
+STATS_SOCKET = "/var/run/scx/root/stats"
+DEFAULT_INTERVAL = 1.0
+CONNECT_TIMEOUT = 2.0
+RETRY_MIN = 0.5
+RETRY_MAX = 5.0
+
+# array typecodes for the scalar kinds; strings only keep their last value
+KIND_TYPECODES = {"i64": "q", "u64": "Q", "float": "d"}
+
+
+class StatsError(Exception):
+    pass
+
+
+class StatsField(NamedTuple):
+    name: str
+    kind: str
+    desc: str = ""
+
+
+class StatsSchema(NamedTuple):
+    name: str
+    fields: tuple[StatsField, ...]
+
+
+def stats_socket_path() -> str:
+    return os.environ.get("SCXCTL_GUI_STATS_SOCKET", STATS_SOCKET)
+
+
+def field_kind(kind) -> str | None:
+    """"i64", "u64", "float" or "string"; None for dicts, arrays and structs."""
+    if isinstance(kind, dict) and len(kind) == 1 and "Datum" in kind:
+        kind = kind["Datum"]
+    if isinstance(kind, str) and kind.lower() in ("i64", "u64", "float", "string"):
+        return kind.lower()
+    return None
+
+
+def parse_schema(meta: dict) -> StatsSchema:
+    """Pick the top-level struct out of a ``stats_meta`` response."""
+    if not isinstance(meta, dict) or not meta:
+        raise StatsError("scheduler exported no stats metadata")
+
+    def is_top(m):
+        return m.get("top") or (m.get("attrs") or {}).get("top")
+    top = next((m for m in meta.values() if isinstance(m, dict) and is_top(m)), None)
+    if top is None:
+        top = next(iter(meta.values()))
+
+    fields = []
+    for name, field in (top.get("fields") or {}).items():
+        kind = field_kind(field.get("kind"))
+        if kind is None:
+            continue
+        desc = field.get("desc") or (field.get("attrs") or {}).get("desc") or ""
+        fields.append(StatsField(name, kind, desc))
+    return StatsSchema(top.get("name", "stats"), tuple(fields))
+
+
+class StatsColumns:
+    """One typed ring buffer per numeric field of a schema."""
+
+    def __init__(self, schema: StatsSchema, history: int = HISTORY):
+        self.schema = schema
+        self.columns = {f.name: Series(history, KIND_TYPECODES[f.kind])
+                        for f in schema.fields if f.kind in KIND_TYPECODES}
+        self.latest = {}
+
+    def append(self, sample: dict):
+        for field in self.schema.fields:
+            value = sample.get(field.name)
+            if value is None:
+                continue
+            column = self.columns.get(field.name)
+            if column is not None:
+                try:
+                    column.append(value)
+                except (TypeError, OverflowError):
+                    continue
+            self.latest[field.name] = value
+
+
+class StatsClient:
+    """Blocking request/response over one connection."""
+
+    def __init__(self, path: str | None = None, timeout: float = CONNECT_TIMEOUT):
+        self.path = path or stats_socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(self.path)
+        except OSError as e:
+            self._sock.close()
+            raise StatsError(f"cannot connect to {self.path}: {e}") from e
+        self._reader = self._sock.makefile("rb")
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    def request(self, req: str, **args):
+        try:
+            self._sock.sendall(json.dumps({"req": req, "args": args}).encode() + b"\n")
+            line = self._reader.readline()
+        except OSError as e:
+            raise StatsError(f"stats socket: {e}") from e
+        if not line:
+            raise StatsError("stats socket closed")
+        try:
+            reply = json.loads(line)
+        except ValueError as e:
+            raise StatsError(f"bad stats reply: {e}") from e
+        if reply.get("errno"):
+            raise StatsError(f"{req} failed: {os.strerror(reply['errno'])}")
+        return (reply.get("args") or {}).get("resp")
+
+    def schema(self) -> StatsSchema:
+        return parse_schema(self.request("stats_meta"))
+
+    def stats(self, target: str = "top") -> dict:
+        resp = self.request("stats", target=target)
+        if not isinstance(resp, dict):
+            raise StatsError("stats reply is not an object")
+        return resp
+
+
+class StatsStream:
+    """Polls the stats socket on a thread, reconnecting whenever it goes away.
+
+    ``on_schema(columns_or_None)`` fires on every (dis)connect, with fresh
+    StatsColumns because a switched-in scheduler has its own fields;
+    ``on_sample(dict)`` fires after each sample is appended.
+    """
+
+    def __init__(self, on_schema, on_sample, interval: float = DEFAULT_INTERVAL,
+                 path: str | None = None, history: int = HISTORY):
+        self.on_schema = on_schema
+        self.on_sample = on_sample
+        self.interval = interval
+        self.path = path
+        self.history = history
+        self.columns = None
+        self._client = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-stats")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=CONNECT_TIMEOUT + 1)
+
+    def reconnect(self):
+        """Drop the connection and retry now, e.g. after a switch."""
+        self._wake.set()
+
+    def _wait(self, seconds):
+        self._wake.wait(seconds)
+        woken = self._wake.is_set()
+        self._wake.clear()
+        return woken
+
+    def _disconnect(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        if self.columns is not None:
+            self.columns = None
+            self.on_schema(None)
+
+    def _run(self):
+        retry = RETRY_MIN
+        while not self._stop.is_set():
+            if self._client is None:
+                try:
+                    self._client = StatsClient(self.path)
+                    self.columns = StatsColumns(self._client.schema(), self.history)
+                except StatsError:
+                    self._disconnect()
+                    self._wait(retry)
+                    retry = min(retry * 2, RETRY_MAX)
+                    continue
+                retry = RETRY_MIN
+                self.on_schema(self.columns)
+
+            try:
+                sample = self._client.stats()
+            except StatsError:
+                self._disconnect()
+                continue
+            self.columns.append(sample)
+            self.on_sample(sample)
+            if self._wait(self.interval):
+                self._disconnect()
+        self._disconnect()
@@ -0,0 +1,54 @@
+import os
+
+SCX_SYSFS = "/sys/kernel/sched_ext"
+SCX_STATE_PATH = SCX_SYSFS + "/state"
+SCX_OPS_PATH = SCX_SYSFS + "/root/ops"
+
+
+def read_sysfs(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class SysfsFile:
+    """Keeps a sysfs/procfs file open and re-reads it with pread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def read(self) -> str | None:
+        if self._fd is None:
+            try:
+                self._fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+            except OSError:
+                return None
+        try:
+            # seq_file-backed files (e.g. /proc/schedstat) can return short
+            # reads, so keep going until EOF
+            chunks = []
+            offset = 0
+            while True:
+                chunk = os.pread(self._fd, 65536, offset)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                offset += len(chunk)
+            return b"".join(chunks).decode().strip()
+        except OSError:
+            # root/ops vanishes when the scheduler detaches; reopen next time
+            self.close()
+            return None
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def read_kernel_state() -> tuple[str | None, str | None]:
+    """(sched_ext state, attached ops name) straight from sysfs."""
+    return read_sysfs(SCX_STATE_PATH), read_sysfs(SCX_OPS_PATH)
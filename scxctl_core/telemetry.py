@@ -0,0 +1,209 @@
+"""Live sched_ext and CPU-contention telemetry from sysfs and procfs.
+
+Every source stays open and is re-read with pread from one background
+thread. History lives in fixed-size float arrays, so a sampler that runs
+all day uses the same memory as one that just started.
+"""
+
+import math
+import threading
+import time
+from array import array
+
+from .sysfs import SCX_OPS_PATH, SCX_STATE_PATH, SCX_SYSFS, SysfsFile
+
+SCX_EVENTS_PATH = SCX_SYSFS + "/root/events"
+PSI_CPU_PATH = "/proc/pressure/cpu"
+SCHEDSTAT_PATH = "/proc/schedstat"
+
+HISTORY = 120
+DEFAULT_INTERVAL = 1.0
+# Also caps how often listeners are told to redraw
+MIN_INTERVAL = 0.1
+
+# name -> (label, unit) for the metrics a dashboard shows by default
+METRICS = {
+    "psi_some": ("CPU pressure (some)", "%"),
+    "psi_full": ("CPU pressure (full)", "%"),
+    "rq_wait": ("Run-queue wait", "ms/s per CPU"),
+    "timeslices": ("Timeslices", "/s"),
+    "scx_events": ("sched_ext events", "/s"),
+}
+
+
+class Series:
+    """Fixed-size ring buffer of numbers, floats unless ``typecode`` says otherwise."""
+
+    def __init__(self, size: int = HISTORY, typecode: str = "d"):
+        self._data = array(typecode, [0]) * size
+        self._pos = 0
+        self.count = 0
+
+    def append(self, value: float):
+        self._data[self._pos] = value
+        self._pos = (self._pos + 1) % len(self._data)
+        self.count = min(self.count + 1, len(self._data))
+
+    def latest(self) -> float:
+        if not self.count:
+            return math.nan
+        return self._data[self._pos - 1]
+
+    def values(self) -> list[float]:
+        """Oldest first."""
+        size = len(self._data)
+        start = (self._pos - self.count) % size
+        if start + self.count <= size:
+            return self._data[start:start + self.count].tolist()
+        return (self._data[start:] + self._data[:self._pos]).tolist()
+
+    def __len__(self):
+        return self.count
+
+
+def parse_psi(text: str) -> dict[str, float]:
+    """{"some_avg10": .., "some_total": .., "full_avg10": ..} from a PSI file."""
+    values = {}
+    for line in text.splitlines():
+        kind, _, rest = line.partition(" ")
+        for field in rest.split():
+            key, _, value = field.partition("=")
+            try:
+                values[f"{kind}_{key}"] = float(value)
+            except ValueError:
+                pass
+    return values
+
+
+def parse_schedstat_cpus(text: str) -> dict[str, tuple[int, int, int]]:
+    """{"cpuN": (run_ns, wait_ns, timeslices)} from /proc/schedstat."""
+    cpus = {}
+    for line in text.splitlines():
+        if not line.startswith("cpu"):
+            continue
+        parts = line.split()
+        if len(parts) >= 10:
+            cpus[parts[0]] = (int(parts[7]), int(parts[8]), int(parts[9]))
+    return cpus
+
+
+def parse_scx_events(text: str) -> dict[str, int]:
+    events = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1].isdigit():
+            events[parts[0]] = int(parts[1])
+    return events
+
+
+class Telemetry:
+    """Turns successive reads into values and per-second rates.
+
+    ``sample()`` is not thread-safe; TelemetrySampler calls it from its
+    own thread and only hands out ``series`` for reading.
+    """
+
+    def __init__(self, history: int = HISTORY):
+        self.history = history
+        self.series = {}
+        self.scx_state = None
+        self.scx_ops = None
+        self._files = {path: SysfsFile(path) for path in
+                       (SCX_STATE_PATH, SCX_OPS_PATH, SCX_EVENTS_PATH, PSI_CPU_PATH, SCHEDSTAT_PATH)}
+        self._prev = {}
+        self._prev_time = None
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+    def _record(self, name, value):
+        series = self.series.get(name)
+        if series is None:
+            series = self.series[name] = Series(self.history)
+        series.append(value)
+
+    def _rate(self, key, counter, dt):
+        """Per-second rate of a monotonic counter, or None on the first read."""
+        prev = self._prev.get(key)
+        self._prev[key] = counter
+        if prev is None or dt is None or counter < prev:
+            return None
+        return (counter - prev) / dt
+
+    def sample(self, now: float) -> dict[str, float]:
+        dt = now - self._prev_time if self._prev_time is not None else None
+        self._prev_time = now
+        values = {}
+
+        self.scx_state = self._files[SCX_STATE_PATH].read()
+        self.scx_ops = self._files[SCX_OPS_PATH].read()
+
+        psi = self._files[PSI_CPU_PATH].read()
+        if psi:
+            psi = parse_psi(psi)
+            # Over our own interval, from the µs total, rather than avg10
+            for kind in ("some", "full"):
+                if f"{kind}_total" in psi:
+                    rate = self._rate(f"psi_{kind}", psi[f"{kind}_total"], dt)
+                    if rate is not None:
+                        values[f"psi_{kind}"] = rate / 1e4
+
+        schedstat = self._files[SCHEDSTAT_PATH].read()
+        if schedstat:
+            cpus = parse_schedstat_cpus(schedstat)
+            if cpus:
+                wait = sum(c[1] for c in cpus.values())
+                slices = sum(c[2] for c in cpus.values())
+                rate = self._rate("rq_wait", wait, dt)
+                if rate is not None:
+                    values["rq_wait"] = rate / 1e6 / len(cpus)
+                rate = self._rate("timeslices", slices, dt)
+                if rate is not None:
+                    values["timeslices"] = rate
+
+        events = self._files[SCX_EVENTS_PATH].read()
+        if events:
+            total = 0.0
+            for name, count in parse_scx_events(events).items():
+                rate = self._rate(f"scx_event:{name}", count, dt)
+                if rate is not None:
+                    values[f"scx_event:{name}"] = rate
+                    total += rate
+            if dt is not None:
+                values["scx_events"] = total
+        else:
+            # Counters restart with each scheduler; don't diff across them
+            for key in [k for k in self._prev if k.startswith("scx_event:")]:
+                del self._prev[key]
+
+        for name, value in values.items():
+            self._record(name, value)
+        return values
+
+
+class TelemetrySampler:
+    """Runs Telemetry on a background thread and reports each sample."""
+
+    def __init__(self, on_sample, interval: float = DEFAULT_INTERVAL, history: int = HISTORY):
+        self.on_sample = on_sample
+        self.interval = max(interval, MIN_INTERVAL)
+        self.telemetry = Telemetry(history)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-telemetry")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.telemetry.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            values = self.telemetry.sample(time.monotonic())
+            self.on_sample(values)
+            self._stop.wait(self.interval)
@@ -0,0 +1,269 @@
+"""Where the time goes in a scheduler change.
+
+Every start/switch/stop SchedulerCore sends gets a SwitchTrace, with
+these marks (monotonic seconds):
+
+* ``requested``: apply()/stop() was called, i.e. the click
+* ``dispatched``: handed to the backend, after waiting behind another change
+* ``acked``: scx_loader (or scxctl) answered
+* ``sched_ext``: /sys/kernel/sched_ext/state reached ``enabled`` for the
+  new scheduler, or ``disabled`` for a stop
+* ``confirmed``: the first state read back from the loader or `scxctl get`
+  that shows the change
+
+While a change is under way, KernelWatch re-reads the state file every
+few milliseconds and wakes at once on the kernel's sched_ext uevents; it
+stops as soon as the state is reached. TransitionLog keeps the recent
+traces, per-phase histograms for each scheduler and argument set, and
+exports a Chrome trace (chrome://tracing, ui.perfetto.dev).
+"""
+
+import json
+import os
+import select
+import threading
+import time
+from collections import deque
+
+from .probe import LatencyHistogram
+from .sysfs import SCX_STATE_PATH, SCX_SYSFS, SysfsFile
+
+SCX_ENABLE_SEQ_PATH = SCX_SYSFS + "/enable_seq"
+POLL_INTERVAL = 0.005
+KERNEL_TIMEOUT = 30.0
+MAX_TRACES = 200
+
+MARKS = ("requested", "dispatched", "acked", "sched_ext", "confirmed")
+
+# name -> (from mark, to mark, description)
+PHASES = {
+    "queued": ("requested", "dispatched", "waiting behind another change"),
+    "loader": ("dispatched", "acked", "until the loader answered"),
+    "sched_ext": ("dispatched", "sched_ext", "until the kernel state changed (BPF load/unload)"),
+    "confirmed": ("dispatched", "confirmed", "until a status refresh showed it"),
+    "total": ("requested", None, "click to last mark"),
+}
+
+
+class SwitchTrace:
+    def __init__(self, label: str, target):
+        self.label = label  # epoch_label() of the target, e.g. "lavd (gaming)"
+        self.target = target
+        self.name = None  # "start lavd", "switch lavd" or "stop", once known
+        self.error = None
+        self.wall = time.time()
+        self.marks = {"requested": time.monotonic()}
+        # (state, monotonic) as the state file went through them
+        self.kernel_states = []
+        self.kernel = None
+        self.kernel_done = False
+        # A status read after the loader answered, showing the change or not
+        self.status_seen = False
+
+    def mark(self, name: str):
+        self.marks[name] = time.monotonic()
+
+    def duration(self, phase: str) -> float | None:
+        start, end, _ = PHASES[phase]
+        if start not in self.marks:
+            return None
+        if end is None:
+            return max(self.marks.values()) - self.marks[start]
+        if end not in self.marks:
+            return None
+        return max(self.marks[end] - self.marks[start], 0.0)
+
+    def watch_kernel(self, on_done):
+        """Timestamp the sched_ext state from now on.
+
+        ``on_done(states, reached)`` runs on the watch thread; hand both to
+        ``set_kernel`` on the thread that owns the trace.
+        """
+        self.kernel = KernelWatch(self.target.running, on_done)
+        if not self.kernel.start():
+            self.kernel = None
+
+    def see_state(self, state, refreshed: bool):
+        """A state from a refresh (``refreshed``) or a watch event."""
+        if state == self.target and "confirmed" not in self.marks:
+            self.mark("confirmed")
+        if refreshed and "acked" in self.marks:
+            self.status_seen = True
+
+    def set_kernel(self, states, reached):
+        self.kernel_states = states
+        self.kernel_done = True
+        if reached is not None:
+            self.marks["sched_ext"] = reached
+
+    @property
+    def complete(self) -> bool:
+        if self.error is not None:
+            return True
+        kernel_done = self.kernel is None or self.kernel_done
+        status_done = "confirmed" in self.marks or self.status_seen
+        return "acked" in self.marks and status_done and kernel_done
+
+    def close(self):
+        if self.kernel is not None:
+            self.kernel.cancel()
+
+
+class KernelWatch:
+    """Watches /sys/kernel/sched_ext/state on a thread until it reaches the target.
+
+    After a switch the state goes disabling, disabled, enabling, enabled;
+    ``enable_seq`` (or, on older kernels, having seen anything but
+    enabled) tells the new scheduler's ``enabled`` from the old one's.
+    """
+
+    def __init__(self, enable: bool, on_done, timeout: float = KERNEL_TIMEOUT):
+        self.enable = enable
+        self.on_done = on_done
+        self.timeout = timeout
+        self._cancelled = threading.Event()
+        self._state_file = SysfsFile(SCX_STATE_PATH)
+        self._seq_file = SysfsFile(SCX_ENABLE_SEQ_PATH)
+        self._base_seq = None
+
+    def start(self) -> bool:
+        """False, and nothing started, without sched_ext."""
+        state = self._state_file.read()
+        if state is None:
+            self._state_file.close()
+            self._seq_file.close()
+            return False
+        seq = self._seq_file.read()
+        self._base_seq = int(seq) if seq and seq.isdigit() else None
+        threading.Thread(target=self._run, args=(state,), daemon=True, name="scx-transition").start()
+        return True
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _reached(self, state, seen_other):
+        if not self.enable:
+            return state == "disabled"
+        if state != "enabled":
+            return False
+        if self._base_seq is not None:
+            seq = self._seq_file.read()
+            return bool(seq and seq.isdigit() and int(seq) > self._base_seq)
+        return seen_other
+
+    def _run(self, initial):
+        from .uevent import UeventSocket
+        try:
+            uevents = UeventSocket()
+        except OSError:
+            uevents = None
+        states = []
+        last = initial
+        seen_other = initial != "enabled"
+        reached = None
+        deadline = time.monotonic() + self.timeout
+        try:
+            while not self._cancelled.is_set() and time.monotonic() < deadline:
+                state = self._state_file.read()
+                now = time.monotonic()
+                if state != last:
+                    states.append((state, now))
+                    last = state
+                    seen_other = seen_other or state != "enabled"
+                if self._reached(state, seen_other):
+                    reached = now
+                    break
+                if uevents is not None:
+                    # An attach or detach wakes us at once
+                    if select.select([uevents], [], [], POLL_INTERVAL)[0]:
+                        uevents.read()
+                else:
+                    self._cancelled.wait(POLL_INTERVAL)
+        finally:
+            if uevents is not None:
+                uevents.close()
+            self._state_file.close()
+            self._seq_file.close()
+        if not self._cancelled.is_set():
+            self.on_done(states, reached)
+
+
+class TransitionLog:
+    """Recent traces plus per-(label, phase) histograms of completed changes."""
+
+    def __init__(self, max_traces: int = MAX_TRACES):
+        self.traces = deque(maxlen=max_traces)
+        self.histograms = {}
+
+    def add(self, trace: SwitchTrace):
+        self.traces.append(trace)
+        if trace.error is not None:
+            return
+        for phase in PHASES:
+            seconds = trace.duration(phase)
+            if seconds is not None:
+                histogram = self.histograms.get((trace.label, phase))
+                if histogram is None:
+                    histogram = self.histograms[(trace.label, phase)] = LatencyHistogram()
+                histogram.record(round(seconds * 1e6))
+
+    def summary(self) -> list[tuple[str, str, dict]]:
+        """[(label, phase, LatencyHistogram.summary() in µs)], by label then phase order."""
+        order = list(PHASES)
+        return [(label, phase, histogram.summary()) for (label, phase), histogram
+                in sorted(self.histograms.items(), key=lambda item: (item[0][0], order.index(item[0][1])))]
+
+    def chrome_trace(self) -> dict:
+        """Trace Event Format: one row per phase, one slice per change."""
+        rows = ["change", *PHASES, "sched_ext state"]
+        events = [{"ph": "M", "name": "process_name", "pid": 1, "args": {"name": "scxctl GUI switches"}}]
+        events += [{"ph": "M", "name": "thread_name", "pid": 1, "tid": tid, "args": {"name": name}}
+                   for tid, name in enumerate(rows) if name != "total"]
+
+        for trace in self.traces:
+            start = trace.marks["requested"]
+
+            def ts(mark):
+                return round((trace.wall + mark - start) * 1e6)
+            marks_ms = {name: round((t - start) * 1000, 3) for name, t in trace.marks.items()}
+            total = trace.duration("total") or 0.0
+            events.append({"ph": "X", "name": trace.name or trace.label, "cat": "switch", "pid": 1,
+                           "tid": 0, "ts": ts(start), "dur": round(total * 1e6),
+                           "args": {"target": trace.label, "error": trace.error, "marks_ms": marks_ms}})
+            for phase, (begin, _, description) in PHASES.items():
+                seconds = trace.duration(phase)
+                if phase == "total" or seconds is None:
+                    continue
+                events.append({"ph": "X", "name": f"{phase} {trace.label}", "cat": phase, "pid": 1,
+                               "tid": rows.index(phase), "ts": ts(trace.marks[begin]),
+                               "dur": round(seconds * 1e6), "args": {"what": description}})
+            for state, when in trace.kernel_states:
+                events.append({"ph": "i", "s": "t", "name": state, "cat": "sched_ext", "pid": 1,
+                               "tid": len(rows) - 1, "ts": ts(when)})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        os.replace(tmp, path)
+
+
+def format_ms(us: int) -> str:
+    return f"{us / 1000:,.1f} ms"
+
+
+def format_trace(trace: SwitchTrace) -> str:
+    start = trace.marks["requested"]
+    marks = sorted((when, name) for name, when in trace.marks.items() if name != "requested")
+    parts = [f"{name} +{(when - start) * 1000:,.0f} ms" for when, name in marks]
+    if trace.error is None and not trace.complete:
+        parts.append("cut short by the next change")
+    elif trace.error is None:
+        if "confirmed" not in trace.marks:
+            parts.append("status never showed it")
+        if trace.kernel is None:
+            parts.append("no sched_ext state to watch")
+        elif "sched_ext" not in trace.marks:
+            parts.append("sched_ext state not reached")
+    return f"{trace.name or trace.label}: " + ", ".join(parts)
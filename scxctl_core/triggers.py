@@ -0,0 +1,370 @@
+"""Non-process conditions for the rules engine: audio xruns, session
+lock, CPU/memory/IO pressure, power source.
+
+All are optional. ``start()`` raises OSError (no pw-top, no logind, no
+PSI, no netlink) and the engine carries on without that condition.
+"""
+
+import os
+import queue
+import select
+import shutil
+import subprocess
+import threading
+from typing import NamedTuple
+
+from .telemetry import parse_psi
+from .uevent import UeventSocket
+
+try:
+    from jeepney import DBusAddress, MatchRule, Properties, message_bus, new_method_call
+    from jeepney.io.threading import DBusRouter, RouterClosed, open_dbus_connection
+    from jeepney.low_level import HeaderFields
+    from jeepney.wrappers import DBusErrorResponse, unwrap_msg
+    HAVE_JEEPNEY = True
+except ImportError:
+    HAVE_JEEPNEY = False
+
+LOGIND = "org.freedesktop.login1"
+LOGIND_PATH = "/org/freedesktop/login1"
+SESSION_INTERFACE = "org.freedesktop.login1.Session"
+PROPS_INTERFACE = "org.freedesktop.DBus.Properties"
+DBUS_TIMEOUT = 5
+
+PSI_DIR = "/proc/pressure"
+CGROUP_ROOT = "/sys/fs/cgroup"
+POWER_SUPPLY_DIR = "/sys/class/power_supply"
+
+
+def parse_pw_top_line(line: str) -> tuple[int, int] | None:
+    """(node id, ERR count) from one `pw-top -b` row, or None for headers.
+
+    Columns: S ID QUANT RATE WAIT BUSY W/Q B/Q ERR FORMAT NAME
+    """
+    parts = line.split()
+    if len(parts) < 9 or not parts[1].isdigit() or not parts[8].isdigit():
+        return None
+    return int(parts[1]), int(parts[8])
+
+
+class XrunMonitor:
+    """Calls ``on_xruns(n)`` from its thread when PipeWire nodes report new errors.
+
+    pw-top's ERR column is a running count per node, so only increases
+    are xruns; a node that goes away and comes back starts over.
+    """
+
+    def __init__(self, on_xruns):
+        self.on_xruns = on_xruns
+        self._proc = None
+        self._thread = None
+
+    def start(self):
+        pw_top = shutil.which("pw-top")
+        if pw_top is None:
+            raise OSError("pw-top not found (PipeWire tools not installed)")
+        self._proc = subprocess.Popen([pw_top, "-b"], stdin=subprocess.DEVNULL,
+                                      stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        self._thread = threading.Thread(target=self._read, daemon=True, name="scx-xruns")
+        self._thread.start()
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self._proc is not None:
+            self._proc.stdout.close()
+
+    def _read(self):
+        errors = {}
+        for line in self._proc.stdout:
+            row = parse_pw_top_line(line)
+            if row is None:
+                continue
+            node, count = row
+            previous = errors.get(node)
+            errors[node] = count
+            if previous is not None and count > previous:
+                self.on_xruns(count - previous)
+
+
+class SessionLockMonitor:
+    """Calls ``on_change(locked)`` from its thread when the user's sessions lock or unlock.
+
+    Follows logind's LockedHint, which screen lockers set on every major
+    desktop. Locked means every graphical session of ours is locked.
+    """
+
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self.locked = False
+        self._sessions = {}
+        self._conn = None
+        self._router = None
+        self._filter = None
+        self._signals = queue.Queue(maxsize=64)
+        self._thread = None
+
+    def start(self):
+        if not HAVE_JEEPNEY:
+            raise OSError("jeepney is not installed")
+        try:
+            self._conn = open_dbus_connection(bus="SYSTEM")
+        except (OSError, ValueError, KeyError) as e:
+            raise OSError(f"cannot connect to the system bus: {e}") from e
+        self._router = DBusRouter(self._conn)
+        rule = MatchRule(type="signal", interface=PROPS_INTERFACE, member="PropertiesChanged",
+                         path_namespace=f"{LOGIND_PATH}/session")
+        rule.add_arg_condition(0, SESSION_INTERFACE)
+        try:
+            self._call(message_bus.AddMatch(rule))
+            self._refresh_sessions()
+        except OSError:
+            self.stop()
+            raise
+        self._filter = self._router.filter(rule, queue=self._signals)
+        self.locked = self._all_locked()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-lock")
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._filter.close()
+            self._signals.put(None)
+            self._thread.join(timeout=1)
+        if self._router is not None:
+            self._router.close()
+            self._conn.close()
+
+    def _call(self, msg):
+        try:
+            return unwrap_msg(self._router.send_and_get_reply(msg, timeout=DBUS_TIMEOUT))
+        except (DBusErrorResponse, TimeoutError, RouterClosed) as e:
+            raise OSError(f"logind: {e}") from e
+
+    def _refresh_sessions(self):
+        manager = DBusAddress(LOGIND_PATH, bus_name=LOGIND, interface=f"{LOGIND}.Manager")
+        sessions = self._call(new_method_call(manager, "ListSessions"))[0]
+        uid = os.getuid()
+        current = {}
+        for _id, session_uid, _user, _seat, path in sessions:
+            if session_uid != uid:
+                continue
+            props = Properties(DBusAddress(path, bus_name=LOGIND, interface=SESSION_INTERFACE))
+            try:
+                all_props = self._call(props.get_all())[0]
+            except OSError:
+                continue  # closed in between
+            if all_props.get("Type", ("s", ""))[1] in ("x11", "wayland", "mir"):
+                current[path] = all_props.get("LockedHint", ("b", False))[1]
+        self._sessions = current
+
+    def _all_locked(self):
+        return bool(self._sessions) and all(self._sessions.values())
+
+    def _run(self):
+        while True:
+            msg = self._signals.get()
+            if msg is None:
+                return
+            path = msg.header.fields.get(HeaderFields.path)
+            _, changed, _ = msg.body
+            if "LockedHint" not in changed and path in self._sessions:
+                continue
+            # Re-list rather than patch one entry: sessions that closed
+            # since would otherwise keep counting as unlocked
+            try:
+                self._refresh_sessions()
+            except OSError:
+                continue
+            locked = self._all_locked()
+            if locked != self.locked:
+                self.locked = locked
+                self.on_change(locked)
+
+
+class PressureTrigger(NamedTuple):
+    """``kind`` ("some"/"full") stall above ``percent`` of a ``window``-second window."""
+
+    resource: str = "cpu"
+    kind: str = "some"
+    percent: float = 10.0
+    window: float = 2.0
+    cgroup: str | None = None  # relative to CGROUP_ROOT; None for system-wide
+
+    @property
+    def path(self) -> str:
+        if self.cgroup is None:
+            return os.path.join(PSI_DIR, self.resource)
+        return os.path.join(CGROUP_ROOT, self.cgroup.strip("/"), f"{self.resource}.pressure")
+
+    def spec(self) -> bytes:
+        window_us = int(self.window * 1e6)
+        return f"{self.kind} {int(window_us * self.percent / 100)} {window_us}".encode() + b"\0"
+
+    def describe(self) -> str:
+        where = f" in {self.cgroup}" if self.cgroup else ""
+        return f"{self.resource} pressure{where} ({self.kind} > {self.percent:g}% over {self.window:g}s)"
+
+
+def read_pressure(trigger: PressureTrigger) -> dict[str, float]:
+    """The trigger file's current values (see telemetry.parse_psi); empty if unreadable."""
+    try:
+        with open(trigger.path) as f:
+            return parse_psi(f.read())
+    except OSError:
+        return {}
+
+
+def format_pressure(trigger: PressureTrigger, values: dict, since: tuple[float, float] | None = None,
+                    now: float | None = None) -> str:
+    """``since`` is an earlier (time, total) of the trigger's kind, for the stall since then."""
+    if not values:
+        return "pressure unknown"
+    text = f"some avg10 {values.get('some_avg10', 0):.1f}%, full avg10 {values.get('full_avg10', 0):.1f}%"
+    total = values.get(f"{trigger.kind}_total")
+    if since is not None and total is not None and now is not None and now > since[0]:
+        stalled = 100 * (total - since[1]) / ((now - since[0]) * 1e6)
+        text = f"{trigger.kind} {stalled:.1f}% over the last {now - since[0]:.1f}s, {text}"
+    return text
+
+
+class PressureMonitor:
+    """PSI triggers: ``on_event(key)`` from its thread each time one fires.
+
+    The kernel checks the threshold itself and wakes us with POLLPRI, at
+    most once per window while the stall lasts, so nothing here polls.
+    Wakeups the stall total can't account for (new triggers sometimes
+    fire for nothing) are dropped. Unprivileged users may only set
+    system-wide triggers whose window is a multiple of 2 s; a delegated
+    cgroup's own files have no such limit.
+    """
+
+    def __init__(self, on_event):
+        self.on_event = on_event
+        self._fds = {}  # fd -> [key, trigger, stall total at the last wakeup]
+        self._stop_r = self._stop_w = None
+        self._thread = None
+
+    def add(self, key, trigger: PressureTrigger):
+        """Register before start(). Raises OSError naming the file."""
+        try:
+            fd = os.open(trigger.path, os.O_RDWR | os.O_NONBLOCK | os.O_CLOEXEC)
+        except OSError as e:
+            raise OSError(e.errno, f"{trigger.path}: {e.strerror}") from e
+        try:
+            os.write(fd, trigger.spec())
+        except OSError as e:
+            os.close(fd)
+            raise OSError(e.errno, f"cannot set a trigger on {trigger.path}: {e.strerror}") from e
+        self._fds[fd] = [key, trigger, self._total(trigger)]
+
+    @staticmethod
+    def _total(trigger):
+        return read_pressure(trigger).get(f"{trigger.kind}_total", 0.0)
+
+    def start(self):
+        self._stop_r, self._stop_w = os.pipe2(os.O_CLOEXEC)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-pressure")
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            os.write(self._stop_w, b"x")
+            self._thread.join(timeout=1)
+            os.close(self._stop_r)
+            os.close(self._stop_w)
+        for fd in self._fds:
+            os.close(fd)
+        self._fds.clear()
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._stop_r, select.POLLIN)
+        for fd in self._fds:
+            poller.register(fd, select.POLLPRI)
+        while True:
+            for fd, events in poller.poll():
+                if fd == self._stop_r:
+                    return
+                if events & (select.POLLERR | select.POLLNVAL):
+                    # The cgroup went away; its trigger never fires again
+                    poller.unregister(fd)
+                    continue
+                entry = self._fds[fd]
+                key, trigger, last = entry
+                entry[2] = total = self._total(trigger)
+                if total - last >= trigger.percent / 100 * trigger.window * 1e6:
+                    self.on_event(key)
+
+
+def _read_attr(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def on_ac_power(base: str = POWER_SUPPLY_DIR) -> bool:
+    """Whether a charger is online. Machines without a battery are always on AC."""
+    try:
+        supplies = os.listdir(base)
+    except OSError:
+        return True
+    battery = False
+    for name in supplies:
+        kind = _read_attr(os.path.join(base, name, "type"))
+        if kind == "Battery":
+            # Peripherals (mice, headsets) report batteries too
+            battery = battery or _read_attr(os.path.join(base, name, "scope")) != "Device"
+        elif kind in ("Mains", "USB") and _read_attr(os.path.join(base, name, "online")) == "1":
+            return True
+    return not battery
+
+
+class PowerMonitor:
+    """Calls ``on_change(on_ac)`` from its thread when the power source changes.
+
+    Listens for power_supply uevents on the kernel's netlink socket (no
+    udev, no UPower) and only then reads sysfs.
+    """
+
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self.on_ac = True
+        self._uevents = None
+        self._stop_r = self._stop_w = None
+        self._thread = None
+
+    def start(self):
+        self._uevents = UeventSocket()
+        self._stop_r, self._stop_w = os.pipe2(os.O_CLOEXEC)
+        self.on_ac = on_ac_power()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="scx-power")
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            os.write(self._stop_w, b"x")
+            self._thread.join(timeout=1)
+            os.close(self._stop_r)
+            os.close(self._stop_w)
+        if self._uevents is not None:
+            self._uevents.close()
+
+    def _run(self):
+        while True:
+            ready, _, _ = select.select([self._uevents, self._stop_r], [], [])
+            if self._stop_r in ready:
+                return
+            events = self._uevents.read()
+            if not any(e.action == "overflow" or e.env.get("SUBSYSTEM") == "power_supply"
+                       for e in events):
+                continue
+            on_ac = on_ac_power()
+            if on_ac != self.on_ac:
+                self.on_ac = on_ac
+                self.on_change(on_ac)
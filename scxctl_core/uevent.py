@@ -0,0 +1,72 @@
+"""Kernel kobject uevents, read straight off the netlink socket.
+
+No udev involved: we bind to the kernel multicast group, which any user
+may do, and get one datagram per event.
+"""
+
+import socket
+from typing import NamedTuple
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_GROUP = 1
+
+
+class Uevent(NamedTuple):
+    action: str
+    devpath: str
+    env: dict
+
+
+OVERFLOW = Uevent("overflow", "", {})
+
+
+def parse_uevent(data: bytes) -> Uevent | None:
+    fields = data.split(b"\0")
+    header = fields[0].decode(errors="replace")
+    if "@" not in header:
+        # udev re-broadcasts ("libudev" magic) only go to group 2
+        return None
+    action, devpath = header.split("@", 1)
+    env = {}
+    for field in fields[1:]:
+        key, sep, value = field.partition(b"=")
+        if sep:
+            env[key.decode(errors="replace")] = value.decode(errors="replace")
+    return Uevent(action, devpath, env)
+
+
+class UeventSocket:
+    """Non-blocking netlink socket; use ``fileno()`` with select/poll."""
+
+    def __init__(self):
+        self._sock = socket.socket(socket.AF_NETLINK,
+                                   socket.SOCK_DGRAM | socket.SOCK_CLOEXEC | socket.SOCK_NONBLOCK,
+                                   NETLINK_KOBJECT_UEVENT)
+        try:
+            self._sock.bind((0, KERNEL_GROUP))
+        except OSError:
+            self._sock.close()
+            raise
+
+    def fileno(self) -> int:
+        return self._sock.fileno()
+
+    def close(self):
+        self._sock.close()
+
+    def read(self) -> list[Uevent]:
+        """Drain everything queued without blocking."""
+        events = []
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                return events
+            except OSError:
+                # ENOBUFS: we fell behind and the kernel dropped some, so
+                # callers can't know what they missed and should re-read.
+                events.append(OVERFLOW)
+                return events
+            event = parse_uevent(data)
+            if event is not None:
+                events.append(event)
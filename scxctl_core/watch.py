@@ -0,0 +1,139 @@
+"""Event-driven scheduler state tracking.
+
+Sources, all optional:
+
+* scx_loader's PropertiesChanged signals (needs a LoaderClient)
+* kernel uevents for /kernel/sched_ext/root, sent when a BPF scheduler
+  attaches or detaches, including when one dies on its own
+* as a last resort, an adaptive poll of /sys/kernel/sched_ext/state that
+  backs off while nothing changes
+"""
+
+import os
+import queue
+import select
+import threading
+import time
+
+from .loader import LoaderError
+from .sysfs import SCX_OPS_PATH, SCX_STATE_PATH, SysfsFile
+from .uevent import UeventSocket
+
+# Bursts (remove+add on a switch, one signal per property) collapse into
+# a single notification after this quiet period.
+DEBOUNCE = 0.02
+POLL_MIN = 0.25
+POLL_MAX = 5.0
+
+
+class StateWatcher:
+    """Calls ``on_change(state)`` from a background thread on every change.
+
+    With a loader, ``state`` is the fresh SchedulerState. Without one it
+    is None, meaning "changed, query it yourself".
+    """
+
+    def __init__(self, on_change, loader=None):
+        self.on_change = on_change
+        self.loader = loader
+        self.sources = []
+        self._kick = threading.Event()
+        self._stopping = False
+        self._signals = queue.Queue(maxsize=64)
+        self._filter = None
+        self._uevents = None
+        self._wake_r, self._wake_w = os.pipe2(os.O_CLOEXEC | os.O_NONBLOCK)
+        self._threads = []
+        self._last = None
+
+    def start(self):
+        if self.loader is not None:
+            try:
+                self._filter = self.loader.subscribe(self._signals)
+                self.sources.append("dbus")
+                self._spawn(self._signal_loop)
+            except LoaderError:
+                pass
+
+        if os.path.exists(SCX_STATE_PATH):
+            try:
+                self._uevents = UeventSocket()
+                self.sources.append("uevent")
+            except OSError:
+                self.sources.append("sysfs-poll")
+            self._spawn(self._kernel_loop)
+
+        self._spawn(self._notify_loop)
+
+    def stop(self):
+        self._stopping = True
+        self._kick.set()
+        os.write(self._wake_w, b"x")
+        if self._filter is not None:
+            self._filter.close()
+        try:
+            self._signals.put_nowait(None)
+        except queue.Full:
+            pass
+        for thread in self._threads:
+            thread.join(timeout=1)
+        if self._uevents is not None:
+            self._uevents.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _spawn(self, target):
+        thread = threading.Thread(target=target, daemon=True, name=f"scx-watch-{target.__name__}")
+        self._threads.append(thread)
+        thread.start()
+
+    def _signal_loop(self):
+        while not self._stopping:
+            if self._signals.get() is not None:
+                self._kick.set()
+
+    def _kernel_loop(self):
+        if self._uevents is not None:
+            while not self._stopping:
+                ready, _, _ = select.select([self._uevents, self._wake_r], [], [])
+                if self._uevents in ready:
+                    events = self._uevents.read()
+                    if any(e.action == "overflow" or e.devpath.startswith("/kernel/sched_ext")
+                           for e in events):
+                        self._kick.set()
+            return
+
+        state_file = SysfsFile(SCX_STATE_PATH)
+        ops_file = SysfsFile(SCX_OPS_PATH)
+        last = (state_file.read(), ops_file.read())
+        interval = POLL_MIN
+        while not self._stopping:
+            select.select([self._wake_r], [], [], interval)
+            current = (state_file.read(), ops_file.read())
+            if current != last:
+                last = current
+                interval = POLL_MIN
+                self._kick.set()
+            else:
+                interval = min(interval * 2, POLL_MAX)
+        state_file.close()
+        ops_file.close()
+
+    def _notify_loop(self):
+        while True:
+            self._kick.wait()
+            if self._stopping:
+                return
+            time.sleep(DEBOUNCE)
+            self._kick.clear()
+
+            state = None
+            if self.loader is not None:
+                try:
+                    state = self.loader.get_state()
+                except LoaderError:
+                    continue
+                if state == self._last:
+                    continue
+                self._last = state
+            self.on_change(state)
@@ -0,0 +1,41 @@
+"""Helper processes: benchmark workloads, the latency probe, the rules and metrics daemons.
+
+They run in a fresh interpreter that imports only scxctl_core, so they
+neither share the GUI's GIL nor drag the toolkit in. In the frozen build
+the app itself is re-executed with WORKER_FLAG; both frontends hand that
+to ``run_worker`` before touching any widgets.
+"""
+
+import importlib
+import os
+import sys
+
+WORKER_FLAG = "--scxctl-worker"
+
+ENTRY_POINTS = {
+    "bench": ("scxctl_core.bench", "worker_main"),
+    "probe": ("scxctl_core.probe", "probe_main"),
+    "rules": ("scxctl_core.rules", "main"),
+    "exporter": ("scxctl_core.exporter", "main"),
+}
+
+
+def worker_command(entry: str, args=()) -> list[str]:
+    args = [entry, *map(str, args)]
+    if getattr(sys, "frozen", False):
+        return [sys.executable, WORKER_FLAG, *args]
+    return [sys.executable, "-c",
+            "import sys; from scxctl_core.worker import run_worker; sys.exit(run_worker(sys.argv[1:]))",
+            *args]
+
+
+def worker_env() -> dict:
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    return env
+
+
+def run_worker(argv) -> int:
+    module, func = ENTRY_POINTS[argv[0]]
+    return getattr(importlib.import_module(module), func)(argv[1:])
@@ -1,10 +1,839 @@
 import sys
-import subprocess
-import ast
+
+from scxctl_core.startup import GIVE_UP_AFTER, StartupProfile, profile_path, without_profile_flag
+
+# Off (and free) unless --profile-startup is given
+profile = StartupProfile("gtk", profile_path(sys.argv[1:]) if __name__ == "__main__" else None)
+profile.mark("interpreter")
+
+from scxctl_core.worker import WORKER_FLAG, run_worker
+
+if __name__ == "__main__":
+    # Before gi is loaded: helper processes and --remote never need it
+    if sys.argv[1:2] == [WORKER_FLAG]:
+        sys.exit(run_worker(sys.argv[2:]))
+    if sys.argv[1:2] == ["--remote"]:
+        from scxctl_core.control import remote_main
+        sys.exit(remote_main(sys.argv[2:]))
+
+import time
+from collections import deque
 import gi
 
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gtk, GLib, Gio, Pango, Gdk
+from gi.repository import Gtk, GLib, Gio, Gdk
+
+profile.mark("gi import")
+
+from scxctl_core import METRICS, GuardThresholds, SchedulerCore, scheduler_emoji
+from scxctl_core.probe import format_overhead, format_summary
+
+profile.mark("core import")
+
+# The log view keeps at most this many lines and is redrawn at most once
+# per frame, however fast entries arrive.
+LOG_MAX_LINES = 2000
+LOG_FLUSH_MS = 16
+
+
+def run_on_main_loop(fn):
+    """SchedulerCore dispatch: run ``fn`` on the GTK main loop."""
+    def once():
+        fn()
+        return GLib.SOURCE_REMOVE
+    GLib.idle_add(once)
+
+
+class BenchmarkWindow(Gtk.Window):
+    """Collects scheduler/mode/args cases from the main window and compares them.
+
+    Like RulesWindow, it imports its part of scxctl_core when first opened.
+    """
+
+    def __init__(self, app):
+        from scxctl_core.bench import DEFAULT_DURATION
+        super().__init__(title="Scheduler Benchmark", transient_for=app.window)
+        self.app = app
+        self.runner = None
+        self.cases = []
+        self.last_results = []
+        self.set_default_size(960, 420)
+        self.set_hide_on_close(True)
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
+        box.set_margin_top(16)
+        box.set_margin_bottom(16)
+        box.set_margin_start(16)
+        box.set_margin_end(16)
+        self.set_child(box)
+
+        hint = Gtk.Label(label="Pick a scheduler, mode and arguments in the main window, then add them here.")
+        hint.set_halign(Gtk.Align.START)
+        hint.set_wrap(True)
+        box.append(hint)
+
+        self.case_label = Gtk.Label(label="No configurations yet")
+        self.case_label.set_halign(Gtk.Align.START)
+        self.case_label.add_css_class("card")
+        box.append(self.case_label)
+
+        btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.add_btn = Gtk.Button(label="Add Current Selection")
+        self.add_btn.connect("clicked", self.on_add_clicked)
+        self.clear_btn = Gtk.Button(label="Clear")
+        self.clear_btn.connect("clicked", self.on_clear_clicked)
+        self.duration_spin = Gtk.SpinButton.new_with_range(0.5, 60.0, 0.5)
+        self.duration_spin.set_value(DEFAULT_DURATION)
+        self.duration_spin.set_tooltip_text("Seconds per workload")
+        self.run_btn = Gtk.Button(label="Run Benchmark")
+        self.run_btn.add_css_class("suggested-action")
+        self.run_btn.connect("clicked", self.on_run_clicked)
+        self.export_btn = Gtk.Button(label="Export…")
+        self.export_btn.connect("clicked", self.on_export_clicked)
+        self.export_btn.set_sensitive(False)
+        for widget in (self.add_btn, self.clear_btn, self.duration_spin, self.run_btn, self.export_btn):
+            btn_box.append(widget)
+        box.append(btn_box)
+
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_vexpand(True)
+        self.results_grid = Gtk.Grid()
+        self.results_grid.set_row_spacing(6)
+        self.results_grid.set_column_spacing(18)
+        scroll.set_child(self.results_grid)
+        box.append(scroll)
+        self.reset_results()
+
+    def reset_results(self):
+        from scxctl_core.bench import COLUMNS
+        child = self.results_grid.get_first_child()
+        while child is not None:
+            self.results_grid.remove(child)
+            child = self.results_grid.get_first_child()
+        for col, title in enumerate(["Configuration", *COLUMNS.values()]):
+            label = Gtk.Label(label=title)
+            label.add_css_class("title-4")
+            self.results_grid.attach(label, col, 0, 1, 1)
+        self.result_rows = 0
+
+    def on_add_clicked(self, btn):
+        from scxctl_core.bench import BenchCase
+        app = self.app
+        sched_idx = app.sched_combo.get_selected()
+        if sched_idx == Gtk.INVALID_LIST_POSITION:
+            return
+        mode_idx = app.mode_combo.get_selected()
+        mode = app.mode_model.get_string(mode_idx) if mode_idx != Gtk.INVALID_LIST_POSITION else None
+        case = BenchCase(app.sched_model.get_string(sched_idx), mode, app.args_entry.get_text().strip())
+        if case not in self.cases:
+            self.cases.append(case)
+            self.case_label.set_text("\n".join(c.label for c in self.cases))
+
+    def on_clear_clicked(self, btn):
+        self.cases = []
+        self.case_label.set_text("No configurations yet")
+
+    def on_run_clicked(self, btn):
+        from scxctl_core.bench import BenchError, BenchmarkRunner
+        if self.runner is not None:
+            self.runner.cancel()
+            self.app.core.cancel()
+            return
+        if not self.cases:
+            return
+        self.reset_results()
+        self.runner = BenchmarkRunner(self.app.core, self.cases, on_result=self.add_result,
+                                      on_finish=self.finished, duration=self.duration_spin.get_value())
+        try:
+            self.runner.start()
+        except BenchError as e:
+            self.runner = None
+            self.app.core.log("bench", f"❌ Error: {e}")
+            return
+        self.run_btn.set_label("Cancel Benchmark")
+        for widget in (self.add_btn, self.clear_btn, self.export_btn):
+            widget.set_sensitive(False)
+
+    def add_result(self, result):
+        from scxctl_core.bench import COLUMNS, format_metric as format_bench
+        self.result_rows += 1
+        row = self.result_rows
+        name = Gtk.Label(label=result.case.label)
+        name.set_halign(Gtk.Align.START)
+        self.results_grid.attach(name, 0, row, 1, 1)
+        if result.error:
+            error = Gtk.Label(label=f"❌ {result.error}")
+            error.set_halign(Gtk.Align.START)
+            self.results_grid.attach(error, 1, row, len(COLUMNS), 1)
+            return
+        for col, key in enumerate(COLUMNS, start=1):
+            value = Gtk.Label(label=format_bench(result.metrics.get(key, float("nan"))))
+            value.set_halign(Gtk.Align.END)
+            self.results_grid.attach(value, col, row, 1, 1)
+
+    def finished(self, results):
+        self.runner = None
+        self.last_results = results
+        self.run_btn.set_label("Run Benchmark")
+        self.add_btn.set_sensitive(True)
+        self.clear_btn.set_sensitive(True)
+        self.export_btn.set_sensitive(bool(results))
+
+    def on_export_clicked(self, btn):
+        dialog = Gtk.FileDialog(title="Export Results", initial_name="scx-benchmark.csv")
+        dialog.save(self, None, self.on_export_chosen)
+
+    def on_export_chosen(self, dialog, result):
+        from scxctl_core.bench import export_csv, export_json
+        try:
+            path = dialog.save_finish(result).get_path()
+        except GLib.Error:
+            return  # dismissed
+        try:
+            if path.endswith(".json"):
+                export_json(self.last_results, path)
+            else:
+                export_csv(self.last_results, path)
+        except OSError as e:
+            self.app.core.log("bench", f"❌ Could not export: {e}")
+            return
+        self.app.core.log("bench", f"Exported results to {path}")
+
+
+class RulesWindow(Gtk.Window):
+    """Edits the rules file and shows what the rules daemon has been doing."""
+
+    def __init__(self, app):
+        from scxctl_core.rules import rules_path
+        super().__init__(title="Automatic Switching Rules", transient_for=app.window)
+        self.app = app
+        self.poll_source = None
+        self.set_default_size(760, 620)
+        self.set_hide_on_close(True)
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        box.set_margin_top(16)
+        box.set_margin_bottom(16)
+        box.set_margin_start(16)
+        box.set_margin_end(16)
+        self.set_child(box)
+
+        self.daemon_label = Gtk.Label()
+        self.daemon_label.set_halign(Gtk.Align.START)
+        self.daemon_label.set_wrap(True)
+        self.daemon_label.set_selectable(True)
+        box.append(self.daemon_label)
+
+        editor_scroll = Gtk.ScrolledWindow()
+        editor_scroll.set_vexpand(True)
+        self.editor = Gtk.TextView()
+        self.editor.set_monospace(True)
+        editor_scroll.set_child(self.editor)
+        box.append(editor_scroll)
+
+        self.error_label = Gtk.Label(label="")
+        self.error_label.set_halign(Gtk.Align.START)
+        self.error_label.set_wrap(True)
+        self.error_label.add_css_class("error")
+        box.append(self.error_label)
+
+        btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        path_label = Gtk.Label(label=rules_path())
+        path_label.set_hexpand(True)
+        path_label.set_halign(Gtk.Align.START)
+        path_label.add_css_class("dim-label")
+        revert_btn = Gtk.Button(label="Revert")
+        revert_btn.connect("clicked", lambda btn: self.load())
+        save_btn = Gtk.Button(label="Save & Reload")
+        save_btn.add_css_class("suggested-action")
+        save_btn.connect("clicked", self.on_save_clicked)
+        for widget in (path_label, revert_btn, save_btn):
+            btn_box.append(widget)
+        box.append(btn_box)
+
+        log_title = Gtk.Label(label="Rules daemon log")
+        log_title.set_halign(Gtk.Align.START)
+        box.append(log_title)
+        log_scroll = Gtk.ScrolledWindow()
+        log_scroll.set_min_content_height(160)
+        self.log_view = Gtk.TextView()
+        self.log_view.set_editable(False)
+        self.log_view.set_monospace(True)
+        log_scroll.set_child(self.log_view)
+        box.append(log_scroll)
+
+        self.connect("show", self.on_show)
+        self.connect("hide", self.on_hide)
+        self.load()
+
+    def on_show(self, window):
+        self.refresh_daemon()
+        if self.poll_source is None:
+            self.poll_source = GLib.timeout_add_seconds(2, self.refresh_daemon)
+
+    def on_hide(self, window):
+        if self.poll_source is not None:
+            GLib.source_remove(self.poll_source)
+            self.poll_source = None
+
+    def load(self):
+        from scxctl_core.rules import load_rules_text
+        try:
+            self.editor.get_buffer().set_text(load_rules_text())
+            self.error_label.set_text("")
+        except OSError as e:
+            self.error_label.set_text(f"Could not read the rules: {e}")
+
+    def on_save_clicked(self, btn):
+        from scxctl_core.rules import reload_daemon, save_rules_text
+        buf = self.editor.get_buffer()
+        try:
+            save_rules_text(buf.get_text(buf.get_start_iter(), buf.get_end_iter(), False))
+        except ValueError as e:
+            self.error_label.set_text(f"Not saved: {e}")
+            return
+        except OSError as e:
+            self.error_label.set_text(f"Could not save: {e}")
+            return
+        self.error_label.set_text("")
+        reloaded = reload_daemon()
+        self.app.core.log("rules", "Saved rules" + (", daemon reloaded" if reloaded else
+                                                    "; the daemon is not running"))
+        self.refresh_daemon()
+
+    def refresh_daemon(self):
+        from scxctl_core.rules import daemon_pid, tail_log
+        pid = daemon_pid()
+        if pid is not None:
+            self.daemon_label.set_text(f"🤖 Rules daemon running (pid {pid})")
+        else:
+            self.daemon_label.set_text("Rules daemon not running. Start it with "
+                                       "systemctl --user enable --now scxctl-rules "
+                                       "(see contrib/scxctl-rules.service).")
+        buf = self.log_view.get_buffer()
+        text = "\n".join(tail_log())
+        if text != buf.get_text(buf.get_start_iter(), buf.get_end_iter(), False):
+            buf.set_text(text)
+            self.log_view.scroll_to_iter(buf.get_end_iter(), 0.0, False, 0.0, 1.0)
+        return GLib.SOURCE_CONTINUE
+
+
+class HeatmapWindow(Gtk.Window):
+    """Per-CPU load by cache domain. It only samples while it is open."""
+
+    def __init__(self, app):
+        from scxctl_core.heatmap import HEATMAP_METRICS
+        super().__init__(title="CPU Heatmap", transient_for=app.window)
+        self.app = app
+        self.metrics = list(HEATMAP_METRICS)
+        self.units = {name: unit for name, (_, unit, _) in HEATMAP_METRICS.items()}
+        self.samples = None
+        self.pixels = None
+        self.set_default_size(900, 560)
+        self.set_hide_on_close(True)
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        box.set_margin_top(16)
+        box.set_margin_bottom(16)
+        box.set_margin_start(16)
+        box.set_margin_end(16)
+        self.set_child(box)
+
+        row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        row.append(Gtk.Label(label="Show"))
+        self.metric_combo = Gtk.DropDown.new_from_strings([label for label, _, _ in HEATMAP_METRICS.values()])
+        self.metric_combo.connect("notify::selected", lambda combo, pspec: self.redraw())
+        row.append(self.metric_combo)
+        self.scale_label = Gtk.Label(label="")
+        self.scale_label.set_hexpand(True)
+        self.scale_label.set_halign(Gtk.Align.END)
+        self.scale_label.add_css_class("dim-label")
+        row.append(self.scale_label)
+        box.append(row)
+
+        self.area = Gtk.DrawingArea()
+        self.area.set_vexpand(True)
+        self.area.set_content_height(160)
+        self.area.set_draw_func(self.draw_heatmap)
+        self.area.set_has_tooltip(True)
+        self.area.connect("query-tooltip", self.on_query_tooltip)
+        box.append(self.area)
+
+        hint = Gtk.Label(label="One row per CPU, grouped by last-level cache (black lines between them). "
+                               "Time runs left to right; hover for a CPU's latest value.")
+        hint.set_halign(Gtk.Align.START)
+        hint.set_wrap(True)
+        hint.add_css_class("dim-label")
+        box.append(hint)
+        self.summary_label = Gtk.Label(label="Sampling…")
+        self.summary_label.set_halign(Gtk.Align.START)
+        self.summary_label.set_wrap(True)
+        box.append(self.summary_label)
+
+        self.connect("show", self.on_show)
+        self.connect("hide", self.on_hide)
+
+    @property
+    def metric(self):
+        return self.metrics[self.metric_combo.get_selected()]
+
+    def on_show(self, window):
+        self.app.core.connect("heatmap", self.update_samples)
+        self.app.core.start_heatmap()
+
+    def on_hide(self, window):
+        self.app.core.disconnect("heatmap", self.update_samples)
+        self.app.core.stop_heatmap()
+
+    def update_samples(self, samples):
+        self.samples = samples
+        self.redraw()
+
+    def redraw(self):
+        if self.samples is None:
+            return
+        metric = self.metric
+        self.pixels = self.samples.image(metric)
+        top, unit = self.samples.scale(metric), self.units[metric]
+        scale = f"{top:,.0f} {unit}" if top >= 1000 else f"{top:.2f} {unit}"
+        self.scale_label.set_text(f"colour scale 0 – {scale}")
+        self.summary_label.set_text(self.samples.summary(metric))
+        self.area.queue_draw()
+
+    def draw_heatmap(self, area, cr, width, height):
+        import cairo
+        if self.pixels is None:
+            return
+        rows, columns = self.pixels.shape
+        surface = cairo.ImageSurface.create_for_data(self.pixels, cairo.FORMAT_RGB24, columns, rows, columns * 4)
+        # One scaled blit; nearest keeps every CPU and sample a sharp cell
+        cr.scale(width / columns, height / rows)
+        cr.set_source_surface(surface, 0, 0)
+        cr.get_source().set_filter(cairo.FILTER_NEAREST)
+        cr.paint()
+
+    def on_query_tooltip(self, area, x, y, keyboard_mode, tooltip):
+        if self.pixels is None:
+            return False
+        row = int(y * self.pixels.shape[0] / max(area.get_height(), 1))
+        text = self.samples.describe(self.metric, row)
+        if not text:
+            return False
+        tooltip.set_text(text)
+        return True
+
+
+class AppsWindow(Gtk.Window):
+    """Run delay of pinned apps, before and after each switch and per scheduler."""
+
+    def __init__(self, app):
+        from scxctl_core.apptrack import load_pinned
+        super().__init__(title="Pinned Apps", transient_for=app.window)
+        self.app = app
+        self.history = None
+        self.set_default_size(900, 560)
+        self.set_hide_on_close(True)
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        box.set_margin_top(16)
+        box.set_margin_bottom(16)
+        box.set_margin_start(16)
+        box.set_margin_end(16)
+        self.set_child(box)
+
+        hint = Gtk.Label(label="Pin processes by name (wildcards work, e.g. cs2*) or PID. Their threads' "
+                               "run delay and timeslices are summed per entry and kept per scheduler, so you "
+                               "can compare before and after a switch.")
+        hint.set_halign(Gtk.Align.START)
+        hint.set_wrap(True)
+        box.append(hint)
+
+        pin_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.pin_entry = Gtk.Entry()
+        self.pin_entry.set_placeholder_text("Process name or PID")
+        self.pin_entry.set_hexpand(True)
+        self.pin_entry.connect("activate", self.on_pin_clicked)
+        pin_btn = Gtk.Button(label="Pin")
+        pin_btn.connect("clicked", self.on_pin_clicked)
+        pin_row.append(self.pin_entry)
+        pin_row.append(pin_btn)
+        box.append(pin_row)
+
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_vexpand(True)
+        content = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        scroll.set_child(content)
+        box.append(scroll)
+
+        self.grid = Gtk.Grid(column_spacing=16, row_spacing=6)
+        content.append(self.grid)
+        compare_title = Gtk.Label(label="Per scheduler, least run delay first")
+        compare_title.set_halign(Gtk.Align.START)
+        compare_title.set_margin_top(10)
+        content.append(compare_title)
+        self.compare_grid = Gtk.Grid(column_spacing=16, row_spacing=6)
+        content.append(self.compare_grid)
+
+        self.cost_label = Gtk.Label(label="")
+        self.cost_label.set_halign(Gtk.Align.START)
+        self.cost_label.add_css_class("dim-label")
+        box.append(self.cost_label)
+
+        self.connect("show", self.on_show)
+        self.connect("hide", self.on_hide)
+        self.pinned = load_pinned()
+        self.set_rows()
+
+    def on_show(self, window):
+        self.app.core.connect("apps", self.update_apps)
+        if self.app.core.apps is not None:
+            self.update_apps(self.app.core.apps)
+
+    def on_hide(self, window):
+        self.app.core.disconnect("apps", self.update_apps)
+
+    def on_pin_clicked(self, widget):
+        entry = self.pin_entry.get_text().strip()
+        if entry and entry not in self.pinned:
+            self.pinned.append(entry)
+            self.app.core.pin_apps(self.pinned)
+            self.set_rows()
+        self.pin_entry.set_text("")
+
+    def on_unpin_clicked(self, btn, entry):
+        self.pinned = [pinned for pinned in self.pinned if pinned != entry]
+        self.app.core.pin_apps(self.pinned)
+        self.set_rows()
+
+    @staticmethod
+    def clear(grid):
+        while (child := grid.get_first_child()) is not None:
+            grid.remove(child)
+
+    @staticmethod
+    def header(grid, titles):
+        for column, title in enumerate(titles):
+            label = Gtk.Label(label=title)
+            label.set_halign(Gtk.Align.START)
+            label.add_css_class("heading")
+            grid.attach(label, column, 0, 1, 1)
+
+    def set_rows(self):
+        self.clear(self.grid)
+        self.header(self.grid, ["App", "Now", "Before", "After", "Change"])
+        self.cells = {}
+        for row, entry in enumerate(self.pinned, start=1):
+            labels = []
+            for column in range(5):
+                label = Gtk.Label(label=entry if column == 0 else "-")
+                label.set_halign(Gtk.Align.START)
+                label.set_wrap(column == 1)
+                self.grid.attach(label, column, row, 1, 1)
+                labels.append(label)
+            unpin_btn = Gtk.Button(icon_name="edit-delete-symbolic")
+            unpin_btn.set_tooltip_text("Unpin")
+            unpin_btn.connect("clicked", self.on_unpin_clicked, entry)
+            self.grid.attach(unpin_btn, 5, row, 1, 1)
+            self.cells[entry] = labels
+        if self.history is not None:
+            self.update_apps(self.history)
+
+    def update_apps(self, history):
+        from scxctl_core.apptrack import format_change, format_per_slice, format_totals
+        self.history = history
+        threads = 0
+        for entry, labels in self.cells.items():
+            sample = history.live.get(entry)
+            if sample is None:
+                labels[0].set_text(f"{entry} (not running)")
+                labels[0].set_tooltip_text(None)
+            else:
+                threads += sample.threads
+                labels[0].set_text(f"{entry} ({len(sample.pids)} proc, {sample.threads} threads)")
+                labels[0].set_tooltip_text(f"PID {', '.join(map(str, sample.pids))}")
+            live = history.live_totals(entry)
+            labels[1].set_text(format_totals(live) if live is not None else "-")
+            before, after = history.before_after(entry)
+            for label, epoch in ((labels[2], before), (labels[3], after)):
+                totals = epoch.apps[entry] if epoch is not None else None
+                label.set_text(f"{epoch.label}: {format_per_slice(totals)}" if epoch is not None else "-")
+                label.set_tooltip_text(format_totals(totals) if epoch is not None else None)
+            labels[4].set_text(format_change(before and before.apps[entry], after and after.apps[entry]))
+        if history.cost is not None:
+            self.cost_label.set_text(f"Sampled {threads:,} threads in {history.cost * 1000:.2f} ms; "
+                                     f"processes found via {history.source}")
+        self.update_comparison()
+
+    def update_comparison(self):
+        from scxctl_core.apptrack import format_per_slice
+        self.clear(self.compare_grid)
+        self.header(self.compare_grid, ["App", "Scheduler", "Run delay / slice", "Run delay",
+                                        "Timeslices", "CPU", "Observed"])
+        row = 1
+        for entry in self.pinned:
+            by_label = sorted(self.history.by_label(entry).items(),
+                              key=lambda item: item[1].delay_per_slice_us
+                              if item[1].delay_per_slice_us is not None else float("inf"))
+            for label, totals in by_label:
+                values = [entry, label, format_per_slice(totals),
+                          f"{totals.delay_ms_per_s:,.2f} ms/s" if totals.seconds else "-",
+                          f"{totals.slices_per_s:,.0f} /s" if totals.seconds else "-",
+                          f"{totals.cpu_percent:,.1f}%" if totals.seconds else "-",
+                          f"{totals.seconds:,.0f} s"]
+                for column, value in enumerate(values):
+                    cell = Gtk.Label(label=value)
+                    cell.set_halign(Gtk.Align.START)
+                    self.compare_grid.attach(cell, column, row, 1, 1)
+                row += 1
+
+
+class HistoryWindow(Gtk.Window):
+    """What was recorded (history.py): one metric over a range, and every change in it."""
+
+    def __init__(self, app):
+        from scxctl_core.history import HISTORY_METRICS, RANGES
+        super().__init__(title="History", transient_for=app.window)
+        self.app = app
+        self.metrics = list(HISTORY_METRICS)
+        self.ranges = [seconds for _, seconds in RANGES]
+        self.runs = []
+        self.events = []
+        self.start = self.end = 0.0
+        self.unit = ""
+        self.poll_source = None
+        self.set_default_size(900, 620)
+        self.set_hide_on_close(True)
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        box.set_margin_top(16)
+        box.set_margin_bottom(16)
+        box.set_margin_start(16)
+        box.set_margin_end(16)
+        self.set_child(box)
+
+        row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.metric_combo = Gtk.DropDown.new_from_strings([label for label, _ in HISTORY_METRICS.values()])
+        self.range_combo = Gtk.DropDown.new_from_strings([label for label, _ in RANGES])
+        self.range_combo.set_selected(2)
+        for combo in (self.metric_combo, self.range_combo):
+            combo.connect("notify::selected", lambda combo, pspec: self.load())
+        row.append(Gtk.Label(label="Show"))
+        row.append(self.metric_combo)
+        row.append(Gtk.Label(label="over the last"))
+        row.append(self.range_combo)
+        box.append(row)
+
+        self.area = Gtk.DrawingArea()
+        self.area.set_vexpand(True)
+        self.area.set_content_height(200)
+        self.area.set_draw_func(self.draw_chart)
+        self.area.set_has_tooltip(True)
+        self.area.connect("query-tooltip", self.on_query_tooltip)
+        box.append(self.area)
+
+        self.summary_label = Gtk.Label(label="")
+        self.summary_label.set_halign(Gtk.Align.START)
+        self.summary_label.set_wrap(True)
+        box.append(self.summary_label)
+        events_title = Gtk.Label(label="Scheduler changes, newest first (dashed lines above; red ones failed)")
+        events_title.set_halign(Gtk.Align.START)
+        box.append(events_title)
+        events_scroll = Gtk.ScrolledWindow()
+        events_scroll.set_min_content_height(140)
+        self.events_view = Gtk.TextView()
+        self.events_view.set_editable(False)
+        self.events_view.set_monospace(True)
+        events_scroll.set_child(self.events_view)
+        box.append(events_scroll)
+
+        self.connect("show", self.on_show)
+        self.connect("hide", self.on_hide)
+
+    @property
+    def metric(self):
+        return self.metrics[self.metric_combo.get_selected()]
+
+    def on_show(self, window):
+        from scxctl_core.history import FLUSH_INTERVAL
+        self.load()
+        if self.poll_source is None:
+            # New samples reach the file in batches
+            self.poll_source = GLib.timeout_add(int(FLUSH_INTERVAL * 1000), self.on_poll)
+
+    def on_hide(self, window):
+        if self.poll_source is not None:
+            GLib.source_remove(self.poll_source)
+            self.poll_source = None
+
+    def on_poll(self):
+        self.load()
+        return GLib.SOURCE_CONTINUE
+
+    def load(self):
+        from scxctl_core.history import HISTORY_METRICS, describe_range, history_path, read_range, split_gaps
+        metric = self.metric
+        self.end = time.time()
+        self.start = self.end - self.ranges[self.range_combo.get_selected()]
+        result = read_range(metric, self.start, self.end)
+        points, self.events = result if result is not None else ([], [])
+        self.runs = split_gaps(points, self.end - self.start)
+        self.unit = HISTORY_METRICS[metric][1]
+        if result is None:
+            self.summary_label.set_text(f"Nothing recorded yet ({history_path()})")
+        else:
+            self.summary_label.set_text(describe_range(metric, points, self.events))
+        self.events_view.get_buffer().set_text("\n".join(change.format() for change in reversed(self.events)))
+        self.area.queue_draw()
+
+    def x_of(self, when, width):
+        return 1 + (when - self.start) / ((self.end - self.start) or 1.0) * (width - 2)
+
+    def draw_chart(self, area, cr, width, height):
+        cr.set_line_width(1)
+        cr.set_dash([4, 3])
+        for change in self.events:
+            cr.set_source_rgb(*((0x4c / 255, 0xaf / 255, 0x50 / 255) if change.ok else
+                                (0xf4 / 255, 0x43 / 255, 0x36 / 255)))
+            x = self.x_of(change.time, width)
+            cr.move_to(x, 0)
+            cr.line_to(x, height)
+            cr.stroke()
+        cr.set_dash([])
+        points = [point for run in self.runs for point in run]
+        if not points:
+            return
+        lo = min(point.min for point in points)
+        span = (max(point.max for point in points) - lo) or 1.0
+
+        def y_of(value):
+            return 1 + (height - 2) * (1 - (value - lo) / span)
+        cr.set_source_rgba(0x21 / 255, 0x96 / 255, 0xf3 / 255, 0.25)
+        for run in self.runs:
+            for i, point in enumerate(run + run[::-1]):
+                y = y_of(point.max if i < len(run) else point.min)
+                if i:
+                    cr.line_to(self.x_of(point.time, width), y)
+                else:
+                    cr.move_to(self.x_of(point.time, width), y)
+            cr.fill()
+        cr.set_source_rgb(0x21 / 255, 0x96 / 255, 0xf3 / 255)
+        cr.set_line_width(1.5)
+        for run in self.runs:
+            for i, point in enumerate(run):
+                if i:
+                    cr.line_to(self.x_of(point.time, width), y_of(point.mean))
+                else:
+                    cr.move_to(self.x_of(point.time, width), y_of(point.mean))
+            cr.stroke()
+
+    def on_query_tooltip(self, area, x, y, keyboard_mode, tooltip):
+        width = area.get_width()
+        lines = [change.format() for change in self.events if abs(self.x_of(change.time, width) - x) <= 4]
+        points = [point for run in self.runs for point in run]
+        if points:
+            point = min(points, key=lambda p: abs(self.x_of(p.time, width) - x))
+            stamp = time.strftime("%m-%d %H:%M", time.localtime(point.time))
+            lines.insert(0, f"{stamp}: {point.mean:,.2f} {self.unit} "
+                            f"({point.min:,.2f} – {point.max:,.2f})")
+        if not lines:
+            return False
+        tooltip.set_text("\n".join(lines))
+        return True
+
+
+class TransitionWindow(Gtk.Window):
+    """How long each phase of a scheduler change took (transition.py)."""
+
+    def __init__(self, app):
+        from scxctl_core.transition import PHASES
+        super().__init__(title="Switch Timing", transient_for=app.window)
+        self.app = app
+        self.set_default_size(760, 560)
+        self.set_hide_on_close(True)
+
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        box.set_margin_top(16)
+        box.set_margin_bottom(16)
+        box.set_margin_start(16)
+        box.set_margin_end(16)
+        self.set_child(box)
+
+        hint = Gtk.Label(label="Each start, switch and stop from here is timed from the click: "
+                               + "; ".join(f"{phase} {description}" for phase, (_, _, description)
+                                           in PHASES.items()) + ".")
+        hint.set_halign(Gtk.Align.START)
+        hint.set_wrap(True)
+        box.append(hint)
+
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_vexpand(True)
+        self.grid = Gtk.Grid(column_spacing=16, row_spacing=6)
+        scroll.set_child(self.grid)
+        box.append(scroll)
+
+        traces_title = Gtk.Label(label="Recent changes, newest first")
+        traces_title.set_halign(Gtk.Align.START)
+        box.append(traces_title)
+        traces_scroll = Gtk.ScrolledWindow()
+        traces_scroll.set_min_content_height(140)
+        self.traces_view = Gtk.TextView()
+        self.traces_view.set_editable(False)
+        self.traces_view.set_monospace(True)
+        traces_scroll.set_child(self.traces_view)
+        box.append(traces_scroll)
+
+        self.export_btn = Gtk.Button(label="Export Trace…")
+        self.export_btn.set_tooltip_text("Chrome trace JSON, for chrome://tracing or ui.perfetto.dev")
+        self.export_btn.set_halign(Gtk.Align.END)
+        self.export_btn.connect("clicked", self.on_export_clicked)
+        box.append(self.export_btn)
+
+        self.connect("show", self.on_show)
+        self.connect("hide", self.on_hide)
+
+    def on_show(self, window):
+        self.app.core.connect("transition", self.update_transitions)
+        self.update_transitions(self.app.core.transitions)
+
+    def on_hide(self, window):
+        self.app.core.disconnect("transition", self.update_transitions)
+
+    def update_transitions(self, transitions):
+        from scxctl_core.transition import format_ms, format_trace
+        AppsWindow.clear(self.grid)
+        AppsWindow.header(self.grid, ["Target", "Phase", "Count", "p50", "p99", "Max"])
+        for row, (label, phase, summary) in enumerate(transitions.summary(), start=1):
+            values = [label, phase, str(summary["count"]),
+                      *(format_ms(summary[key]) for key in ("p50", "p99", "max"))]
+            for column, value in enumerate(values):
+                cell = Gtk.Label(label=value)
+                cell.set_halign(Gtk.Align.END if column >= 2 else Gtk.Align.START)
+                self.grid.attach(cell, column, row, 1, 1)
+        lines = []
+        for trace in reversed(transitions.traces):
+            stamp = time.strftime("%H:%M:%S", time.localtime(trace.wall))
+            text = f"{stamp} {format_trace(trace)}"
+            lines.append(f"{text} ❌ {trace.error}" if trace.error else text)
+        self.traces_view.get_buffer().set_text("\n".join(lines))
+        self.export_btn.set_sensitive(bool(transitions.traces))
+
+    def on_export_clicked(self, btn):
+        dialog = Gtk.FileDialog(title="Export Trace", initial_name="scxctl-switches.json")
+        dialog.save(self, None, self.on_export_chosen)
+
+    def on_export_chosen(self, dialog, result):
+        try:
+            path = dialog.save_finish(result).get_path()
+        except GLib.Error:
+            return  # dismissed
+        transitions = self.app.core.transitions
+        try:
+            transitions.export(path)
+        except OSError as e:
+            self.app.core.log("timing", f"❌ Could not export: {e}")
+            return
+        self.app.core.log("timing", f"Trace of {len(transitions.traces)} changes → {path}")
+
 
 class SCXCtlGUI(Gtk.Application):
     def __init__(self):
@@ -14,6 +843,23 @@ class SCXCtlGUI(Gtk.Application):
     def do_startup(self):
         Gtk.Application.do_startup(self)
         self.load_css()
+        profile.mark("CSS")
+        self.core = SchedulerCore(run_on_main_loop)
+        self.core.connect("state", self.update_ui_from_status)
+        self.core.connect("schedulers", self.set_schedulers)
+        self.core.connect("log", self.append_log)
+        self.core.connect("busy", self.set_busy)
+        self.core.connect("telemetry", self.update_telemetry)
+        self.core.connect("stats_schema", self.set_stats_schema)
+        self.core.connect("stats", self.update_stats)
+        self.core.connect("latency", self.update_latency)
+        self.core_started = False
+
+    def do_shutdown(self):
+        if getattr(self, "bench_window", None) is not None and self.bench_window.runner is not None:
+            self.bench_window.runner.cancel()
+        self.core.shutdown()
+        Gtk.Application.do_shutdown(self)
 
     def load_css(self):
         css_provider = Gtk.CssProvider()
@@ -73,18 +919,61 @@ class SCXCtlGUI(Gtk.Application):
 
     def do_activate(self):
         window = Gtk.ApplicationWindow(application=self)
+        self.window = window
+        self.bench_window = None
+        self.rules_window = None
+        self.heatmap_window = None
+        self.apps_window = None
+        self.history_window = None
+        self.timing_window = None
         window.set_title("scxctl GUI")
-        window.set_default_size(500, -1)
+        window.set_default_size(820, -1)
 
         # Header Bar
         header = Gtk.HeaderBar()
         header.set_show_title_buttons(True)
         window.set_titlebar(header)
         
-        refresh_btn = Gtk.Button(icon_name="view-refresh-symbolic")
-        refresh_btn.set_tooltip_text("Refresh Status")
-        refresh_btn.connect("clicked", self.on_refresh_clicked)
-        header.pack_start(refresh_btn)
+        self.refresh_btn = Gtk.Button(icon_name="view-refresh-symbolic")
+        self.refresh_btn.set_tooltip_text("Refresh Status")
+        self.refresh_btn.connect("clicked", self.on_refresh_clicked)
+        header.pack_start(self.refresh_btn)
+
+        bench_btn = Gtk.Button(icon_name="utilities-system-monitor-symbolic")
+        bench_btn.set_tooltip_text("Benchmark Schedulers")
+        bench_btn.connect("clicked", self.on_bench_clicked)
+        header.pack_start(bench_btn)
+
+        rules_btn = Gtk.Button(icon_name="system-run-symbolic")
+        rules_btn.set_tooltip_text("Automatic Switching Rules")
+        rules_btn.connect("clicked", self.on_rules_clicked)
+        header.pack_start(rules_btn)
+
+        heatmap_btn = Gtk.Button(icon_name="view-grid-symbolic")
+        heatmap_btn.set_tooltip_text("Per-CPU Heatmap")
+        heatmap_btn.connect("clicked", self.on_heatmap_clicked)
+        header.pack_start(heatmap_btn)
+
+        apps_btn = Gtk.Button(icon_name="edit-find-symbolic")
+        apps_btn.set_tooltip_text("Pinned Apps")
+        apps_btn.connect("clicked", self.on_apps_clicked)
+        header.pack_start(apps_btn)
+
+        history_btn = Gtk.Button(icon_name="document-open-recent-symbolic")
+        history_btn.set_tooltip_text("History")
+        history_btn.connect("clicked", self.on_history_clicked)
+        header.pack_start(history_btn)
+
+        timing_btn = Gtk.Button(icon_name="preferences-system-time-symbolic")
+        timing_btn.set_tooltip_text("Switch Timing")
+        timing_btn.connect("clicked", self.on_timing_clicked)
+        header.pack_start(timing_btn)
+
+        self.cancel_btn = Gtk.Button(icon_name="process-stop-symbolic")
+        self.cancel_btn.set_tooltip_text("Cancel Running Command")
+        self.cancel_btn.connect("clicked", self.on_cancel_clicked)
+        self.cancel_btn.set_visible(False)
+        header.pack_end(self.cancel_btn)
 
         # Main Scroll
         scrolled = Gtk.ScrolledWindow()
@@ -114,8 +1003,59 @@ class SCXCtlGUI(Gtk.Application):
         self.status_label.set_margin_top(10)
         self.status_label.set_margin_bottom(10)
         status_box.append(self.status_label)
+
+        self.probe_check = Gtk.CheckButton(label="Wakeup latency probe")
+        self.probe_check.set_tooltip_text("Measure how late a periodic 2ms sleeper wakes up under the current scheduler")
+        self.probe_check.set_active(self.core.probe is not None)
+        self.probe_check.connect("toggled", self.on_probe_toggled)
+        status_box.append(self.probe_check)
+        self.latency_label = Gtk.Label(label="")
+        self.latency_label.set_use_markup(True)
+        self.latency_label.set_wrap(True)
+        status_box.append(self.latency_label)
         
-        main_box.append(status_box)
+        # --- Live Telemetry Card, next to the status ---
+        metrics_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        metrics_box.add_css_class("card")
+        metrics_box.set_hexpand(True)
+
+        metrics_title = Gtk.Label(label="Live Telemetry")
+        metrics_title.set_halign(Gtk.Align.START)
+        metrics_title.add_css_class("title-4")
+        metrics_box.append(metrics_title)
+
+        self.scx_label = Gtk.Label(label="sched_ext: -")
+        self.scx_label.set_halign(Gtk.Align.START)
+        metrics_box.append(self.scx_label)
+
+        metrics_grid = Gtk.Grid()
+        metrics_grid.set_row_spacing(4)
+        metrics_grid.set_column_spacing(12)
+        self.metric_rows = {}
+        self.spark_values = {}
+        for row, (name, (label, unit)) in enumerate(METRICS.items()):
+            name_label = Gtk.Label(label=label)
+            name_label.set_halign(Gtk.Align.START)
+            value_label = Gtk.Label(label="-")
+            value_label.set_halign(Gtk.Align.START)
+            value_label.set_size_request(130, -1)
+            sparkline = Gtk.DrawingArea()
+            sparkline.set_content_width(120)
+            sparkline.set_content_height(24)
+            sparkline.set_hexpand(True)
+            sparkline.set_draw_func(self.draw_sparkline, name)
+            metrics_grid.attach(name_label, 0, row, 1, 1)
+            metrics_grid.attach(value_label, 1, row, 1, 1)
+            metrics_grid.attach(sparkline, 2, row, 1, 1)
+            self.metric_rows[name] = (value_label, sparkline, unit)
+            self.spark_values[name] = []
+        metrics_box.append(metrics_grid)
+
+        top_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=20)
+        status_box.set_hexpand(True)
+        top_box.append(status_box)
+        top_box.append(metrics_box)
+        main_box.append(top_box)
 
         # --- Controls Card ---
         controls_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=15)
@@ -136,7 +1076,10 @@ class SCXCtlGUI(Gtk.Application):
         sched_label = Gtk.Label(label="Scheduler")
         sched_label.set_halign(Gtk.Align.START)
         self.sched_combo = Gtk.DropDown()
-        self.sched_model = Gtk.StringList.new(["default"])
+        # Paint the scheduler list from cache, then revalidate
+        if not self.core_started:
+            self.core.load_cached_schedulers()
+        self.sched_model = Gtk.StringList.new(["default"] + self.core.schedulers)
         self.sched_combo.set_model(self.sched_model)
         self.sched_combo.set_hexpand(True)
         
@@ -164,27 +1107,52 @@ class SCXCtlGUI(Gtk.Application):
         grid.attach(args_label, 0, 2, 1, 1)
         grid.attach(self.args_entry, 1, 2, 1, 1)
 
+        # Guarded apply
+        guard_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.guard_check = Gtk.CheckButton(label="Roll back if pressure or latency regress within")
+        self.guard_window = Gtk.SpinButton.new_with_range(5, 300, 1)
+        self.guard_window.set_value(GuardThresholds().window)
+        guard_box.append(self.guard_check)
+        guard_box.append(self.guard_window)
+        guard_box.append(Gtk.Label(label="s"))
+        controls_box.append(guard_box)
+
         # Buttons
         btn_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
         btn_box.set_halign(Gtk.Align.FILL)  # Fill width
         btn_box.set_margin_top(10)
         
-        stop_btn = Gtk.Button(label="Stop / Default")
-        stop_btn.connect("clicked", self.on_stop_clicked)
-        stop_btn.add_css_class("destructive-action")
-        stop_btn.set_hexpand(True)  # Expand horizontally
+        self.stop_btn = Gtk.Button(label="Stop / Default")
+        self.stop_btn.connect("clicked", self.on_stop_clicked)
+        self.stop_btn.add_css_class("destructive-action")
+        self.stop_btn.set_hexpand(True)  # Expand horizontally
         
-        apply_btn = Gtk.Button(label="Apply Scheduler")
-        apply_btn.connect("clicked", self.on_apply_clicked)
-        apply_btn.add_css_class("suggested-action")
-        apply_btn.set_hexpand(True)  # Expand horizontally
+        self.apply_btn = Gtk.Button(label="Apply Scheduler")
+        self.apply_btn.connect("clicked", self.on_apply_clicked)
+        self.apply_btn.add_css_class("suggested-action")
+        self.apply_btn.set_hexpand(True)  # Expand horizontally
         
-        btn_box.append(stop_btn)
-        btn_box.append(apply_btn)
+        btn_box.append(self.stop_btn)
+        btn_box.append(self.apply_btn)
         controls_box.append(btn_box)
         
         main_box.append(controls_box)
 
+        # --- Scheduler Stats Card (scx_stats) ---
+        self.stats_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        self.stats_box.add_css_class("card")
+        self.stats_title = Gtk.Label(label="Scheduler Stats")
+        self.stats_title.set_halign(Gtk.Align.START)
+        self.stats_title.add_css_class("title-4")
+        self.stats_box.append(self.stats_title)
+        self.stats_grid = Gtk.Grid()
+        self.stats_grid.set_row_spacing(4)
+        self.stats_grid.set_column_spacing(15)
+        self.stats_box.append(self.stats_grid)
+        self.stats_rows = {}
+        self.stats_box.set_visible(False)
+        main_box.append(self.stats_box)
+
         # --- Log Card ---
         log_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
         log_box.add_css_class("card")
@@ -209,89 +1177,202 @@ class SCXCtlGUI(Gtk.Application):
         self.log_view.set_right_margin(10)
         
         self.log_buffer = self.log_view.get_buffer()
+        self.log_end = self.log_buffer.create_mark("log-end", self.log_buffer.get_end_iter(), False)
+        self.log_flush_id = 0
+        # Replay what happened before this window existed
+        self.pending_log = deque((entry.format() for entry in self.core.activity), maxlen=LOG_MAX_LINES)
         log_scroll.set_child(self.log_view)
         log_box.append(log_scroll)
         
         main_box.append(log_box)
 
+        profile.mark("widgets")
+        if not self.core_started:
+            # Initial Load, once the first frame is up (see on_first_map)
+            self.core_started = True
+            window.connect("map", self.on_first_map)
+        else:
+            if self.core.state is not None:
+                self.update_ui_from_status(self.core.state)
+            if self.core.stats_stream is not None and self.core.stats_stream.columns is not None:
+                self.set_stats_schema(self.core.stats_stream.columns)
         window.present()
-        
-        # Initial Load
-        GLib.idle_add(self.list_schedulers)
+        self.set_busy(self.core.busy)
+        if self.pending_log:
+            self.flush_log()
+
+    def on_first_map(self, window):
+        clock = window.get_frame_clock()
+        handler = None
+
+        def painted(clock):
+            clock.disconnect(handler)
+            GLib.idle_add(self.start_core)
+        handler = clock.connect("after-paint", painted)
+
+    def start_core(self):
+        profile.mark("first paint")
+        self.core.start()
+        self.core.start_telemetry()
+        self.core.start_stats()
+        self.core.start_apps()
+        self.core.start_history()
+        # A Qt launch while we run raises this window instead
+        self.core.start_control(on_activate=lambda argv: self.window.present())
+        return GLib.SOURCE_REMOVE
+
+    def write_profile(self):
+        path = profile.write()
+        if path is not None:
+            self.core.log("startup", f"{profile.summary()} → {path}")
+        return GLib.SOURCE_REMOVE
+
+    def set_busy(self, busy):
+        if not busy and profile.has("first paint"):
+            # Connected, and the first get and list are in
+            profile.mark("backend ready")
+            self.write_profile()
+        if not hasattr(self, "apply_btn"):
+            return
+        for btn in (self.refresh_btn, self.apply_btn, self.stop_btn):
+            btn.set_sensitive(not busy)
+        self.cancel_btn.set_visible(busy)
+
+    def append_log(self, entry):
+        if not hasattr(self, "log_buffer"):
+            return
+        self.pending_log.append(entry.format())
+        if not self.log_flush_id:
+            self.log_flush_id = GLib.timeout_add(LOG_FLUSH_MS, self.flush_log)
+
+    def flush_log(self):
+        # One insert, one trim and one scroll for everything since the last frame
+        self.log_flush_id = 0
+        self.log_buffer.insert(self.log_buffer.get_end_iter(), "\n".join(self.pending_log) + "\n")
+        self.pending_log.clear()
+
+        excess = self.log_buffer.get_line_count() - LOG_MAX_LINES
+        if excess > 0:
+            _, cut = self.log_buffer.get_iter_at_line(excess)
+            self.log_buffer.delete(self.log_buffer.get_start_iter(), cut)
 
-    def run_command(self, args):
-        try:
-            result = subprocess.run(["scxctl"] + args, capture_output=True, text=True, check=True)
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            return f"❌ Error: {e.stderr.strip() or e.stdout.strip()}"
-        except FileNotFoundError:
-             return "❌ Error: scxctl not found in PATH"
-
-    def append_log(self, cmd, text):
-        end_iter = self.log_buffer.get_end_iter()
-        self.log_buffer.insert(end_iter, f"[{cmd}]\n{text}\n\n")
         # Auto scroll
-        mark = self.log_buffer.create_mark(None, end_iter, False)
-        self.log_view.scroll_to_mark(mark, 0.0, True, 0.0, 1.0)
+        self.log_view.scroll_to_mark(self.log_end, 0.0, True, 0.0, 1.0)
+        return GLib.SOURCE_REMOVE
 
-    def list_schedulers(self):
-        output = self.run_command(["list"])
-        
-        items = ["default"]
-        for line in output.splitlines():
-            if "supported schedulers:" in line:
-                try:
-                    sched_list = line.split("supported schedulers:")[1].strip()
-                    schedulers = ast.literal_eval(sched_list)
-                    items.extend(schedulers)
-                except:
-                    pass
-        
-        self.sched_model = Gtk.StringList.new(items)
-        self.sched_combo.set_model(self.sched_model)
-        
-        self.get_status()
+    def update_telemetry(self, values):
+        telemetry = self.core.telemetry
+        # Samples arrive at most every MIN_INTERVAL, which caps redraws too
+        if telemetry is None or not hasattr(self, "metric_rows"):
+            return
+        ops = f" ({telemetry.scx_ops})" if telemetry.scx_ops else ""
+        self.scx_label.set_text(f"sched_ext: {telemetry.scx_state or 'unavailable'}{ops}")
+        for name, (value_label, sparkline, unit) in self.metric_rows.items():
+            series = telemetry.series.get(name)
+            if series is None:
+                continue
+            value = series.latest()
+            value_label.set_text(f"{value:,.0f} {unit}" if value >= 1000 else f"{value:.2f} {unit}")
+            self.spark_values[name] = [v for v in series.values() if v == v]  # drop NaN
+            sparkline.queue_draw()
 
-    def get_status(self):
-        output = self.run_command(["get"])
-        self.append_log("get", output)
-        self.update_ui_from_status(output)
+        events = sorted(((v, k.split(":", 1)[1]) for k, v in values.items()
+                         if k.startswith("scx_event:") and v), reverse=True)
+        self.metric_rows["scx_events"][0].set_tooltip_text(
+            "\n".join(f"{name}: {rate:,.0f}/s" for rate, name in events[:8]) or None)
 
-    def update_ui_from_status(self, output):
-        text_lower = output.strip().lower()
-        if "no scx scheduler running" in text_lower:
+    def on_probe_toggled(self, check):
+        if check.get_active():
+            self.core.start_probe()
+            self.latency_label.set_text("Measuring…")
+        else:
+            self.core.stop_probe()
+            self.latency_label.set_text("")
+
+    def update_latency(self, history):
+        if not hasattr(self, "latency_label"):
+            return
+        esc = GLib.markup_escape_text
+        lines = [f"<b>{esc(history.current.label)}</b>: {format_summary(history.current.histogram.summary())}"]
+        # Earlier schedulers, newest first, for comparison
+        for epoch in list(history.epochs)[-2::-1]:
+            if epoch.histogram.count:
+                lines.append(f"{esc(epoch.label)}: {format_summary(epoch.histogram.summary())}")
+        overhead = format_overhead(history)
+        if overhead:
+            lines.append(f"<i>{overhead}</i>")
+        self.latency_label.set_markup(f"<span size='small' color='#aaaaaa'>{chr(10).join(lines)}</span>")
+
+    def set_stats_schema(self, columns):
+        if not hasattr(self, "stats_grid"):
+            return
+        child = self.stats_grid.get_first_child()
+        while child is not None:
+            self.stats_grid.remove(child)
+            child = self.stats_grid.get_first_child()
+        self.stats_rows = {}
+        if columns is None:
+            self.stats_box.set_visible(False)
+            return
+        running = self.core.state.scheduler if self.core.state and self.core.state.running else None
+        self.stats_title.set_text(f"Scheduler Stats ({running or columns.schema.name})")
+        for row, field in enumerate(columns.schema.fields):
+            name_label = Gtk.Label(label=field.name)
+            name_label.set_halign(Gtk.Align.START)
+            name_label.set_tooltip_text(field.desc or None)
+            value_label = Gtk.Label(label="-")
+            value_label.set_halign(Gtk.Align.END)
+            value_label.set_hexpand(True)
+            self.stats_grid.attach(name_label, 0, row, 1, 1)
+            self.stats_grid.attach(value_label, 1, row, 1, 1)
+            self.stats_rows[field.name] = value_label
+        self.stats_box.set_visible(True)
+
+    def update_stats(self, sample):
+        for name, label in self.stats_rows.items():
+            value = sample.get(name)
+            if isinstance(value, float):
+                label.set_text(f"{value:,.2f}")
+            elif value is not None:
+                label.set_text(f"{value:,}" if isinstance(value, int) else str(value))
+
+    def draw_sparkline(self, area, cr, width, height, name):
+        values = self.spark_values.get(name)
+        if not values or len(values) < 2:
+            return
+        lo, hi = min(values), max(values)
+        span = (hi - lo) or 1.0
+        step = (width - 2) / (len(values) - 1)
+        cr.set_source_rgb(0x21 / 255, 0x96 / 255, 0xf3 / 255)
+        cr.set_line_width(1.5)
+        for i, v in enumerate(values):
+            y = 1 + (height - 2) * (1 - (v - lo) / span)
+            if i:
+                cr.line_to(1 + i * step, y)
+            else:
+                cr.move_to(1, y)
+        cr.stroke()
+
+    def set_schedulers(self, schedulers):
+        self.sched_model = Gtk.StringList.new(["default"] + schedulers)
+        self.sched_combo.set_model(self.sched_model)
+        if self.core.state is not None:
+            self.update_ui_from_status(self.core.state)
+
+    def update_ui_from_status(self, state):
+        profile.mark("first state")
+        if not state.running:
             self.status_label.set_markup("<span foreground='#4caf50' weight='bold' size='x-large'>🟢 Default Kernel Scheduler</span>")
             self.set_combo_active_string(self.sched_combo, "default")
             return
 
-        if text_lower.startswith("running"):
-            parts = output.split()
-            active_sched = parts[1].strip() if len(parts) >= 2 else "Unknown"
-            
-            # Determine emoji based on scheduler name
-            emoji = "🚀"
-            n = active_sched.lower()
-            if "rust" in n: emoji = "🦀"
-            elif "lavd" in n: emoji = "🌋"
-            elif "flash" in n: emoji = "⚡"
-            elif "cosmos" in n: emoji = "🌌"
-            elif "bpfland" in n: emoji = "🎢"
-            elif "p2dq" in n: emoji = "🏎️"
-            elif "tickless" in n: emoji = "🕰️"
-            elif "mitosis" in n: emoji = "🧬"
-            elif "central" in n: emoji = "🎯"
-
-            active_mode = "Default"
-            if " in " in output.lower():
-                try:
-                    active_mode = output.lower().split(" in ", 1)[1].split()[0].strip()
-                except:
-                    pass
-            
-            self.status_label.set_markup(f"<span foreground='#2196f3' weight='bold' size='x-large'>{emoji} {active_sched}</span>\n<span size='medium' color='#aaaaaa'>Mode: {active_mode}</span>")
-            self.set_combo_active_string(self.sched_combo, active_sched)
-            self.set_combo_active_string(self.mode_combo, active_mode)
+        active_sched = state.scheduler
+        emoji = scheduler_emoji(active_sched)
+        active_mode = state.mode or "Default"
+        
+        self.status_label.set_markup(f"<span foreground='#2196f3' weight='bold' size='x-large'>{emoji} {active_sched}</span>\n<span size='medium' color='#aaaaaa'>Mode: {active_mode}</span>")
+        self.set_combo_active_string(self.sched_combo, active_sched)
+        self.set_combo_active_string(self.mode_combo, active_mode)
 
     def set_combo_active_string(self, combo, text):
         model = combo.get_model()
@@ -303,12 +1384,48 @@ class SCXCtlGUI(Gtk.Application):
                 break
 
     def on_refresh_clicked(self, btn):
-        self.get_status()
+        self.core.refresh()
+
+    def on_cancel_clicked(self, btn):
+        self.core.cancel()
+
+    def on_bench_clicked(self, btn):
+        if self.bench_window is None:
+            self.bench_window = BenchmarkWindow(self)
+        self.bench_window.present()
+
+    def on_rules_clicked(self, btn):
+        if self.rules_window is None:
+            self.rules_window = RulesWindow(self)
+        self.rules_window.present()
+
+    def on_heatmap_clicked(self, btn):
+        if self.heatmap_window is None:
+            from scxctl_core.heatmap import HAVE_NUMPY
+            if not HAVE_NUMPY:
+                self.core.log("heatmap", "The CPU heatmap needs NumPy (pip install numpy)")
+                return
+            self.heatmap_window = HeatmapWindow(self)
+        self.heatmap_window.present()
+
+    def on_apps_clicked(self, btn):
+        if self.apps_window is None:
+            self.apps_window = AppsWindow(self)
+        self.apps_window.present()
+
+    def on_history_clicked(self, btn):
+        if self.history_window is None:
+            self.history_window = HistoryWindow(self)
+        self.history_window.present()
+
+    def on_timing_clicked(self, btn):
+        if self.timing_window is None:
+            self.timing_window = TransitionWindow(self)
+        self.timing_window.present()
 
     def on_stop_clicked(self, btn):
-        output = self.run_command(["stop"])
-        self.append_log("stop", output)
-        self.get_status()
+        self.core.cancel_guard()
+        self.core.stop()
 
     def on_apply_clicked(self, btn):
         selected_idx = self.sched_combo.get_selected()
@@ -322,25 +1439,15 @@ class SCXCtlGUI(Gtk.Application):
         
         args = self.args_entry.get_text()
 
-        if sched == "default":
-            self.on_stop_clicked(None)
-            return
-
-        status_output = self.run_command(["get"])
-        if "no scx scheduler running" in status_output.lower():
-            cmd = ["start", "-s", sched]
+        if self.guard_check.get_active():
+            self.core.guarded_apply(sched, mode, args,
+                                    GuardThresholds(window=self.guard_window.get_value()))
         else:
-            cmd = ["switch", "-s", sched]
-
-        if mode:
-            cmd += ["-m", mode]
-        if args:
-            cmd += ["-a", args]
-
-        output = self.run_command(cmd)
-        self.append_log(cmd[0], output)
-        self.get_status()
+            self.core.cancel_guard()
+            self.core.apply(sched, mode, args)
 
 if __name__ == "__main__":
     app = SCXCtlGUI()
-    app.run(sys.argv)
+    if profile.enabled:
+        GLib.timeout_add_seconds(int(GIVE_UP_AFTER), app.write_profile)
+    app.run(without_profile_flag(sys.argv))
@@ -1,21 +1,826 @@
 import sys
-import subprocess
-import ast
+
+from scxctl_core.startup import GIVE_UP_AFTER, StartupProfile, profile_path
+
+# Off (and free) unless --profile-startup is given
+profile = StartupProfile("qt", profile_path(sys.argv[1:]) if __name__ == "__main__" else None)
+profile.mark("interpreter")
+
+from scxctl_core.control import forward_to_instance, remote_main
+from scxctl_core.worker import WORKER_FLAG, run_worker
+
+
+def parse_launch_args(argv):
+    """Our options from a command line; Qt's own (-style, ...) are left alone."""
+    import argparse
+    parser = argparse.ArgumentParser(prog="scxctl_gui_qt.py")
+    parser.add_argument("--apply", metavar="SCHEDULER", help="start or switch to SCHEDULER")
+    parser.add_argument("--mode", help="mode for --apply")
+    parser.add_argument("--args", default="", help="extra scheduler arguments for --apply")
+    parser.add_argument("--tray", action="store_true",
+                        help="stay in the system tray; the window is built when opened")
+    parser.add_argument("--profile-startup", nargs="?", metavar="FILE", const=True,
+                        help="write start-up phase timings as JSON (default: ~/.local/state/scxctl_gui/)")
+    return parser.parse_known_args(argv)[0]
+
+
+if __name__ == "__main__":
+    # Before PyQt6 is loaded: helper processes, --remote and relaunches
+    # never need it, and a relaunch should only raise the running window
+    if sys.argv[1:2] == [WORKER_FLAG]:
+        sys.exit(run_worker(sys.argv[2:]))
+    if sys.argv[1:2] == ["--remote"]:
+        sys.exit(remote_main(sys.argv[2:]))
+    # --help and bad options exit here rather than in the running window
+    parse_launch_args(sys.argv[1:])
+    # A profile is of a cold start, so never hand it over
+    if not profile.enabled and forward_to_instance(sys.argv[1:]):
+        sys.exit(0)
+    profile.mark("launch checks")
+
+import os
+import time
+from collections import deque
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLabel, QPushButton,
-    QComboBox, QLineEdit, QTextEdit, QHBoxLayout, QMessageBox,
-    QGroupBox, QFrame, QSizePolicy
+    QComboBox, QLineEdit, QPlainTextEdit, QHBoxLayout, QMessageBox,
+    QGroupBox, QFrame, QSizePolicy, QGridLayout, QTableWidget, QTableWidgetItem,
+    QHeaderView, QDialog, QListWidget, QDoubleSpinBox, QFileDialog, QCheckBox, QSpinBox,
+    QMenu, QSystemTrayIcon, QToolTip
 )
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt, QEvent, QObject, QPointF, QTimer, pyqtSignal
+from PyQt6.QtGui import QActionGroup, QColor, QFont, QIcon, QImage, QPainter, QPen, QPolygonF
+
+profile.mark("PyQt6 import")
+
+from scxctl_core import (
+    METRICS, MODES, GuardThresholds, SchedulerCore, SchedulerState, scheduler_emoji,
+)
+from scxctl_core.probe import format_overhead, format_summary
+
+profile.mark("core import")
+
+# The log widget keeps at most this many lines and is redrawn at most once
+# per frame, however fast entries arrive.
+LOG_MAX_LINES = 2000
+LOG_FLUSH_MS = 16
+
+
+
+class Dispatcher(QObject):
+    """Runs callables on the GUI thread, whichever thread asks."""
+
+    invoke = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.invoke.connect(self._run)
+
+    def _run(self, fn):
+        fn()
+
+
+class Sparkline(QWidget):
+    """Minimal line chart of a telemetry series."""
+
+    def __init__(self, color="#2196f3", parent=None):
+        super().__init__(parent)
+        self.values = []
+        self.color = QColor(color)
+        self.setMinimumSize(120, 28)
+
+    def set_values(self, values):
+        self.values = [v for v in values if v == v]  # drop NaN
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self.values) < 2:
+            return
+        lo, hi = min(self.values), max(self.values)
+        span = (hi - lo) or 1.0
+        w, h = self.width() - 2, self.height() - 2
+        step = w / (len(self.values) - 1)
+        points = QPolygonF([QPointF(1 + i * step, 1 + h - (v - lo) / span * h)
+                            for i, v in enumerate(self.values)])
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(self.color, 1.5))
+        painter.drawPolyline(points)
+
+
+def format_metric(value, unit):
+    if value >= 1000:
+        return f"{value:,.0f} {unit}"
+    return f"{value:.2f} {unit}"
+
+
+class BenchmarkDialog(QDialog):
+    """Collects scheduler/mode/args cases from the main window and compares them.
+
+    Like RulesDialog, it imports its part of scxctl_core when first opened.
+    """
+
+    def __init__(self, gui):
+        from scxctl_core.bench import COLUMNS, DEFAULT_DURATION
+        super().__init__(gui)
+        self.gui = gui
+        self.runner = None
+        self.cases = []
+        self.last_results = []
+        self.setWindowTitle("Scheduler Benchmark")
+        self.resize(960, 420)
+
+        layout = QVBoxLayout()
+        hint = QLabel("Pick a scheduler, mode and arguments in the main window, then add them here.")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        self.case_list = QListWidget()
+        self.case_list.setMaximumHeight(110)
+        layout.addWidget(self.case_list)
+
+        btn_row = QHBoxLayout()
+        self.add_btn = QPushButton("Add Current Selection")
+        self.add_btn.clicked.connect(self.add_case)
+        self.clear_btn = QPushButton("Clear")
+        self.clear_btn.clicked.connect(self.clear_cases)
+        self.duration_spin = QDoubleSpinBox()
+        self.duration_spin.setRange(0.5, 60.0)
+        self.duration_spin.setValue(DEFAULT_DURATION)
+        self.duration_spin.setSuffix(" s / workload")
+        self.run_btn = QPushButton("Run Benchmark")
+        self.run_btn.setObjectName("applyBtn")
+        self.run_btn.clicked.connect(self.run_or_cancel)
+        self.export_btn = QPushButton("Export…")
+        self.export_btn.clicked.connect(self.export)
+        self.export_btn.setEnabled(False)
+        for widget in (self.add_btn, self.clear_btn, self.duration_spin, self.run_btn, self.export_btn):
+            btn_row.addWidget(widget)
+        layout.addLayout(btn_row)
+
+        self.table = QTableWidget(0, len(COLUMNS) + 1)
+        self.table.setHorizontalHeaderLabels(["Configuration", *COLUMNS.values()])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+    def add_case(self):
+        from scxctl_core.bench import BenchCase
+        case = BenchCase(self.gui.sched_combo.currentText().strip().lower(),
+                         self.gui.mode_combo.currentText(), self.gui.args_input.text().strip())
+        if case.scheduler and case not in self.cases:
+            self.cases.append(case)
+            self.case_list.addItem(case.label)
+
+    def clear_cases(self):
+        self.cases = []
+        self.case_list.clear()
+
+    def run_or_cancel(self):
+        from scxctl_core.bench import BenchError, BenchmarkRunner
+        if self.runner is not None:
+            self.runner.cancel()
+            self.gui.core.cancel()
+            return
+        if not self.cases:
+            QMessageBox.warning(self, "Error", "Add at least one configuration first.")
+            return
+        self.table.setRowCount(0)
+        self.runner = BenchmarkRunner(self.gui.core, self.cases, on_result=self.add_result,
+                                      on_finish=self.finished, duration=self.duration_spin.value())
+        try:
+            self.runner.start()
+        except BenchError as e:
+            self.runner = None
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        self.run_btn.setText("Cancel Benchmark")
+        for widget in (self.add_btn, self.clear_btn, self.export_btn):
+            widget.setEnabled(False)
+
+    def add_result(self, result):
+        from scxctl_core.bench import COLUMNS, format_metric as format_bench
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.table.setItem(row, 0, QTableWidgetItem(result.case.label))
+        if result.error:
+            item = QTableWidgetItem(f"❌ {result.error}")
+            self.table.setItem(row, 1, item)
+            self.table.setSpan(row, 1, 1, len(COLUMNS))
+            return
+        for col, key in enumerate(COLUMNS, start=1):
+            item = QTableWidgetItem(format_bench(result.metrics.get(key, float("nan"))))
+            item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            self.table.setItem(row, col, item)
+
+    def finished(self, results):
+        self.runner = None
+        self.last_results = results
+        self.run_btn.setText("Run Benchmark")
+        for widget in (self.add_btn, self.clear_btn):
+            widget.setEnabled(True)
+        self.export_btn.setEnabled(bool(results))
+
+    def export(self):
+        from scxctl_core.bench import export_csv, export_json
+        path, _ = QFileDialog.getSaveFileName(self, "Export Results", "scx-benchmark.csv",
+                                              "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            if path.endswith(".json"):
+                export_json(self.last_results, path)
+            else:
+                export_csv(self.last_results, path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not export: {e}")
+            return
+        self.gui.core.log("bench", f"Exported results to {path}")
+
+
+class RulesDialog(QDialog):
+    """Edits the rules file and shows what the rules daemon has been doing."""
+
+    def __init__(self, gui):
+        from scxctl_core.rules import rules_path
+        super().__init__(gui)
+        self.gui = gui
+        self.setWindowTitle("Automatic Switching Rules")
+        self.resize(760, 620)
+
+        layout = QVBoxLayout()
+        self.daemon_label = QLabel()
+        self.daemon_label.setWordWrap(True)
+        self.daemon_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self.daemon_label)
+
+        self.editor = QPlainTextEdit()
+        self.editor.setFont(QFont("monospace", 11))
+        layout.addWidget(self.editor, 3)
+
+        self.error_label = QLabel("")
+        self.error_label.setWordWrap(True)
+        self.error_label.setStyleSheet("color: #f44336;")
+        layout.addWidget(self.error_label)
+
+        btn_row = QHBoxLayout()
+        self.revert_btn = QPushButton("Revert")
+        self.revert_btn.clicked.connect(self.load)
+        self.save_btn = QPushButton("Save && Reload")
+        self.save_btn.setObjectName("applyBtn")
+        self.save_btn.clicked.connect(self.save)
+        btn_row.addWidget(QLabel(rules_path()))
+        btn_row.addStretch()
+        btn_row.addWidget(self.revert_btn)
+        btn_row.addWidget(self.save_btn)
+        layout.addLayout(btn_row)
+
+        layout.addWidget(QLabel("Rules daemon log"))
+        self.log_view = QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        layout.addWidget(self.log_view, 2)
+        self.setLayout(layout)
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(2000)
+        self.poll_timer.timeout.connect(self.refresh_daemon)
+        self.load()
+
+    def showEvent(self, event):
+        self.refresh_daemon()
+        self.poll_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.poll_timer.stop()
+        super().hideEvent(event)
+
+    def load(self):
+        from scxctl_core.rules import load_rules_text
+        try:
+            self.editor.setPlainText(load_rules_text())
+            self.error_label.setText("")
+        except OSError as e:
+            self.error_label.setText(f"Could not read the rules: {e}")
+
+    def save(self):
+        from scxctl_core.rules import reload_daemon, save_rules_text
+        try:
+            save_rules_text(self.editor.toPlainText())
+        except ValueError as e:
+            self.error_label.setText(f"Not saved: {e}")
+            return
+        except OSError as e:
+            self.error_label.setText(f"Could not save: {e}")
+            return
+        self.error_label.setText("")
+        reloaded = reload_daemon()
+        self.gui.core.log("rules", "Saved rules" + (", daemon reloaded" if reloaded else
+                                                    "; the daemon is not running"))
+        self.refresh_daemon()
+
+    def refresh_daemon(self):
+        from scxctl_core.rules import daemon_pid, tail_log
+        pid = daemon_pid()
+        if pid is not None:
+            self.daemon_label.setText(f"🤖 Rules daemon running (pid {pid})")
+        else:
+            self.daemon_label.setText("Rules daemon not running. Start it with "
+                                      "<code>systemctl --user enable --now scxctl-rules</code> "
+                                      "(see contrib/scxctl-rules.service).")
+        lines = tail_log()
+        text = "\n".join(lines)
+        if text != self.log_view.toPlainText():
+            self.log_view.setPlainText(text)
+            self.log_view.verticalScrollBar().setValue(self.log_view.verticalScrollBar().maximum())
+
+
+class HeatmapView(QWidget):
+    """CpuSamples.image scaled to fit: one blit per frame, however many CPUs."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.samples = None
+        self.metric = None
+        self.pixels = None
+        self.image = None
+        self.setMinimumSize(360, 160)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+    def set_samples(self, samples, metric):
+        self.samples = samples
+        self.metric = metric
+        # The QImage points into this buffer, so keep it alive with it
+        self.pixels = samples.image(metric)
+        height, width = self.pixels.shape
+        self.image = QImage(self.pixels.data, width, height, width * 4, QImage.Format.Format_RGB32)
+        self.update()
+
+    def paintEvent(self, event):
+        if self.image is None:
+            return
+        # No smooth transform: every CPU and sample stays a sharp cell
+        QPainter(self).drawImage(self.rect(), self.image)
+
+    def event(self, event):
+        if event.type() == QEvent.Type.ToolTip and self.image is not None:
+            row = int(event.pos().y() * self.image.height() / max(self.height(), 1))
+            text = self.samples.describe(self.metric, row)
+            if text:
+                QToolTip.showText(event.globalPos(), text, self)
+            else:
+                QToolTip.hideText()
+            return True
+        return super().event(event)
+
+
+class HeatmapDialog(QDialog):
+    """Per-CPU load by cache domain. It only samples while it is open."""
+
+    def __init__(self, gui):
+        from scxctl_core.heatmap import HEATMAP_METRICS
+        super().__init__(gui)
+        self.gui = gui
+        self.metrics = HEATMAP_METRICS
+        self.samples = None
+        self.setWindowTitle("CPU Heatmap")
+        self.resize(900, 560)
+
+        layout = QVBoxLayout()
+        row = QHBoxLayout()
+        self.metric_combo = QComboBox()
+        for name, (label, unit, _) in HEATMAP_METRICS.items():
+            self.metric_combo.addItem(label, name)
+        self.metric_combo.currentIndexChanged.connect(self.redraw)
+        self.scale_label = QLabel("")
+        self.scale_label.setStyleSheet("color: #aaaaaa;")
+        row.addWidget(QLabel("Show"))
+        row.addWidget(self.metric_combo)
+        row.addStretch()
+        row.addWidget(self.scale_label)
+        layout.addLayout(row)
+
+        self.view = HeatmapView()
+        layout.addWidget(self.view, 1)
+
+        hint = QLabel("One row per CPU, grouped by last-level cache (black lines between them). "
+                      "Time runs left to right; hover for a CPU's latest value.")
+        hint.setWordWrap(True)
+        hint.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        layout.addWidget(hint)
+        self.summary_label = QLabel("Sampling…")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        self.gui.core.connect("heatmap", self.update_samples)
+        self.gui.core.start_heatmap()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.gui.core.disconnect("heatmap", self.update_samples)
+        self.gui.core.stop_heatmap()
+        super().hideEvent(event)
+
+    def update_samples(self, samples):
+        self.samples = samples
+        self.redraw()
+
+    def redraw(self):
+        if self.samples is None:
+            return
+        metric = self.metric_combo.currentData()
+        unit = self.metrics[metric][1]
+        self.view.set_samples(self.samples, metric)
+        self.scale_label.setText(f"colour scale 0 – {format_metric(self.samples.scale(metric), unit)}")
+        self.summary_label.setText(self.samples.summary(metric))
+
+
+class HistoryChart(QWidget):
+    """Mean line over a min–max band, with a marker at every scheduler change."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.runs = []
+        self.events = []
+        self.start = self.end = 0.0
+        self.unit = ""
+        self.setMinimumSize(360, 200)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+    def set_data(self, points, events, start, end, unit):
+        from scxctl_core.history import split_gaps
+        self.runs = split_gaps(points, end - start)
+        self.events = events
+        self.start, self.end, self.unit = start, end, unit
+        self.update()
+
+    def x_of(self, when):
+        return 1 + (when - self.start) / ((self.end - self.start) or 1.0) * (self.width() - 2)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for change in self.events:
+            x = self.x_of(change.time)
+            painter.setPen(QPen(QColor("#4caf50" if change.ok else "#f44336"), 1, Qt.PenStyle.DashLine))
+            painter.drawLine(QPointF(x, 0), QPointF(x, self.height()))
+        points = [point for run in self.runs for point in run]
+        if not points:
+            return
+        lo = min(point.min for point in points)
+        hi = max(point.max for point in points)
+        span = (hi - lo) or 1.0
+        h = self.height() - 2
+
+        def y_of(value):
+            return 1 + h - (value - lo) / span * h
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(0x21, 0x96, 0xf3, 60))
+        for run in self.runs:
+            painter.drawPolygon(QPolygonF([QPointF(self.x_of(p.time), y_of(p.max)) for p in run] +
+                                          [QPointF(self.x_of(p.time), y_of(p.min)) for p in reversed(run)]))
+        painter.setPen(QPen(QColor("#2196f3"), 1.5))
+        for run in self.runs:
+            painter.drawPolyline(QPolygonF([QPointF(self.x_of(p.time), y_of(p.mean)) for p in run]))
+        painter.setPen(QColor("#aaaaaa"))
+        painter.drawText(4, 14, format_metric(hi, self.unit))
+        painter.drawText(4, self.height() - 4, format_metric(lo, self.unit))
+
+    def event(self, event):
+        if event.type() == QEvent.Type.ToolTip and self.end > self.start:
+            x = event.pos().x()
+            lines = [change.format() for change in self.events if abs(self.x_of(change.time) - x) <= 4]
+            points = [point for run in self.runs for point in run]
+            if points:
+                point = min(points, key=lambda p: abs(self.x_of(p.time) - x))
+                stamp = time.strftime("%m-%d %H:%M", time.localtime(point.time))
+                lines.insert(0, f"{stamp}: {format_metric(point.mean, self.unit)} "
+                                f"({format_metric(point.min, self.unit)} – {format_metric(point.max, self.unit)})")
+            if lines:
+                QToolTip.showText(event.globalPos(), "\n".join(lines), self)
+            else:
+                QToolTip.hideText()
+            return True
+        return super().event(event)
+
+
+class HistoryDialog(QDialog):
+    """What was recorded (history.py): one metric over a range, and every change in it."""
+
+    def __init__(self, gui):
+        from scxctl_core.history import FLUSH_INTERVAL, HISTORY_METRICS, RANGES
+        super().__init__(gui)
+        self.gui = gui
+        self.setWindowTitle("History")
+        self.resize(900, 620)
+
+        layout = QVBoxLayout()
+        row = QHBoxLayout()
+        self.metric_combo = QComboBox()
+        for name, (label, unit) in HISTORY_METRICS.items():
+            self.metric_combo.addItem(label, name)
+        self.range_combo = QComboBox()
+        for label, seconds in RANGES:
+            self.range_combo.addItem(label, seconds)
+        self.range_combo.setCurrentIndex(2)
+        for combo in (self.metric_combo, self.range_combo):
+            combo.currentIndexChanged.connect(self.load)
+        row.addWidget(QLabel("Show"))
+        row.addWidget(self.metric_combo)
+        row.addWidget(QLabel("over the last"))
+        row.addWidget(self.range_combo)
+        row.addStretch()
+        layout.addLayout(row)
+
+        self.chart = HistoryChart()
+        layout.addWidget(self.chart, 2)
+        self.summary_label = QLabel("")
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(QLabel("Scheduler changes, newest first (dashed lines above; red ones failed)"))
+        self.events_list = QListWidget()
+        layout.addWidget(self.events_list, 1)
+        self.setLayout(layout)
+
+        # New samples reach the file in batches
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(FLUSH_INTERVAL * 1000))
+        self.timer.timeout.connect(self.load)
+
+    def showEvent(self, event):
+        self.load()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def load(self):
+        from scxctl_core.history import HISTORY_METRICS, describe_range, history_path, read_range
+        metric = self.metric_combo.currentData()
+        end = time.time()
+        start = end - self.range_combo.currentData()
+        result = read_range(metric, start, end)
+        if result is None:
+            self.chart.set_data([], [], start, end, "")
+            self.summary_label.setText(f"Nothing recorded yet ({history_path()})")
+            self.events_list.clear()
+            return
+        points, events = result
+        self.chart.set_data(points, events, start, end, HISTORY_METRICS[metric][1])
+        self.summary_label.setText(describe_range(metric, points, events))
+        self.events_list.clear()
+        self.events_list.addItems([change.format() for change in reversed(events)])
+
+
+class TransitionDialog(QDialog):
+    """How long each phase of a scheduler change took (transition.py)."""
+
+    def __init__(self, gui):
+        from scxctl_core.transition import PHASES
+        super().__init__(gui)
+        self.gui = gui
+        self.setWindowTitle("Switch Timing")
+        self.resize(760, 560)
+
+        layout = QVBoxLayout()
+        hint = QLabel("Each start, switch and stop from here is timed from the click: "
+                      + "; ".join(f"<b>{phase}</b> {description}" for phase, (_, _, description)
+                                  in PHASES.items()) + ".")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["Target", "Phase", "Count", "p50", "p99", "Max"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table, 2)
+
+        layout.addWidget(QLabel("Recent changes, newest first"))
+        self.traces_list = QListWidget()
+        layout.addWidget(self.traces_list, 1)
+
+        btn_row = QHBoxLayout()
+        btn_row.addStretch()
+        self.export_btn = QPushButton("Export Trace…")
+        self.export_btn.setToolTip("Chrome trace JSON, for chrome://tracing or ui.perfetto.dev")
+        self.export_btn.clicked.connect(self.export)
+        btn_row.addWidget(self.export_btn)
+        layout.addLayout(btn_row)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        self.gui.core.connect("transition", self.update_transitions)
+        self.update_transitions(self.gui.core.transitions)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.gui.core.disconnect("transition", self.update_transitions)
+        super().hideEvent(event)
+
+    def update_transitions(self, transitions):
+        from scxctl_core.transition import format_ms, format_trace
+        rows = transitions.summary()
+        self.table.setRowCount(len(rows))
+        for row, (label, phase, summary) in enumerate(rows):
+            values = [label, phase, str(summary["count"]),
+                      *(format_ms(summary[key]) for key in ("p50", "p99", "max"))]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.traces_list.clear()
+        for trace in reversed(transitions.traces):
+            stamp = time.strftime("%H:%M:%S", time.localtime(trace.wall))
+            text = f"{stamp} {format_trace(trace)}"
+            self.traces_list.addItem(f"{text} ❌ {trace.error}" if trace.error else text)
+        self.export_btn.setEnabled(bool(transitions.traces))
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Trace", "scxctl-switches.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.gui.core.transitions.export(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not export: {e}")
+            return
+        self.gui.core.log("timing", f"Trace of {len(self.gui.core.transitions.traces)} changes → {path}")
+
+
+class AppsDialog(QDialog):
+    """Run delay of pinned apps, before and after each switch and per scheduler."""
+
+    def __init__(self, gui):
+        from scxctl_core.apptrack import load_pinned
+        super().__init__(gui)
+        self.gui = gui
+        self.history = None
+        self.setWindowTitle("Pinned Apps")
+        self.resize(900, 560)
+
+        layout = QVBoxLayout()
+        hint = QLabel("Pin processes by name (wildcards work, e.g. <code>cs2*</code>) or PID. Their threads' "
+                      "run delay and timeslices are summed per entry and kept per scheduler, so you can "
+                      "compare before and after a switch.")
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+
+        pin_row = QHBoxLayout()
+        self.pin_input = QLineEdit()
+        self.pin_input.setPlaceholderText("Process name or PID")
+        self.pin_input.returnPressed.connect(self.add_pin)
+        add_btn = QPushButton("Pin")
+        add_btn.clicked.connect(self.add_pin)
+        remove_btn = QPushButton("Unpin Selected")
+        remove_btn.clicked.connect(self.remove_pin)
+        pin_row.addWidget(self.pin_input, 1)
+        pin_row.addWidget(add_btn)
+        pin_row.addWidget(remove_btn)
+        layout.addLayout(pin_row)
+
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["App", "Now", "Before", "After", "Change"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.itemSelectionChanged.connect(self.update_comparison)
+        layout.addWidget(self.table, 2)
+
+        self.compare_label = QLabel("Per scheduler")
+        layout.addWidget(self.compare_label)
+        self.compare_table = QTableWidget(0, 6)
+        self.compare_table.setHorizontalHeaderLabels(
+            ["Scheduler", "Run delay / slice", "Run delay", "Timeslices", "CPU", "Observed"])
+        self.compare_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.compare_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.compare_table.verticalHeader().hide()
+        self.compare_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.compare_table, 1)
+
+        self.cost_label = QLabel("")
+        self.cost_label.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        layout.addWidget(self.cost_label)
+        self.setLayout(layout)
+
+        self.pinned = load_pinned()
+        self.set_rows()
+
+    def showEvent(self, event):
+        self.gui.core.connect("apps", self.update_apps)
+        if self.gui.core.apps is not None:
+            self.update_apps(self.gui.core.apps)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.gui.core.disconnect("apps", self.update_apps)
+        super().hideEvent(event)
+
+    def add_pin(self):
+        entry = self.pin_input.text().strip()
+        if entry and entry not in self.pinned:
+            self.pinned.append(entry)
+            self.gui.core.pin_apps(self.pinned)
+            self.set_rows()
+        self.pin_input.clear()
+
+    def remove_pin(self):
+        rows = {index.row() for index in self.table.selectedIndexes()}
+        if rows:
+            self.pinned = [entry for row, entry in enumerate(self.pinned) if row not in rows]
+            self.gui.core.pin_apps(self.pinned)
+            self.set_rows()
+
+    def set_rows(self):
+        self.table.setRowCount(len(self.pinned))
+        for row, entry in enumerate(self.pinned):
+            self.table.setItem(row, 0, QTableWidgetItem(entry))
+            for column in range(1, 5):
+                self.table.setItem(row, column, QTableWidgetItem("-"))
+        if self.history is not None:
+            self.update_apps(self.history)
+
+    def update_apps(self, history):
+        from scxctl_core.apptrack import format_change, format_per_slice, format_totals
+        self.history = history
+        threads = 0
+        for row, entry in enumerate(self.pinned):
+            sample = history.live.get(entry)
+            name = self.table.item(row, 0)
+            if sample is None:
+                name.setText(f"{entry} (not running)")
+                name.setToolTip("")
+            else:
+                threads += sample.threads
+                name.setText(f"{entry} ({len(sample.pids)} proc, {sample.threads} threads)")
+                name.setToolTip(f"PID {', '.join(map(str, sample.pids))}")
+            live = history.live_totals(entry)
+            self.table.item(row, 1).setText(format_totals(live) if live is not None else "-")
+            before, after = history.before_after(entry)
+            for column, epoch in ((2, before), (3, after)):
+                totals = epoch.apps[entry] if epoch is not None else None
+                item = self.table.item(row, column)
+                item.setText(f"{epoch.label}: {format_per_slice(totals)}" if epoch is not None else "-")
+                item.setToolTip(format_totals(totals) if epoch is not None else "")
+            self.table.item(row, 4).setText(format_change(before and before.apps[entry],
+                                                          after and after.apps[entry]))
+        if history.cost is not None:
+            self.cost_label.setText(f"Sampled {threads:,} threads in {history.cost * 1000:.2f} ms; "
+                                    f"processes found via {history.source}")
+        self.update_comparison()
+
+    def update_comparison(self):
+        from scxctl_core.apptrack import format_per_slice
+        rows = sorted({index.row() for index in self.table.selectedIndexes()})
+        entry = self.pinned[rows[0]] if rows and rows[0] < len(self.pinned) else None
+        if entry is None or self.history is None:
+            self.compare_table.setRowCount(0)
+            self.compare_label.setText("Per scheduler (select an app)")
+            return
+        self.compare_label.setText(f"Per scheduler: {entry}, least run delay first")
+        by_label = sorted(self.history.by_label(entry).items(),
+                          key=lambda item: item[1].delay_per_slice_us if item[1].delay_per_slice_us is not None
+                          else float("inf"))
+        self.compare_table.setRowCount(len(by_label))
+        for row, (label, totals) in enumerate(by_label):
+            values = [label, format_per_slice(totals),
+                      f"{totals.delay_ms_per_s:,.2f} ms/s" if totals.seconds else "-",
+                      f"{totals.slices_per_s:,.0f} /s" if totals.seconds else "-",
+                      f"{totals.cpu_percent:,.1f}%" if totals.seconds else "-",
+                      f"{totals.seconds:,.0f} s"]
+            for column, value in enumerate(values):
+                self.compare_table.setItem(row, column, QTableWidgetItem(value))
+
+
+def app_icon() -> QIcon:
+    for base in (os.environ.get("APPDIR"), os.path.dirname(os.path.abspath(__file__))):
+        if base and os.path.exists(os.path.join(base, "scxctl_gui.png")):
+            return QIcon(os.path.join(base, "scxctl_gui.png"))
+    return QIcon.fromTheme("preferences-system")
 
 
 class SCXCtlGUI(QWidget):
-    def __init__(self):
+    def __init__(self, core=None):
+        """With ``core`` the window is the tray's: it borrows the running
+        core, and closing it only releases the window."""
         super().__init__()
+        self.resident = core is not None
+        self.painted = False
         self.setWindowTitle("scxctl GUI")
-        self.resize(500, 650)
+        self.resize(820, 650)
         self.apply_stylesheet()
+        profile.mark("stylesheet")
 
         # Main Layout
         main_layout = QVBoxLayout()
@@ -32,9 +837,37 @@ class SCXCtlGUI(QWidget):
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.status_label.setFont(QFont("Segoe UI", 16, QFont.Weight.Bold)) # Larger font like GTK
         status_layout.addWidget(self.status_label)
+
+        self.probe_check = QCheckBox("Wakeup latency probe")
+        self.probe_check.setToolTip("Measure how late a periodic 2ms sleeper wakes up under the current scheduler")
+        status_layout.addWidget(self.probe_check)
+        self.latency_label = QLabel("")
+        self.latency_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.latency_label.setWordWrap(True)
+        self.latency_label.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        status_layout.addWidget(self.latency_label)
         self.status_group.setLayout(status_layout)
         
-        main_layout.addWidget(self.status_group)
+        # --- Live Telemetry, next to the status ---
+        self.metrics_group = QGroupBox("Live Telemetry")
+        metrics_layout = QGridLayout()
+        metrics_layout.setVerticalSpacing(4)
+        self.scx_label = QLabel("sched_ext: -")
+        metrics_layout.addWidget(self.scx_label, 0, 0, 1, 3)
+        self.metric_rows = {}
+        for row, (name, (label, unit)) in enumerate(METRICS.items(), start=1):
+            value_label = QLabel("-")
+            value_label.setMinimumWidth(130)
+            sparkline = Sparkline()
+            metrics_layout.addWidget(QLabel(label), row, 0)
+            metrics_layout.addWidget(value_label, row, 1)
+            metrics_layout.addWidget(sparkline, row, 2)
+            self.metric_rows[name] = (value_label, sparkline, unit)
+        self.metrics_group.setLayout(metrics_layout)
+
+        header_layout.addWidget(self.status_group, 1)
+        header_layout.addWidget(self.metrics_group, 2)
+        main_layout.addLayout(header_layout)
         
         # Refresh Button (Small, top right-ish feel, but here we put it above or below status?)
         # Let's put it in a small row above status or inside status?
@@ -47,7 +880,50 @@ class SCXCtlGUI(QWidget):
         self.refresh_btn.setFixedSize(40, 40)
         self.refresh_btn.setObjectName("refreshBtn")
         top_bar.addWidget(self.refresh_btn)
+
+        self.bench_btn = QPushButton("📊")
+        self.bench_btn.setToolTip("Benchmark Schedulers")
+        self.bench_btn.setFixedSize(40, 40)
+        top_bar.addWidget(self.bench_btn)
+        self.bench_dialog = None
+
+        self.rules_btn = QPushButton("🤖")
+        self.rules_btn.setToolTip("Automatic Switching Rules")
+        self.rules_btn.setFixedSize(40, 40)
+        top_bar.addWidget(self.rules_btn)
+        self.rules_dialog = None
+
+        self.heatmap_btn = QPushButton("🔥")
+        self.heatmap_btn.setToolTip("Per-CPU Heatmap")
+        self.heatmap_btn.setFixedSize(40, 40)
+        top_bar.addWidget(self.heatmap_btn)
+        self.heatmap_dialog = None
+
+        self.apps_btn = QPushButton("🎯")
+        self.apps_btn.setToolTip("Pinned Apps")
+        self.apps_btn.setFixedSize(40, 40)
+        top_bar.addWidget(self.apps_btn)
+        self.apps_dialog = None
+
+        self.history_btn = QPushButton("🕒")
+        self.history_btn.setToolTip("History")
+        self.history_btn.setFixedSize(40, 40)
+        top_bar.addWidget(self.history_btn)
+        self.history_dialog = None
+
+        self.timing_btn = QPushButton("⏲")
+        self.timing_btn.setToolTip("Switch Timing")
+        self.timing_btn.setFixedSize(40, 40)
+        top_bar.addWidget(self.timing_btn)
+        self.timing_dialog = None
         top_bar.addStretch()
+
+        self.cancel_btn = QPushButton("✖")
+        self.cancel_btn.setToolTip("Cancel Running Command")
+        self.cancel_btn.setFixedSize(40, 40)
+        self.cancel_btn.setObjectName("cancelBtn")
+        self.cancel_btn.hide()
+        top_bar.addWidget(self.cancel_btn)
         
         # Insert top bar before status group? Or maybe just keep refresh separate.
         # Actually, let's put the refresh button IN the status group layout for now or just above it.
@@ -90,6 +966,18 @@ class SCXCtlGUI(QWidget):
         args_layout.addWidget(self.args_input)
         controls_layout.addLayout(args_layout)
 
+        # Guarded apply
+        guard_layout = QHBoxLayout()
+        self.guard_check = QCheckBox("Roll back if pressure or latency regress within")
+        self.guard_window = QSpinBox()
+        self.guard_window.setRange(5, 300)
+        self.guard_window.setValue(int(GuardThresholds().window))
+        self.guard_window.setSuffix(" s")
+        guard_layout.addWidget(self.guard_check)
+        guard_layout.addWidget(self.guard_window)
+        guard_layout.addStretch()
+        controls_layout.addLayout(guard_layout)
+
         # --- Action Buttons (Inside Controls Group like GTK) ---
         btn_layout = QHBoxLayout()
         btn_layout.setSpacing(10)
@@ -111,25 +999,98 @@ class SCXCtlGUI(QWidget):
         self.controls_group.setLayout(controls_layout)
         main_layout.addWidget(self.controls_group)
 
+        # --- Scheduler-exported scx_stats ---
+        self.stats_group = QGroupBox("Scheduler Stats")
+        stats_layout = QVBoxLayout()
+        self.stats_table = QTableWidget(0, 2)
+        self.stats_table.setHorizontalHeaderLabels(["Metric", "Value"])
+        self.stats_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.stats_table.verticalHeader().hide()
+        self.stats_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.stats_table.setMinimumHeight(120)
+        stats_layout.addWidget(self.stats_table)
+        self.stats_group.setLayout(stats_layout)
+        self.stats_group.hide()
+        self.stats_rows = {}
+        main_layout.addWidget(self.stats_group)
+
         # --- Log Output ---
         log_group = QGroupBox("Activity Log")
         log_layout = QVBoxLayout()
-        self.output = QTextEdit()
+        self.output = QPlainTextEdit()
         self.output.setReadOnly(True)
+        self.output.setMaximumBlockCount(LOG_MAX_LINES)
         log_layout.addWidget(self.output)
+        self.pending_log = deque(maxlen=LOG_MAX_LINES)
+        self.log_timer = QTimer(self)
+        self.log_timer.setSingleShot(True)
+        self.log_timer.setInterval(LOG_FLUSH_MS)
+        self.log_timer.timeout.connect(self.flush_log)
         log_group.setLayout(log_layout)
         main_layout.addWidget(log_group)
 
         self.setLayout(main_layout)
 
+        if core is None:
+            self.dispatcher = Dispatcher(self)
+            core = SchedulerCore(self.dispatcher.invoke.emit)
+        self.core = core
+        self.listeners = [
+            ("state", self.update_selection_from_status),
+            ("schedulers", self.set_schedulers),
+            ("log", self.append_output),
+            ("busy", self.set_busy),
+            ("telemetry", self.update_telemetry),
+            ("stats_schema", self.set_stats_schema),
+            ("stats", self.update_stats),
+            ("latency", self.update_latency),
+        ]
+        for event, fn in self.listeners:
+            self.core.connect(event, fn)
+
         # Connections
-        self.refresh_btn.clicked.connect(self.get_status)
+        self.refresh_btn.clicked.connect(lambda: self.core.refresh())
+        self.cancel_btn.clicked.connect(lambda: self.core.cancel())
         self.set_btn.clicked.connect(self.set_scheduler)
         self.stop_btn.clicked.connect(self.stop_scheduler)
+        self.bench_btn.clicked.connect(self.show_benchmark)
+        self.rules_btn.clicked.connect(self.show_rules)
+        self.heatmap_btn.clicked.connect(self.show_heatmap)
+        self.apps_btn.clicked.connect(self.show_apps)
+        self.history_btn.clicked.connect(self.show_history)
+        self.timing_btn.clicked.connect(self.show_timing)
+        self.probe_check.toggled.connect(self.toggle_probe)
         self.sched_combo.currentTextChanged.connect(self.on_scheduler_changed)
 
-        # Initial Load
-        self.list_schedulers()
+        if self.resident:
+            # Catch up with what the core already knows
+            self.set_schedulers(self.core.schedulers)
+            self.set_busy(self.core.busy)
+            for entry in self.core.activity:
+                self.append_output(entry)
+        else:
+            # Initial Load: paint the scheduler list from cache, then revalidate
+            # once the first frame is up (see start_core)
+            self.set_schedulers(self.core.load_cached_schedulers())
+            self.set_busy(True)
+        profile.mark("widgets")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.painted:
+            self.painted = True
+            # Queued, so it runs once this whole first frame is drawn
+            QTimer.singleShot(0, self.start_core)
+
+    def start_core(self):
+        profile.mark("first paint")
+        if not self.resident:
+            self.core.start()
+            self.core.start_control(on_activate=self.handle_launch)
+            self.core.start_apps()
+            self.core.start_history()
+        self.core.start_telemetry()
+        self.core.start_stats()
 
     def apply_stylesheet(self):
         # Modern Dark Theme
@@ -152,14 +1113,19 @@ class SCXCtlGUI(QWidget):
                 left: 10px;
                 padding: 0 5px;
             }
-            QLineEdit, QComboBox, QTextEdit {
+            QTableWidget, QHeaderView::section {
+                background-color: #2d2d2d;
+                gridline-color: #3e3e3e;
+                border: none;
+            }
+            QLineEdit, QComboBox, QPlainTextEdit {
                 background-color: #2d2d2d;
                 border: 1px solid #3e3e3e;
                 border-radius: 4px;
                 padding: 5px;
                 color: #ffffff;
             }
-            QLineEdit:focus, QComboBox:focus, QTextEdit:focus {
+            QLineEdit:focus, QComboBox:focus, QPlainTextEdit:focus {
                 border: 1px solid #007acc;
             }
             QPushButton {
@@ -188,25 +1154,97 @@ class SCXCtlGUI(QWidget):
             QPushButton#stopBtn:hover {
                 background-color: #b71c1c;
             }
+            QPushButton:disabled {
+                background-color: #2a2a2a;
+                color: #777777;
+            }
             QLabel {
                 color: #dddddd;
             }
         """)
 
-    def run_command(self, args: list[str]) -> str:
-        try:
-            result = subprocess.run(["scxctl"] + args, capture_output=True, text=True, check=True)
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            return f"❌ Error: {e.stderr.strip() or e.stdout.strip()}"
-        except FileNotFoundError:
-             return "❌ Error: scxctl not found in PATH"
-
-    def update_selection_from_status(self, output: str):
-        text_lower = output.strip().lower()
-        
+    def set_busy(self, busy: bool):
+        if not busy and profile.has("first paint"):
+            # Connected, and the first get and list are in
+            profile.mark("backend ready")
+            self.write_profile()
+        for btn in (self.refresh_btn, self.set_btn, self.stop_btn):
+            btn.setEnabled(not busy)
+        self.cancel_btn.setVisible(busy)
+
+    def update_telemetry(self, values):
+        telemetry = self.core.telemetry
+        # Samples arrive at most every MIN_INTERVAL; skip painting while hidden
+        if telemetry is None or not self.isVisible():
+            return
+        self.scx_label.setText(f"sched_ext: {telemetry.scx_state or 'unavailable'}"
+                               + (f" ({telemetry.scx_ops})" if telemetry.scx_ops else ""))
+        for name, (value_label, sparkline, unit) in self.metric_rows.items():
+            series = telemetry.series.get(name)
+            if series is None:
+                continue
+            value_label.setText(format_metric(series.latest(), unit))
+            sparkline.set_values(series.values())
+
+        events = sorted(((v, k.split(":", 1)[1]) for k, v in values.items()
+                         if k.startswith("scx_event:") and v), reverse=True)
+        self.metric_rows["scx_events"][0].setToolTip(
+            "\n".join(f"{name}: {rate:,.0f}/s" for rate, name in events[:8]))
+
+    def set_stats_schema(self, columns):
+        self.stats_table.setRowCount(0)
+        self.stats_rows = {}
+        if columns is None:
+            self.stats_group.hide()
+            return
+        running = self.core.state.scheduler if self.core.state and self.core.state.running else None
+        self.stats_group.setTitle(f"Scheduler Stats ({running or columns.schema.name})")
+        self.stats_table.setRowCount(len(columns.schema.fields))
+        for row, field in enumerate(columns.schema.fields):
+            name_item = QTableWidgetItem(field.name)
+            name_item.setToolTip(field.desc)
+            self.stats_table.setItem(row, 0, name_item)
+            value_item = QTableWidgetItem("-")
+            self.stats_table.setItem(row, 1, value_item)
+            self.stats_rows[field.name] = value_item
+        self.stats_group.show()
+
+    def update_stats(self, sample):
+        if not self.isVisible():
+            return
+        for name, item in self.stats_rows.items():
+            value = sample.get(name)
+            if isinstance(value, float):
+                item.setText(f"{value:,.2f}")
+            elif value is not None:
+                item.setText(f"{value:,}" if isinstance(value, int) else str(value))
+
+    def toggle_probe(self, enabled):
+        if enabled:
+            self.core.start_probe()
+            self.latency_label.setText("Measuring…")
+        else:
+            self.core.stop_probe()
+            self.latency_label.setText("")
+
+    def update_latency(self, history):
+        if not self.isVisible():
+            return
+        from html import escape as esc
+        lines = [f"<b>{esc(history.current.label)}</b>: {format_summary(history.current.histogram.summary())}"]
+        # Earlier schedulers, newest first, for comparison
+        for epoch in list(history.epochs)[-2::-1]:
+            if epoch.histogram.count:
+                lines.append(f"{esc(epoch.label)}: {format_summary(epoch.histogram.summary())}")
+        overhead = format_overhead(history)
+        if overhead:
+            lines.append(f"<i>{overhead}</i>")
+        self.latency_label.setText("<br>".join(lines))
+
+    def update_selection_from_status(self, state: SchedulerState):
+        profile.mark("first state")
         # Update Status Label
-        if "no scx scheduler running" in text_lower:
+        if not state.running:
             self.status_label.setText("🟢 Default Kernel Scheduler (No SCX)")
             self.status_label.setStyleSheet("color: #4caf50;") # Green
             
@@ -215,77 +1253,28 @@ class SCXCtlGUI(QWidget):
                 self.sched_combo.setCurrentIndex(idx)
             self.mode_combo.setCurrentIndex(0)
             return
-        
-        if text_lower.startswith("running"):
-            active_sched = "Unknown"
-            active_mode = "Default"
-
-            parts = output.split()
-            if len(parts) >= 2:
-                active_sched = parts[1].strip()
-
-            # Determine emoji based on scheduler name
-            emoji = "🚀"
-            n = active_sched.lower()
-            if "rust" in n: emoji = "🦀"
-            elif "lavd" in n: emoji = "🌋"
-            elif "flash" in n: emoji = "⚡"
-            elif "cosmos" in n: emoji = "🌌"
-            elif "bpfland" in n: emoji = "🎢"
-            elif "p2dq" in n: emoji = "🏎️"
-            elif "tickless" in n: emoji = "🕰️"
-            elif "mitosis" in n: emoji = "🧬"
-            elif "central" in n: emoji = "🎯"
-            elif "layer" in n: emoji = "🍰"
-            elif "nest" in n: emoji = "🪺"
-            elif "joule" in n: emoji = "🔋"
-            elif "flat" in n: emoji = "🥞"
-            elif "pair" in n: emoji = "👯"
-            elif "simple" in n: emoji = "👶"
-            elif "bpf" in n: emoji = "🐝"
-
-            if " in " in output.lower():
-                try:
-                    after_in = output.lower().split(" in ", 1)[1]
-                    active_mode = after_in.split()[0].strip()
-                except IndexError:
-                    active_mode = "Default"
-            
-            self.status_label.setText(f"{emoji} Running: {active_sched} ({active_mode})")
-            self.status_label.setStyleSheet("color: #2196f3;") # Blue
-
-            if active_sched:
-                idx_sched = self.sched_combo.findText(active_sched.lower(), Qt.MatchFlag.MatchFixedString)
-                if idx_sched != -1:
-                    self.sched_combo.setCurrentIndex(idx_sched)
-            if active_mode:
-                idx_mode = self.mode_combo.findText(active_mode.lower(), Qt.MatchFlag.MatchFixedString)
-                if idx_mode != -1:
-                    self.mode_combo.setCurrentIndex(idx_mode)
-
-    def get_status(self):
-        output = self.run_command(["get"])
-        self.append_output("get", output)
-        self.update_selection_from_status(output)
-        return output
-
-    def list_schedulers(self):
-        output = self.run_command(["list"])
-        self.sched_combo.clear()
-        self.sched_combo.addItem("default")
 
-        for line in output.splitlines():
-            if "supported schedulers:" in line:
-                try:
-                    sched_list = line.split("supported schedulers:")[1].strip()
-                    schedulers = ast.literal_eval(sched_list)
-                    for sched in schedulers:
-                        self.sched_combo.addItem(sched)
-                except Exception as e:
-                    self.append_output("parse_error", f"Parse error: {e}")
+        active_sched = state.scheduler
+        active_mode = state.mode or "Default"
+        emoji = scheduler_emoji(active_sched)
+
+        self.status_label.setText(f"{emoji} Running: {active_sched} ({active_mode})")
+        self.status_label.setStyleSheet("color: #2196f3;") # Blue
 
-        status = self.run_command(["get"])
-        self.update_selection_from_status(status)
+        idx_sched = self.sched_combo.findText(active_sched, Qt.MatchFlag.MatchFixedString)
+        if idx_sched != -1:
+            self.sched_combo.setCurrentIndex(idx_sched)
+        if state.mode:
+            idx_mode = self.mode_combo.findText(state.mode, Qt.MatchFlag.MatchFixedString)
+            if idx_mode != -1:
+                self.mode_combo.setCurrentIndex(idx_mode)
+
+    def set_schedulers(self, schedulers: list[str]):
+        self.sched_combo.clear()
+        self.sched_combo.addItem("default")
+        self.sched_combo.addItems(schedulers)
+        if self.core.state is not None:
+            self.update_selection_from_status(self.core.state)
 
     def set_scheduler(self):
         sched = self.sched_combo.currentText().strip().lower()
@@ -296,49 +1285,265 @@ class SCXCtlGUI(QWidget):
             QMessageBox.warning(self, "Error", "Please select a scheduler.")
             return
 
-        if sched == "default":
-            self.stop_scheduler()
-            return
-
-        status_output = self.run_command(["get"])
-        status_lower = status_output.lower()
-
-        if "no scx scheduler running" in status_lower:
-            cmd = ["start", "-s", sched]
+        if self.guard_check.isChecked():
+            self.core.guarded_apply(sched, mode, args, GuardThresholds(window=self.guard_window.value()))
         else:
-            # Check if we are just switching modes or schedulers
-            # Simplified logic for now, just switch
-            cmd = ["switch", "-s", sched]
-
-        if mode:
-            cmd += ["-m", mode]
-        if args:
-            # Split args string into list, respecting quotes if possible, but simple split for now
-            cmd += ["-a", args]
-
-        output = self.run_command(cmd)
-        self.append_output(f"start/switch {sched}", output)
-        
-        # Refresh status after action
-        self.get_status()
+            self.core.cancel_guard()
+            self.core.apply(sched, mode, args)
 
     def stop_scheduler(self):
-        output = self.run_command(["stop"])
-        self.append_output("stop", output)
-        self.get_status()
+        self.core.cancel_guard()
+        self.core.stop()
+
+    def show_benchmark(self):
+        if self.bench_dialog is None:
+            self.bench_dialog = BenchmarkDialog(self)
+        self.bench_dialog.show()
+        self.bench_dialog.raise_()
+
+    def show_rules(self):
+        if self.rules_dialog is None:
+            self.rules_dialog = RulesDialog(self)
+        self.rules_dialog.show()
+        self.rules_dialog.raise_()
+
+    def show_heatmap(self):
+        if self.heatmap_dialog is None:
+            from scxctl_core.heatmap import HAVE_NUMPY
+            if not HAVE_NUMPY:
+                self.core.log("heatmap", "The CPU heatmap needs NumPy (pip install numpy)")
+                return
+            self.heatmap_dialog = HeatmapDialog(self)
+        self.heatmap_dialog.show()
+        self.heatmap_dialog.raise_()
+
+    def show_apps(self):
+        if self.apps_dialog is None:
+            self.apps_dialog = AppsDialog(self)
+        self.apps_dialog.show()
+        self.apps_dialog.raise_()
+
+    def show_history(self):
+        if self.history_dialog is None:
+            self.history_dialog = HistoryDialog(self)
+        self.history_dialog.show()
+        self.history_dialog.raise_()
+
+    def show_timing(self):
+        if self.timing_dialog is None:
+            self.timing_dialog = TransitionDialog(self)
+        self.timing_dialog.show()
+        self.timing_dialog.raise_()
+
+    def write_profile(self):
+        path = profile.write()
+        if path is not None:
+            self.core.log("startup", f"{profile.summary()} → {path}")
+
+    def handle_launch(self, argv):
+        """Our own command line, or one a relaunch forwarded."""
+        try:
+            opts = parse_launch_args(argv)
+        except SystemExit:
+            return
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        if opts.apply:
+            self.core.cancel_guard()
+            self.core.apply(opts.apply.strip().lower(), opts.mode, opts.args)
+
+    def closeEvent(self, event):
+        if self.bench_dialog is not None and self.bench_dialog.runner is not None:
+            # The dialog goes with the window, but the runner still has to
+            # put the old scheduler back
+            runner = self.bench_dialog.runner
+            runner.on_result = runner.on_finish = None
+            runner.cancel()
+        if self.heatmap_dialog is not None:
+            # Stops its sampler
+            self.heatmap_dialog.close()
+        if self.apps_dialog is not None:
+            self.apps_dialog.close()
+        if self.history_dialog is not None:
+            self.history_dialog.close()
+        if self.timing_dialog is not None:
+            self.timing_dialog.close()
+        if self.resident:
+            # The tray keeps the core; stop what only this window was showing
+            for name, fn in self.listeners:
+                self.core.disconnect(name, fn)
+            # The guard needs telemetry, which is all that costs CPU when idle
+            self.core.cancel_guard()
+            self.core.stop_telemetry()
+            self.core.stop_stats()
+            self.core.stop_probe()
+        else:
+            self.core.shutdown()
+        super().closeEvent(event)
 
     def on_scheduler_changed(self, text: str):
         is_default = (text.strip().lower() == "default")
         self.mode_combo.setEnabled(not is_default)
         self.args_input.setEnabled(not is_default)
 
-    def append_output(self, cmd, text):
-        self.output.append(f"<b>[{cmd}]</b><br>{text}<br>")
+    def append_output(self, entry):
+        self.pending_log.append(entry.format())
+        if not self.log_timer.isActive():
+            self.log_timer.start()
+
+    def flush_log(self):
+        # One insert and one scroll for everything since the last frame
+        self.output.appendPlainText("\n".join(self.pending_log))
+        self.pending_log.clear()
         self.output.verticalScrollBar().setValue(self.output.verticalScrollBar().maximum())
 
 
+class TrayIcon(QSystemTrayIcon):
+    """Keeps the core running without a window.
+
+    The menu switches scheduler and mode, the tooltip follows the state
+    from the core's events, and nothing polls. The window is built when
+    opened and thrown away again when closed.
+    """
+
+    def __init__(self):
+        super().__init__(app_icon())
+        self.dispatcher = Dispatcher(self)
+        self.core = SchedulerCore(self.dispatcher.invoke.emit)
+        self.window = None
+
+        self.menu = QMenu()
+        self.status_action = self.menu.addAction("Connecting…")
+        self.status_action.setEnabled(False)
+        self.menu.addSeparator()
+        self.sched_menu = self.menu.addMenu("Scheduler")
+        self.sched_group = QActionGroup(self.menu)
+        self.mode_menu = self.menu.addMenu("Mode")
+        self.sched_group.triggered.connect(self.on_scheduler)
+        self.mode_group = QActionGroup(self.menu)
+        for mode in MODES:
+            action = self.mode_menu.addAction(mode)
+            action.setCheckable(True)
+            action.setData(mode)
+            self.mode_group.addAction(action)
+        self.mode_group.triggered.connect(self.on_mode)
+        self.stop_action = self.menu.addAction("⛔ Default kernel scheduler")
+        self.stop_action.triggered.connect(lambda: self.core.stop(self.report))
+        self.menu.addSeparator()
+        self.menu.addAction("Open scxctl GUI").triggered.connect(self.open_window)
+        self.menu.addAction("Quit").triggered.connect(self.quit)
+        self.setContextMenu(self.menu)
+        self.activated.connect(self.on_activated)
+
+        self.core.connect("state", self.update_state)
+        self.core.connect("schedulers", self.set_schedulers)
+        self.set_schedulers(self.core.load_cached_schedulers())
+        self.setToolTip("scxctl GUI")
+        self.core.start()
+        self.core.start_control(on_activate=self.handle_launch)
+        self.core.start_apps()
+        # Without telemetry only changes get recorded; the recorder's thread
+        # and file writes wait for the first one
+        self.core.start_history()
+
+    def set_schedulers(self, schedulers):
+        for action in self.sched_group.actions():
+            self.sched_group.removeAction(action)
+        self.sched_menu.clear()
+        for name in schedulers:
+            action = self.sched_menu.addAction(f"{scheduler_emoji(name)} {name}")
+            action.setCheckable(True)
+            action.setData(name)
+            self.sched_group.addAction(action)
+        if self.core.state is not None:
+            self.update_state(self.core.state)
+
+    def update_state(self, state: SchedulerState):
+        if state.running:
+            text = f"{scheduler_emoji(state.scheduler)} {state.describe()}"
+        else:
+            text = "🟢 Default kernel scheduler"
+        self.status_action.setText(text)
+        self.setToolTip(f"scxctl GUI\n{text}")
+        for action in self.sched_group.actions():
+            action.setChecked(action.data() == state.scheduler)
+        for action in self.mode_group.actions():
+            action.setChecked(action.data() == (state.mode or "auto") and state.running)
+        self.mode_menu.setEnabled(state.running)
+        self.stop_action.setEnabled(state.running)
+
+    def on_scheduler(self, action):
+        state = self.core.state
+        mode = state.mode if state is not None and state.running else None
+        self.core.cancel_guard()
+        self.core.apply(action.data(), mode, "", self.report)
+
+    def on_mode(self, action):
+        state = self.core.state
+        if state is not None and state.running:
+            self.core.cancel_guard()
+            self.core.apply(state.scheduler, action.data(), "", self.report)
+
+    def report(self, output, error):
+        if error and error not in ("superseded", "cancelled"):
+            self.showMessage("scxctl GUI", str(error), QSystemTrayIcon.MessageIcon.Warning)
+
+    def on_activated(self, reason):
+        if reason == QSystemTrayIcon.ActivationReason.Trigger:
+            if self.window is not None and self.window.isVisible():
+                self.window.close()
+            else:
+                self.open_window()
+
+    def open_window(self):
+        if self.window is None:
+            self.window = SCXCtlGUI(self.core)
+            self.window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            self.window.destroyed.connect(self.window_closed)
+        self.window.showNormal()
+        self.window.raise_()
+        self.window.activateWindow()
+
+    def window_closed(self):
+        self.window = None
+
+    def handle_launch(self, argv):
+        try:
+            opts = parse_launch_args(argv)
+        except SystemExit:
+            return
+        if not opts.tray:
+            self.open_window()
+        if opts.apply:
+            self.core.cancel_guard()
+            self.core.apply(opts.apply.strip().lower(), opts.mode, opts.args, self.report)
+
+    def quit(self):
+        if self.window is not None:
+            self.window.close()
+        self.core.shutdown()
+        self.hide()
+        QApplication.quit()
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    profile.mark("QApplication")
+    if parse_launch_args(sys.argv[1:]).tray and QSystemTrayIcon.isSystemTrayAvailable():
+        app.setQuitOnLastWindowClosed(False)
+        tray = TrayIcon()
+        tray.show()
+        profile.mark("tray")
+        tray.handle_launch(sys.argv[1:])
+        if profile.enabled:
+            QTimer.singleShot(int(GIVE_UP_AFTER * 1000), profile.write)
+        sys.exit(app.exec())
     gui = SCXCtlGUI()
+    gui.setWindowIcon(app_icon())
     gui.show()
+    profile.mark("show")
+    gui.handle_launch(sys.argv[1:])
+    if profile.enabled:
+        QTimer.singleShot(int(GIVE_UP_AFTER * 1000), gui.write_profile)
     sys.exit(app.exec())
@@ -0,0 +1,104 @@
+"""BenchmarkRunner over FakeBackend: whatever ran before a run runs after it.
+
+The same as ``python -m scxctl_core.bench --fake --settle 0``, with only the
+cpu workload and short durations to keep it quick.
+"""
+
+import pytest
+
+from scxctl_core.bench import BenchCase, BenchError, BenchmarkRunner
+from scxctl_core.core import SchedulerCore
+from scxctl_core.fake_backend import FakeBackend
+from scxctl_core.mainloop import MainLoop
+from scxctl_core.state import SchedulerState, requested_state
+
+TIMEOUT = 30
+DURATION = 0.05
+
+
+def timeout():
+    raise AssertionError("benchmark did not finish")
+
+
+@pytest.fixture
+def bench(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    cores = []
+
+    def run(initial, cases, on_result=None):
+        """Run ``cases`` from ``initial``; the core and the finished runner.
+
+        ``on_result(runner, result)`` sees each result as it comes in.
+        """
+        loop = MainLoop()
+        core = SchedulerCore(loop.dispatch, spill_path=str(tmp_path / "activity"))
+        cores.append(core)
+        backend = FakeBackend()
+        backend.state = initial
+        runner = BenchmarkRunner(core, [BenchCase.parse(c) for c in cases],
+                                 on_result=on_result and (lambda result: on_result(runner, result)),
+                                 on_finish=lambda results: loop.quit(), duration=DURATION,
+                                 settle=0, workloads=("cpu",))
+
+        def started(_):
+            if not runner.running and not runner.results:
+                runner.start()
+        core.connect("state", started)
+        core.start(backend)
+        loop.call_later(TIMEOUT, timeout)
+        loop.run()
+        assert not runner.running
+        return core, runner
+
+    yield run
+    for core in cores:
+        core.shutdown()
+
+
+def test_restores_running(bench):
+    initial = requested_state("rusty", "powersave", "")
+    core, runner = bench(initial, ["lavd:gaming", "bpfland"])
+
+    assert [r.case.scheduler for r in runner.results] == ["lavd", "bpfland"]
+    assert all(r.error is None and r.metrics["cpu_mops_per_s"] > 0 for r in runner.results)
+    assert core.backend.state == initial
+    assert core.state == initial
+
+
+def test_restores_args(bench):
+    initial = requested_state("lavd", None, "--slice-us 5000 --verbose")
+    core, runner = bench(initial, ["bpfland"])
+    assert core.backend.state == initial
+
+
+def test_stops_when_nothing_ran(bench):
+    core, runner = bench(SchedulerState(), ["lavd", "bpfland"])
+    assert len(runner.results) == 2
+    assert not core.backend.state.running
+    assert not core.state.running
+
+
+def test_restores_after_failure(bench):
+    initial = requested_state("rusty", None, "")
+    core, runner = bench(initial, ["lavd", "missing", "bpfland"])
+
+    errors = [r.error for r in runner.results]
+    assert errors[0] is None and errors[2] is None
+    assert "unsupported scheduler missing" in errors[1]
+    assert core.backend.state == initial
+
+
+def test_restores_after_cancel(bench):
+    initial = requested_state("rusty", None, "")
+    core, runner = bench(initial, ["lavd", "bpfland"], on_result=lambda runner, result: runner.cancel())
+    assert [r.case.scheduler for r in runner.results] == ["lavd"]
+    assert core.backend.state == initial
+
+
+def test_needs_backend(tmp_path):
+    core = SchedulerCore(lambda fn: fn(), spill_path=str(tmp_path / "activity"))
+    try:
+        with pytest.raises(BenchError):
+            BenchmarkRunner(core, [BenchCase("lavd")]).start()
+    finally:
+        core.shutdown()
@@ -0,0 +1,160 @@
+"""SchedulerCore's write queue, driven by a MainLoop over FakeBackend.
+
+Worker results are dispatched back to the loop, so everything a test
+does in one dispatched step happens before any result is handled.
+"""
+
+import pytest
+
+from scxctl_core.core import SchedulerCore
+from scxctl_core.fake_backend import FakeBackend
+from scxctl_core.mainloop import MainLoop
+
+TIMEOUT = 10
+WRITES = ("start", "switch", "stop")
+
+
+class RecordingBackend(FakeBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def get_state(self):
+        self.calls.append("get_state")
+        return super().get_state()
+
+    def start(self, scheduler, mode=None, args=""):
+        self.calls.append(f"start {scheduler}")
+        return super().start(scheduler, mode, args)
+
+    def switch(self, scheduler, mode=None, args=""):
+        self.calls.append(f"switch {scheduler}")
+        return super().switch(scheduler, mode, args)
+
+    def stop(self):
+        self.calls.append("stop")
+        return super().stop()
+
+    def writes(self):
+        return [c for c in self.calls if c.split()[0] in WRITES]
+
+
+class Harness:
+    def __init__(self, tmp_path):
+        self.loop = MainLoop()
+        self.core = SchedulerCore(self.loop.dispatch, spill_path=str(tmp_path / "activity"))
+        self.backend = RecordingBackend()
+        self.results = {}
+        self.logs = []
+        self.core.connect("log", lambda entry: self.logs.append(entry))
+        self.core.connect("busy", self._on_busy)
+        self.run(lambda: self.core.start(self.backend))
+        # Events from a real scheduler on this machine would add refreshes
+        self.core.watcher.stop()
+        self.core.watcher = None
+        self.backend.calls.clear()
+        self.logs.clear()
+
+    def _on_busy(self, busy):
+        if not busy:
+            # After whatever was dispatched before it, e.g. dropped callbacks
+            self.loop.dispatch(self.loop.quit)
+
+    def _timeout(self):
+        raise AssertionError("SchedulerCore did not go idle")
+
+    def run(self, step):
+        """Run ``step`` on the loop, then the loop until the core is idle."""
+        timer = self.loop.call_later(TIMEOUT, self._timeout)
+        self.loop.dispatch(step)
+        self.loop.run()
+        timer.cancel()
+
+    def callback(self, tag):
+        def callback(output, error):
+            assert tag not in self.results, f"{tag} called back twice"
+            self.results[tag] = (output, error)
+        return callback
+
+    def logged(self, cmd):
+        return [entry for entry in self.logs if entry.cmd == cmd]
+
+
+@pytest.fixture
+def harness(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    harness = Harness(tmp_path)
+    yield harness
+    harness.core.shutdown()
+
+
+def test_burst_keeps_latest(harness):
+    core = harness.core
+
+    def step():
+        core.apply("lavd", "gaming", "", harness.callback("lavd"))
+        core.apply("bpfland", None, "", harness.callback("bpfland"))
+        core.apply("rusty", None, "", harness.callback("rusty"))
+        core.refresh()
+        core.refresh()
+        core.refresh()
+    harness.run(step)
+
+    assert harness.backend.writes() == ["start lavd", "switch rusty"]
+    assert harness.results == {
+        "lavd": ("started lavd", None),
+        "bpfland": (None, "superseded"),
+        "rusty": ("switched to rusty", None),
+    }
+    assert core.state.scheduler == "rusty"
+    assert harness.backend.state == core.state
+    # The three refreshes asked for during the writes ran as one
+    assert len(harness.logged("get")) == 1
+
+
+def test_same_target_merges(harness):
+    core = harness.core
+
+    def step():
+        core.apply("lavd", "gaming", "", harness.callback("first"))
+        core.apply("lavd", "gaming", "", harness.callback("second"))
+    harness.run(step)
+
+    assert harness.backend.writes() == ["start lavd"]
+    assert harness.results == {"first": ("started lavd", None), "second": ("started lavd", None)}
+
+    harness.backend.calls.clear()
+    harness.run(lambda: core.apply("lavd", "gaming", "", harness.callback("again")))
+    assert harness.backend.writes() == []
+    assert harness.results["again"] == ("already running", None)
+    # Only the quiet check that the cached state is not stale
+    assert harness.backend.calls == ["get_state"]
+
+
+def test_cancel(harness):
+    core = harness.core
+
+    def step():
+        core.apply("lavd", None, "", harness.callback("lavd"))
+        core.apply("bpfland", None, "", harness.callback("bpfland"))
+        core.cancel()
+    harness.run(step)
+
+    # The one in flight still reached the backend, the queued one never did
+    assert harness.backend.writes() == ["start lavd"]
+    assert harness.results == {"lavd": (None, "cancelled"), "bpfland": (None, "cancelled")}
+    # Not retried as a switch; the refresh after the error learns what runs
+    assert core.state.scheduler == "lavd"
+
+
+def test_stop_after_apply(harness):
+    core = harness.core
+
+    def step():
+        core.apply("lavd", None, "", harness.callback("lavd"))
+        core.apply("default", callback=harness.callback("default"))
+    harness.run(step)
+
+    assert harness.backend.writes() == ["start lavd", "stop"]
+    assert harness.results == {"lavd": ("started lavd", None), "default": ("stopped scheduler", None)}
+    assert not core.state.running
@@ -0,0 +1,149 @@
+"""LoaderClient against scxctl_core.mock_loader on a private session bus.
+
+Each test gets its own ``dbus-run-session``, so nothing touches the real
+system bus or a running scx_loader.
+"""
+
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("jeepney")
+if shutil.which("dbus-run-session") is None:
+    pytest.skip("dbus-run-session is not installed", allow_module_level=True)
+
+from scxctl_core.backend import ScxctlBackend, open_backend
+from scxctl_core.loader import INTERFACE, LoaderClient, LoaderError, open_loader
+from scxctl_core.state import SchedulerState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_TIMEOUT = 10
+
+
+class PrivateBus:
+    """A session bus of our own, optionally with the mock loader on it."""
+
+    def __init__(self, loader=True):
+        # dbus-run-session only tells its child where the bus is
+        command = 'echo "$DBUS_SESSION_BUS_ADDRESS"; exec "$@"'
+        child = [sys.executable, "-m", "scxctl_core.mock_loader"] if loader else ["sleep", "infinity"]
+        self.proc = subprocess.Popen(["dbus-run-session", "--", "sh", "-c", command, "sh", *child],
+                                     cwd=ROOT, stdout=subprocess.PIPE, text=True, start_new_session=True)
+        self.address = self._line()
+        if loader:
+            assert "serving" in self._line()
+
+    def _line(self):
+        try:
+            line = self.proc.stdout.readline().strip()
+        except OSError:
+            line = ""
+        if not line:
+            self.close()
+            pytest.fail("dbus-run-session did not start")
+        return line
+
+    def close(self):
+        try:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.proc.wait(timeout=START_TIMEOUT)
+        self.proc.stdout.close()
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    private = PrivateBus()
+    monkeypatch.setenv("SCXCTL_GUI_BUS", private.address)
+    monkeypatch.delenv("SCXCTL_GUI_BACKEND", raising=False)
+    yield private
+    private.close()
+
+
+@pytest.fixture
+def client(bus):
+    client = LoaderClient(bus.address)
+    yield client
+    client.close()
+
+
+def test_properties(client):
+    assert client.get_state() == SchedulerState()
+    assert client.supported_schedulers() == ["bpfland", "lavd", "rusty"]
+
+
+def test_start_switch_stop(client):
+    assert client.start("lavd", "gaming") == "started lavd in gaming mode"
+    assert client.get_state() == SchedulerState("lavd", "gaming", ())
+
+    assert client.switch("rusty") == "switched to rusty in auto mode"
+    assert client.get_state() == SchedulerState("rusty", "auto", ())
+
+    client.stop()
+    assert client.get_state() == SchedulerState()
+
+
+def test_arguments_replace_mode(client):
+    client.start("bpfland", "gaming", "-s 20000 --label 'a b'")
+    assert client.get_state() == SchedulerState("bpfland", None, ("-s", "20000", "--label", "a b"))
+
+
+def test_errors(client):
+    with pytest.raises(LoaderError, match="unsupported scheduler"):
+        client.start("nope")
+    with pytest.raises(LoaderError, match="no scheduler is running"):
+        client.switch("lavd")
+    with pytest.raises(LoaderError, match="unknown mode"):
+        client.start("lavd", "turbo")
+    client.start("lavd")
+    with pytest.raises(LoaderError, match="already running"):
+        client.start("rusty")
+
+
+def test_subscribe(client):
+    signals = queue.Queue()
+    with client.subscribe(signals):
+        client.start("lavd", "powersave")
+        msg = signals.get(timeout=START_TIMEOUT)
+    interface, changed, _ = msg.body
+    assert interface == INTERFACE
+    assert changed["CurrentScheduler"] == ("s", "scx_lavd")
+    assert changed["SchedulerMode"] == ("u", 2)
+
+
+def test_open_backend_prefers_loader(bus):
+    backend = open_backend()
+    try:
+        assert isinstance(backend, LoaderClient)
+        assert backend.name == "dbus"
+    finally:
+        backend.close()
+
+
+def test_open_backend_forced_scxctl(bus, monkeypatch):
+    monkeypatch.setenv("SCXCTL_GUI_BACKEND", "scxctl")
+    assert open_loader() is None
+    assert isinstance(open_backend(), ScxctlBackend)
+
+
+def test_open_backend_without_loader(monkeypatch):
+    private = PrivateBus(loader=False)
+    try:
+        monkeypatch.setenv("SCXCTL_GUI_BUS", private.address)
+        monkeypatch.delenv("SCXCTL_GUI_BACKEND", raising=False)
+        assert open_loader() is None
+        assert isinstance(open_backend(), ScxctlBackend)
+    finally:
+        private.close()
+
+
+def test_open_backend_without_bus(monkeypatch, tmp_path):
+    monkeypatch.setenv("SCXCTL_GUI_BUS", f"unix:path={tmp_path}/no-bus")
+    monkeypatch.delenv("SCXCTL_GUI_BACKEND", raising=False)
+    assert isinstance(open_backend(), ScxctlBackend)
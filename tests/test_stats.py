@@ -0,0 +1,129 @@
+"""StatsClient and StatsStream against scxctl_core.fake_stats.
+
+The fake server runs as a subprocess on a socket in the test's tmp_path,
+so killing it is exactly what a scheduler exiting looks like.
+"""
+
+import os
+import queue
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from scxctl_core.fake_stats import FIELDS
+from scxctl_core.stats import StatsClient, StatsColumns, StatsError, StatsStream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT = 10
+
+
+class FakeStatsServer:
+    def __init__(self, path, name="lavd"):
+        self.proc = subprocess.Popen([sys.executable, "-m", "scxctl_core.fake_stats",
+                                      "--socket", path, "--scheduler", name],
+                                     cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline()
+        if "serving" not in line:
+            self.close()
+            pytest.fail("fake_stats did not start")
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGINT)
+        self.proc.wait(timeout=TIMEOUT)
+        self.proc.stdout.close()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "stats")
+
+
+@pytest.fixture
+def server(path):
+    server = FakeStatsServer(path)
+    yield server
+    server.close()
+
+
+def test_schema(server, path):
+    client = StatsClient(path)
+    try:
+        schema = client.schema()
+    finally:
+        client.close()
+    assert schema.name == "SysStats"
+    # per_cpu is a dict of structs and gets no column
+    assert [f.name for f in schema.fields] == [k for k in FIELDS if k != "per_cpu"]
+    kinds = {f.name: f.kind for f in schema.fields}
+    assert kinds["nr_sched"] == "u64"
+    assert kinds["nr_active"] == "i64"
+    assert kinds["dsq_lat_us"] == "float"
+    assert kinds["mode"] == "string"
+
+
+def test_samples(server, path):
+    client = StatsClient(path)
+    try:
+        columns = StatsColumns(client.schema(), history=4)
+        first = client.stats()
+        columns.append(first)
+        second = client.stats()
+        columns.append(second)
+    finally:
+        client.close()
+    assert set(columns.columns) == {"nr_sched", "nr_migrations", "nr_preemptions",
+                                    "dsq_lat_us", "pc_pc_util", "nr_active"}
+    assert columns.columns["nr_sched"].values() == [first["nr_sched"], second["nr_sched"]]
+    assert second["nr_sched"] > first["nr_sched"]
+    assert columns.latest["mode"] == "performance"
+    assert "per_cpu" not in columns.latest
+
+
+def test_unknown_request(server, path):
+    client = StatsClient(path)
+    try:
+        with pytest.raises(StatsError, match="bogus failed"):
+            client.request("bogus")
+    finally:
+        client.close()
+
+
+def test_no_server(path):
+    with pytest.raises(StatsError, match="cannot connect"):
+        StatsClient(path)
+
+
+def test_stream_reconnects(path):
+    events = queue.Queue()
+    stream = StatsStream(lambda columns: events.put(("schema", columns)),
+                         lambda sample: events.put(("sample", sample)),
+                         interval=0.05, path=path)
+
+    def next_event(kind):
+        while True:
+            event, value = events.get(timeout=TIMEOUT)
+            if event == kind:
+                return value
+
+    server = FakeStatsServer(path)
+    stream.start()
+    try:
+        columns = next_event("schema")
+        assert columns is stream.columns
+        assert next_event("sample")["mode"] == "performance"
+
+        server.close()
+        assert next_event("schema") is None
+        assert stream.columns is None
+
+        server = FakeStatsServer(path)
+        columns = next_event("schema")
+        assert columns is not None and columns is stream.columns
+        next_event("sample")
+        assert len(columns.columns["nr_sched"]) >= 1
+    finally:
+        stream.stop()
+        server.close()